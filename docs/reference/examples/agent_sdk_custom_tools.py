@@ -18,15 +18,74 @@ from claude_agent_sdk import (
     ClaudeSDKClient,
     ClaudeAgentOptions,
 )
+from types import MappingProxyType
 from typing import Any
+import functools
 import json
 import asyncio
 
+from graph_search import demo_neighbors, shortest_path
+from response_cache import ResponseCache, default_embedder
+
+# Exact + semantic cache of final answers (see response_cache.py)
+response_cache = ResponseCache(embed_fn=default_embedder())
+
 
 # ============================================
 # STEP 1: Define Custom Tools with @tool decorator
 # ============================================
 
+# Simulated results never change - serialize them once at import instead of
+# calling json.dumps on every tool invocation.
+_EMPTY_PHARMA_JSON = json.dumps({
+    "results": [],
+    "total": 0,
+    "suggestion": "Try 'pharmaceutical', 'healthcare', or specific company names"
+})
+
+_SEARCH_RESULTS_JSON = json.dumps({
+    "results": [
+        {"person_id": "uuid-1", "name": "John Doe", "role": "CEO at BioTech"},
+        {"person_id": "uuid-2", "name": "Jane Smith", "role": "VP Sales, Healthcare"}
+    ],
+    "total": 2
+})
+
+_SEMANTIC_RESULTS_JSON = json.dumps({
+    "results": [
+        {
+            "person_id": "uuid-5",
+            "name": "Maria Chen",
+            "relevance": 0.89,
+            "reason": "Has pharmaceutical connections in Singapore"
+        },
+        {
+            "person_id": "uuid-6",
+            "name": "Wei Zhang",
+            "relevance": 0.82,
+            "reason": "Former Singapore health ministry consultant"
+        }
+    ]
+})
+
+
+# Memoized tool bodies keyed by arguments. Claude often repeats the exact same
+# call while self-correcting; a repeat is an O(1) hit returning the JSON text.
+# Over live data, swap lru_cache for a TTL cache (e.g. cachetools.TTLCache).
+@functools.lru_cache(maxsize=256)
+def _search_people_impl(query: str, limit: int) -> str:
+    # Simulated search - replace with real implementation
+    if "pharma" in query.lower():
+        # Simulate empty result to trigger self-correction
+        return _EMPTY_PHARMA_JSON
+    return _SEARCH_RESULTS_JSON
+
+
+@functools.lru_cache(maxsize=256)
+def _semantic_search_impl(query: str, threshold: float) -> str:
+    return _SEMANTIC_RESULTS_JSON
+
+
 @tool(
     "search_people",
     "Search for people in the network by query. Returns list of matching people.",
@@ -42,32 +101,7 @@ async def search_people(args: dict[str, Any]) -> dict[str, Any]:
 
     print(f"  [Tool executed] search_people(query='{query}', limit={limit})")
 
-    # Simulated search - replace with real implementation
-    if "pharma" in query.lower():
-        # Simulate empty result to trigger self-correction
-        return {
-            "content": [{
-                "type": "text",
-                "text": json.dumps({
-                    "results": [],
-                    "total": 0,
-                    "suggestion": "Try 'pharmaceutical', 'healthcare', or specific company names"
-                })
-            }]
-        }
-
-    return {
-        "content": [{
-            "type": "text",
-            "text": json.dumps({
-                "results": [
-                    {"person_id": "uuid-1", "name": "John Doe", "role": "CEO at BioTech"},
-                    {"person_id": "uuid-2", "name": "Jane Smith", "role": "VP Sales, Healthcare"}
-                ],
-                "total": 2
-            })
-        }]
-    }
+    return {"content": [{"type": "text", "text": _search_people_impl(query, limit)}]}
 
 
 @tool(
@@ -82,27 +116,41 @@ async def semantic_search(args: dict[str, Any]) -> dict[str, Any]:
 
     print(f"  [Tool executed] semantic_search(query='{query}', threshold={threshold})")
 
-    return {
-        "content": [{
-            "type": "text",
-            "text": json.dumps({
-                "results": [
-                    {
-                        "person_id": "uuid-5",
-                        "name": "Maria Chen",
-                        "relevance": 0.89,
-                        "reason": "Has pharmaceutical connections in Singapore"
-                    },
-                    {
-                        "person_id": "uuid-6",
-                        "name": "Wei Zhang",
-                        "relevance": 0.82,
-                        "reason": "Former Singapore health ministry consultant"
-                    }
-                ]
-            })
-        }]
+    return {"content": [{"type": "text", "text": _semantic_search_impl(query, threshold)}]}
+
+
+# Simulated person data - read-only, built once at import
+PERSONS = MappingProxyType({
+    "uuid-1": {
+        "name": "John Doe",
+        "assertions": [
+            {"predicate": "works_at", "value": "BioTech Corp"},
+            {"predicate": "can_help_with", "value": "pharma distribution in APAC"},
+        ],
+        "connections": ["uuid-3", "uuid-4"]
+    },
+    "uuid-5": {
+        "name": "Maria Chen",
+        "assertions": [
+            {"predicate": "works_at", "value": "PharmaSG"},
+            {"predicate": "knows", "value": "Singapore healthcare regulators"},
+            {"predicate": "can_help_with", "value": "market entry in regulated industries"},
+        ],
+        "connections": ["uuid-1", "uuid-6"]
     }
+})
+
+
+# Pre-serialized person payloads
+_PERSON_JSON = {person_id: json.dumps(person) for person_id, person in PERSONS.items()}
+
+
+@functools.lru_cache(maxsize=1024)
+def _get_person_json(person_id: str) -> str:
+    """Known people come pre-serialized; misses are cached after first lookup."""
+    if person_id in _PERSON_JSON:
+        return _PERSON_JSON[person_id]
+    return json.dumps({"error": f"Person {person_id} not found"})
 
 
 @tool(
@@ -116,33 +164,10 @@ async def get_person_details(args: dict[str, Any]) -> dict[str, Any]:
 
     print(f"  [Tool executed] get_person_details(person_id='{person_id}')")
 
-    # Simulated person data
-    persons = {
-        "uuid-1": {
-            "name": "John Doe",
-            "assertions": [
-                {"predicate": "works_at", "value": "BioTech Corp"},
-                {"predicate": "can_help_with", "value": "pharma distribution in APAC"},
-            ],
-            "connections": ["uuid-3", "uuid-4"]
-        },
-        "uuid-5": {
-            "name": "Maria Chen",
-            "assertions": [
-                {"predicate": "works_at", "value": "PharmaSG"},
-                {"predicate": "knows", "value": "Singapore healthcare regulators"},
-                {"predicate": "can_help_with", "value": "market entry in regulated industries"},
-            ],
-            "connections": ["uuid-1", "uuid-6"]
-        }
-    }
-
-    person = persons.get(person_id, {"error": f"Person {person_id} not found"})
-
     return {
         "content": [{
             "type": "text",
-            "text": json.dumps(person)
+            "text": _get_person_json(person_id)
         }]
     }
 
@@ -160,15 +185,17 @@ async def find_connections(args: dict[str, Any]) -> dict[str, Any]:
 
     print(f"  [Tool executed] find_connections({from_id} -> {to_id}, max_hops={max_hops})")
 
+    # Bidirectional BFS - swap demo_neighbors for edge_table_neighbors(supabase)
+    path = shortest_path(from_id, to_id, demo_neighbors, max_hops=max_hops)
+    if path is None:
+        result = {"paths": [], "message": f"No connection within {max_hops} hops"}
+    else:
+        result = {"paths": [path], "shortest_path_length": len(path) - 1}
+
     return {
         "content": [{
             "type": "text",
-            "text": json.dumps({
-                "paths": [
-                    [from_id, "uuid-3", to_id],
-                ],
-                "shortest_path_length": 2
-            })
+            "text": json.dumps(result)
         }]
     }
 
@@ -193,20 +220,8 @@ network_search_server = create_sdk_mcp_server(
 # STEP 3: Run Agent (SDK handles the loop!)
 # ============================================
 
-async def run_agent(user_query: str):
-    """
-    Run the agent with automatic loop handling.
-
-    KEY DIFFERENCE: No while loop here!
-    The SDK orchestrates everything:
-    - Claude decides which tools to call
-    - SDK executes them automatically
-    - Claude sees results and decides next action
-    - SDK streams messages back to you
-    """
-
-    # System prompt for search agent behavior
-    system_prompt = """You are a network search agent helping find people and connections.
+# System prompt for search agent behavior
+SYSTEM_PROMPT = """You are a network search agent helping find people and connections.
 
 You have access to multiple search strategies:
 1. search_people - direct text search (fast but literal)
@@ -227,28 +242,67 @@ SELF-CORRECTION:
 - Don't give up after one failed attempt
 """
 
+MAX_TURNS = 10
+TURN_TIMEOUT_SECONDS = 30  # upper bound per turn before the run is abandoned
+
+ALLOWED_TOOLS = [
+    "mcp__network-search__search_people",
+    "mcp__network-search__semantic_search",
+    "mcp__network-search__get_person_details",
+    "mcp__network-search__find_connections",
+]
+
+
+@response_cache.cached(system_prompt=SYSTEM_PROMPT, tools=ALLOWED_TOOLS)
+async def run_agent(user_query: str) -> str:
+    """
+    Run the agent with automatic loop handling.
+
+    KEY DIFFERENCE: No while loop here!
+    The SDK orchestrates everything:
+    - Claude decides which tools to call
+    - SDK executes them automatically
+    - Claude sees results and decides next action
+    - SDK streams messages back to you
+    """
+
     options = ClaudeAgentOptions(
         # Provide our custom MCP server
         mcp_servers={
             "network-search": network_search_server
         },
         # Allow specific tools (MCP tool naming format)
-        allowed_tools=[
-            "mcp__network-search__search_people",
-            "mcp__network-search__semantic_search",
-            "mcp__network-search__get_person_details",
-            "mcp__network-search__find_connections",
-        ],
+        allowed_tools=ALLOWED_TOOLS,
         # Optional: limit turns to prevent infinite loops
-        max_turns=10,
+        max_turns=MAX_TURNS,
         # System prompt for agent behavior
-        system_prompt=system_prompt
+        system_prompt=SYSTEM_PROMPT
     )
 
     print(f"\n{'='*60}")
     print(f"USER QUERY: {user_query}")
     print(f"{'='*60}\n")
 
+    # Output is buffered and printed once the run ends: synchronous prints
+    # on a slow terminal would otherwise block the event loop mid-stream.
+    output: list[str] = []
+    try:
+        final_result = await asyncio.wait_for(
+            _consume_response(options, user_query, output),
+            timeout=MAX_TURNS * TURN_TIMEOUT_SECONDS
+        )
+    except asyncio.TimeoutError:
+        output.append(f"\n[Timeout] no result after {MAX_TURNS * TURN_TIMEOUT_SECONDS}s")
+        final_result = ""
+
+    print("\n".join(output))
+    return final_result
+
+
+async def _consume_response(
+    options: ClaudeAgentOptions, user_query: str, output: list[str]
+) -> str:
+    """Stream messages until the terminal `result`, then close the client."""
     # The SDK handles the agentic loop automatically!
     async with ClaudeSDKClient(options=options) as client:
         # Send the initial query
@@ -264,14 +318,20 @@ SELF-CORRECTION:
 
             if hasattr(msg, 'type'):
                 if msg.type == "assistant":
-                    print(f"\n[Claude]: {msg.content}")
+                    output.append(f"\n[Claude]: {msg.content}")
                 elif msg.type == "tool_use":
-                    print(f"\n[Tool Call]: {msg.tool_name}")
+                    output.append(f"\n[Tool Call]: {msg.tool_name}")
                 elif msg.type == "result":
-                    print(f"\n{'='*60}")
-                    print("FINAL RESULT:")
-                    print(f"{'='*60}")
-                    print(msg.result if hasattr(msg, 'result') else msg)
+                    final_result = msg.result if hasattr(msg, 'result') else str(msg)
+                    output.append(f"\n{'='*60}")
+                    output.append("FINAL RESULT:")
+                    output.append(f"{'='*60}")
+                    output.append(final_result)
+                    # Nothing follows `result` - stop instead of waiting
+                    # for the stream to drain
+                    return final_result
+
+    return ""
 
 
 # ============================================
@@ -6,13 +6,24 @@ This demonstrates:
 2. Multi-turn tool calling loop (YOU implement)
 3. Self-correction on errors (YOU implement)
 4. Claude decides what to do next based on results
+5. Independent tool calls from one turn run concurrently
 """
 
 import anthropic
 from typing import Any
+import asyncio
+import hashlib
 import json
 
-client = anthropic.Anthropic()
+from graph_search import demo_neighbors, shortest_path
+from response_cache import ResponseCache, default_embedder
+
+client = anthropic.AsyncAnthropic()
+
+# Exact + semantic cache of final answers (see response_cache.py)
+response_cache = ResponseCache(embed_fn=default_embedder())
+
+MAX_ITERATIONS_MESSAGE = "Agent reached max iterations without completing."
 
 # ============================================
 # STEP 1: Define your custom tools
@@ -86,13 +97,42 @@ TOOLS = [
 ]
 
 
+# Tools that only read data - calls to these within one turn are independent
+# of each other and can be executed concurrently.
+READ_ONLY_TOOLS = {"search_people", "get_person_details", "semantic_search", "find_connections"}
+
+
 # ============================================
 # STEP 2: Implement tool execution
 # ============================================
+# Static simulated results, serialized once at import
+_EMPTY_PHARMA_JSON = json.dumps(
+    {"results": [], "total": 0, "suggestion": "Try 'pharmaceutical' or company names"}
+)
+_SEARCH_RESULTS_JSON = json.dumps({
+    "results": [
+        {"person_id": "uuid-1", "name": "John Doe", "role": "CEO at BioTech"},
+        {"person_id": "uuid-2", "name": "Jane Smith", "role": "VP Sales, Healthcare"}
+    ],
+    "total": 2
+})
+_SEMANTIC_RESULTS_JSON = json.dumps({
+    "results": [
+        {
+            "person_id": "uuid-5",
+            "name": "Maria Chen",
+            "relevance": 0.89,
+            "reason": "Has pharma connections in Singapore"
+        }
+    ]
+})
+
+
 def execute_tool(tool_name: str, tool_input: dict) -> Any:
     """
     Execute a tool and return the result.
     This is where YOUR business logic lives.
+    A str result is treated as already-serialized JSON.
     """
     print(f"  [Executing] {tool_name}({json.dumps(tool_input, ensure_ascii=False)[:100]}...)")
 
@@ -100,14 +140,8 @@ def execute_tool(tool_name: str, tool_input: dict) -> Any:
     if tool_name == "search_people":
         # Simulated: first search might return nothing
         if "pharma" in tool_input["query"].lower():
-            return {"results": [], "total": 0, "suggestion": "Try 'pharmaceutical' or company names"}
-        return {
-            "results": [
-                {"person_id": "uuid-1", "name": "John Doe", "role": "CEO at BioTech"},
-                {"person_id": "uuid-2", "name": "Jane Smith", "role": "VP Sales, Healthcare"}
-            ],
-            "total": 2
-        }
+            return _EMPTY_PHARMA_JSON
+        return _SEARCH_RESULTS_JSON
 
     elif tool_name == "get_person_details":
         return {
@@ -122,45 +156,97 @@ def execute_tool(tool_name: str, tool_input: dict) -> Any:
         }
 
     elif tool_name == "semantic_search":
-        return {
-            "results": [
-                {
-                    "person_id": "uuid-5",
-                    "name": "Maria Chen",
-                    "relevance": 0.89,
-                    "reason": "Has pharma connections in Singapore"
-                }
-            ]
-        }
+        return _SEMANTIC_RESULTS_JSON
 
     elif tool_name == "find_connections":
+        max_hops = tool_input.get("max_hops", 3)
+        path = shortest_path(
+            tool_input["from_person_id"],
+            tool_input["to_person_id"],
+            demo_neighbors,
+            max_hops=max_hops
+        )
+        if path is None:
+            return {"paths": [], "message": f"No connection within {max_hops} hops"}
+        return {"paths": [path], "shortest_path_length": len(path) - 1}
+
+    return {"error": f"Unknown tool: {tool_name}"}
+
+
+async def execute_tool_async(tool_name: str, tool_input: dict) -> Any:
+    """
+    Execute a tool without blocking the event loop.
+    Sync implementations (DB clients, HTTP SDKs) run in a worker thread.
+    """
+    return await asyncio.to_thread(execute_tool, tool_name, tool_input)
+
+
+async def run_tool(tool_name: str, tool_input: dict) -> dict:
+    """Execute one tool and return the tool_result body (content + error flag)."""
+    try:
+        result = await execute_tool_async(tool_name, tool_input)
         return {
-            "paths": [
-                ["uuid-1", "uuid-3", "uuid-5"],
-            ],
-            "shortest_path_length": 2
+            "content": result if isinstance(result, str) else json.dumps(result, ensure_ascii=False)
+        }
+    except Exception as e:
+        # Self-correction: return error so Claude can adapt
+        return {
+            "content": json.dumps({"error": str(e)}),
+            "is_error": True
         }
 
-    return {"error": f"Unknown tool: {tool_name}"}
 
+def tool_call_key(block) -> bytes:
+    """Identity of a tool call: name + canonical JSON of its input."""
+    canonical = json.dumps(block.input, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(f"{block.name}\0{canonical}".encode()).digest()
 
-# ============================================
-# STEP 3: The Agentic Loop (YOU implement this)
-# ============================================
-def run_agent(user_query: str, max_iterations: int = 10) -> str:
+
+async def run_tool_group(group: list) -> list[dict]:
     """
-    Main agentic loop.
+    Execute one batch concurrently and return tool_result blocks in order.
+    Duplicate calls (same name + same input) run once; every tool_use_id
+    still gets its own tool_result pointing at the shared outcome.
+    """
+    unique: dict[bytes, asyncio.Task] = {}
+    keys = []
+    for block in group:
+        key = tool_call_key(block)
+        if key not in unique:
+            unique[key] = asyncio.create_task(run_tool(block.name, block.input))
+        keys.append(key)
 
-    KEY INSIGHT: Claude decides what to do, but YOU control the loop.
-    - Claude returns tool_use blocks
-    - You execute them and return results
-    - Claude decides next action based on results
-    - Loop until Claude gives final answer (no more tool calls)
+    await asyncio.gather(*unique.values())
+
+    return [
+        {"type": "tool_result", "tool_use_id": block.id, **unique[key].result()}
+        for block, key in zip(group, keys)
+    ]
+
+
+def group_tool_calls(tool_calls: list) -> list[list]:
+    """
+    Split tool calls into batches that are safe to run concurrently.
+    Consecutive read-only calls share a batch; any other call runs alone,
+    so side effects keep the order Claude asked for.
     """
+    groups: list[list] = []
+    for block in tool_calls:
+        if (
+            block.name in READ_ONLY_TOOLS
+            and groups
+            and groups[-1][0].name in READ_ONLY_TOOLS
+        ):
+            groups[-1].append(block)
+        else:
+            groups.append([block])
+    return groups
 
-    messages = [{"role": "user", "content": user_query}]
 
-    system_prompt = """You are a network search agent helping find people and connections.
+# ============================================
+# STEP 3: The Agentic Loop (YOU implement this)
+# ============================================
+SYSTEM_PROMPT = """You are a network search agent helping find people and connections.
 
 You have access to multiple search strategies:
 1. search_people - direct text search (fast but literal)
@@ -181,6 +267,34 @@ SELF-CORRECTION:
 - Don't give up after one failed attempt
 """
 
+# Prompt caching: system prompt + tool definitions are an identical prefix on
+# every iteration. Marking the end of that prefix with cache_control lets the
+# API reuse it instead of re-processing it (cheaper input tokens, lower TTFT).
+# Built once at import - the loop reuses the same objects.
+SYSTEM_BLOCKS = [
+    {"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}
+]
+CACHED_TOOLS = TOOLS[:-1] + [{**TOOLS[-1], "cache_control": {"type": "ephemeral"}}]
+
+
+@response_cache.cached(
+    system_prompt=SYSTEM_PROMPT,
+    tools=[t["name"] for t in TOOLS],
+    uncacheable=(MAX_ITERATIONS_MESSAGE,),
+)
+async def run_agent(user_query: str, max_iterations: int = 10) -> str:
+    """
+    Main agentic loop.
+
+    KEY INSIGHT: Claude decides what to do, but YOU control the loop.
+    - Claude returns tool_use blocks
+    - You execute them and return results
+    - Claude decides next action based on results
+    - Loop until Claude gives final answer (no more tool calls)
+    """
+
+    messages = [{"role": "user", "content": user_query}]
+
     iteration = 0
 
     while iteration < max_iterations:
@@ -188,11 +302,11 @@ SELF-CORRECTION:
         print(f"\n=== Iteration {iteration} ===")
 
         # Call Claude
-        response = client.messages.create(
+        response = await client.messages.create(
             model="claude-sonnet-4-20250514",
             max_tokens=4096,
-            system=system_prompt,
-            tools=TOOLS,
+            system=SYSTEM_BLOCKS,
+            tools=CACHED_TOOLS,
             messages=messages
         )
 
@@ -200,31 +314,14 @@ SELF-CORRECTION:
 
         # Check if Claude wants to use tools
         if response.stop_reason == "tool_use":
-            # Process all tool calls in this response
+            # Process all tool calls in this response.
+            # Independent calls run concurrently: latency is max(durations)
+            # instead of sum(durations). gather() keeps the original order.
+            tool_calls = [b for b in response.content if b.type == "tool_use"]
             tool_results = []
 
-            for block in response.content:
-                if block.type == "tool_use":
-                    tool_name = block.name
-                    tool_input = block.input
-                    tool_use_id = block.id
-
-                    # Execute the tool (YOUR code)
-                    try:
-                        result = execute_tool(tool_name, tool_input)
-                        tool_results.append({
-                            "type": "tool_result",
-                            "tool_use_id": tool_use_id,
-                            "content": json.dumps(result, ensure_ascii=False)
-                        })
-                    except Exception as e:
-                        # Self-correction: return error so Claude can adapt
-                        tool_results.append({
-                            "type": "tool_result",
-                            "tool_use_id": tool_use_id,
-                            "content": json.dumps({"error": str(e)}),
-                            "is_error": True
-                        })
+            for group in group_tool_calls(tool_calls):
+                tool_results.extend(await run_tool_group(group))
 
             # Add assistant response and tool results to messages
             messages.append({"role": "assistant", "content": response.content})
@@ -245,7 +342,7 @@ SELF-CORRECTION:
             print(f"Unexpected stop_reason: {response.stop_reason}")
             break
 
-    return "Agent reached max iterations without completing."
+    return MAX_ITERATIONS_MESSAGE
 
 
 # ============================================
@@ -263,7 +360,7 @@ if __name__ == "__main__":
     Show me the most relevant people and explain WHY they could help.
     """
 
-    result = run_agent(query)
+    result = asyncio.run(run_agent(query))
     print("\n" + "="*60)
     print("FINAL ANSWER:")
     print("="*60)
@@ -0,0 +1,127 @@
+"""
+Bidirectional BFS for find_connections
+
+This demonstrates:
+1. Frontier-at-a-time expansion - ONE neighbor query per BFS layer
+2. Always expanding the smaller frontier - O(b^(d/2)) instead of O(b^d)
+3. Early termination as soon as the two searches meet
+4. Path reconstruction by walking parent pointers
+
+Plug in any neighbor source: the demo graph below, or the `edge` table.
+"""
+
+from typing import Callable, Optional
+
+# frontier -> {node: neighbors}
+FetchNeighbors = Callable[[set[str]], dict[str, set[str]]]
+
+
+# Simulated graph - replace with edge_table_neighbors(supabase)
+DEMO_EDGES = [
+    ("uuid-1", "uuid-3"),
+    ("uuid-1", "uuid-4"),
+    ("uuid-5", "uuid-1"),
+    ("uuid-5", "uuid-6"),
+    ("uuid-3", "uuid-6"),
+]
+
+
+def demo_neighbors(frontier: set[str]) -> dict[str, set[str]]:
+    """Neighbors from DEMO_EDGES (connections are undirected)."""
+    neighbors: dict[str, set[str]] = {node: set() for node in frontier}
+    for a, b in DEMO_EDGES:
+        if a in frontier:
+            neighbors[a].add(b)
+        if b in frontier:
+            neighbors[b].add(a)
+    return neighbors
+
+
+def edge_table_neighbors(supabase) -> FetchNeighbors:
+    """Neighbors from the `edge` table - one round-trip per BFS layer."""
+    def fetch(frontier: set[str]) -> dict[str, set[str]]:
+        ids = ",".join(frontier)
+        rows = supabase.table("edge").select(
+            "src_person_id, dst_person_id"
+        ).or_(
+            f"src_person_id.in.({ids}),dst_person_id.in.({ids})"
+        ).execute().data or []
+
+        neighbors: dict[str, set[str]] = {node: set() for node in frontier}
+        for row in rows:
+            src, dst = row["src_person_id"], row["dst_person_id"]
+            if src in frontier:
+                neighbors[src].add(dst)
+            if dst in frontier:
+                neighbors[dst].add(src)
+        return neighbors
+    return fetch
+
+
+def _expand(
+    frontier: set[str],
+    parents: dict[str, Optional[str]],
+    other_parents: dict[str, Optional[str]],
+    fetch_neighbors: FetchNeighbors,
+) -> tuple[set[str], Optional[str]]:
+    """Expand one layer. Returns (next frontier, meeting node or None)."""
+    next_frontier: set[str] = set()
+    for node, neighbors in fetch_neighbors(frontier).items():
+        for neighbor in neighbors:
+            if neighbor in parents:
+                continue
+            parents[neighbor] = node
+            if neighbor in other_parents:
+                return next_frontier, neighbor
+            next_frontier.add(neighbor)
+    return next_frontier, None
+
+
+def _build_path(
+    meet: str,
+    parents_from: dict[str, Optional[str]],
+    parents_to: dict[str, Optional[str]],
+) -> list[str]:
+    path = []
+    node: Optional[str] = meet
+    while node is not None:
+        path.append(node)
+        node = parents_from[node]
+    path.reverse()
+
+    node = parents_to[meet]
+    while node is not None:
+        path.append(node)
+        node = parents_to[node]
+    return path
+
+
+def shortest_path(
+    from_id: str,
+    to_id: str,
+    fetch_neighbors: FetchNeighbors,
+    max_hops: int = 3,
+) -> Optional[list[str]]:
+    """
+    Shortest path between two people, or None if none within max_hops.
+    Each layer expansion adds one hop, so the search stops after max_hops
+    expansions in total (split between the two sides).
+    """
+    if from_id == to_id:
+        return [from_id]
+
+    parents_from: dict[str, Optional[str]] = {from_id: None}
+    parents_to: dict[str, Optional[str]] = {to_id: None}
+    frontier_from, frontier_to = {from_id}, {to_id}
+
+    for _ in range(max_hops):
+        if not frontier_from or not frontier_to:
+            break
+        if len(frontier_from) <= len(frontier_to):
+            frontier_from, meet = _expand(frontier_from, parents_from, parents_to, fetch_neighbors)
+        else:
+            frontier_to, meet = _expand(frontier_to, parents_to, parents_from, fetch_neighbors)
+        if meet is not None:
+            return _build_path(meet, parents_from, parents_to)
+
+    return None
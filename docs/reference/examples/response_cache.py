@@ -0,0 +1,140 @@
+"""
+Two-tier response cache for the agent examples
+
+This demonstrates:
+1. Exact match - SHA-256 of (query + system prompt + sorted tool names)
+2. Semantic match - cosine similarity between query embeddings
+3. SQLite persistence - re-running an example script answers from disk
+
+A hit skips the LLM round-trips AND every tool execution.
+The semantic tier is optional: without an embedding function only exact
+matches are served.
+"""
+
+from typing import Any, Awaitable, Callable, Optional
+import functools
+import hashlib
+import json
+import math
+import sqlite3
+import time
+
+EmbedFn = Callable[[str], list[float]]
+
+
+def default_embedder() -> Optional[EmbedFn]:
+    """Local sentence-transformer if installed, otherwise no semantic tier."""
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        return None
+
+    model = SentenceTransformer("all-MiniLM-L6-v2")
+    return lambda text: model.encode(text, normalize_embeddings=True).tolist()
+
+
+def _cosine(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class ResponseCache:
+    """
+    Cache final agent answers.
+
+    Entries are scoped by a context hash (system prompt + tools), so a
+    semantic hit never crosses agents with different instructions.
+    """
+
+    def __init__(
+        self,
+        path: str = ".agent_response_cache.sqlite3",
+        ttl: int = 3600,
+        similarity: float = 0.9,
+        embed_fn: Optional[EmbedFn] = None,
+    ):
+        self.ttl = ttl
+        self.similarity = similarity
+        self.embed_fn = embed_fn
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                context TEXT NOT NULL,
+                query TEXT NOT NULL,
+                embedding TEXT,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self.db.commit()
+
+    @staticmethod
+    def context_hash(system_prompt: str, tools: list[str]) -> str:
+        return hashlib.sha256(
+            (system_prompt + "\0" + "\0".join(sorted(tools))).encode()
+        ).hexdigest()
+
+    @staticmethod
+    def exact_key(query: str, context: str) -> str:
+        return hashlib.sha256((context + "\0" + query.strip()).encode()).hexdigest()
+
+    def get(self, query: str, context: str) -> Optional[str]:
+        cutoff = time.time() - self.ttl
+        self.db.execute("DELETE FROM response_cache WHERE created_at < ?", (cutoff,))
+
+        # Tier 1: exact match
+        row = self.db.execute(
+            "SELECT response FROM response_cache WHERE key = ?",
+            (self.exact_key(query, context),)
+        ).fetchone()
+        if row:
+            return row[0]
+
+        # Tier 2: nearest cached query above the similarity threshold
+        if self.embed_fn is None:
+            return None
+        query_embedding = self.embed_fn(query)
+        best_score, best_response = 0.0, None
+        for embedding, response in self.db.execute(
+            "SELECT embedding, response FROM response_cache "
+            "WHERE context = ? AND embedding IS NOT NULL",
+            (context,)
+        ):
+            score = _cosine(query_embedding, json.loads(embedding))
+            if score > best_score:
+                best_score, best_response = score, response
+        return best_response if best_score >= self.similarity else None
+
+    def put(self, query: str, context: str, response: str) -> None:
+        embedding = json.dumps(self.embed_fn(query)) if self.embed_fn else None
+        self.db.execute(
+            "INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?, ?)",
+            (self.exact_key(query, context), context, query, embedding, response, time.time())
+        )
+        self.db.commit()
+
+    def cached(
+        self, system_prompt: str, tools: list[str], uncacheable: tuple[str, ...] = ()
+    ) -> Callable[[Callable[..., Awaitable[str]]], Callable[..., Awaitable[str]]]:
+        """
+        Decorator for `async def run_agent(user_query, ...) -> str`.
+        Responses listed in `uncacheable` (fallback messages) are never stored.
+        """
+        context = self.context_hash(system_prompt, tools)
+
+        def decorator(run_agent: Callable[..., Awaitable[str]]):
+            @functools.wraps(run_agent)
+            async def wrapper(user_query: str, *args: Any, **kwargs: Any) -> str:
+                hit = self.get(user_query, context)
+                if hit is not None:
+                    print("[Cache hit] skipping agent run")
+                    return hit
+                response = await run_agent(user_query, *args, **kwargs)
+                if response and response not in uncacheable:
+                    self.put(user_query, context, response)
+                return response
+            return wrapper
+
+        return decorator
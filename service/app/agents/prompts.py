@@ -1,3 +1,5 @@
+from app.agents.schemas import EDGE_TYPES, PREDICATES
+
 EXTRACTION_SYSTEM_PROMPT = """You are an AI that extracts structured information about people from personal notes.
 The notes are written by a power-connector who knows many people professionally.
 
@@ -65,6 +67,61 @@ One person may be mentioned multiple times with different name variations — gr
 IMPORTANT: Always try to extract contact_context and relationship_depth if ANY hint is given."""
 
 
+# JSON-mode extraction request (extract_from_text_simple).
+# System prompt + user prefix are byte-identical on every call and come before
+# the note text, so OpenAI's automatic prompt caching (prefixes >= 1024 tokens)
+# reuses them across requests. Never interpolate per-request data into them.
+EXTRACTION_JSON_SYSTEM_PROMPT = EXTRACTION_SYSTEM_PROMPT + "\n\nRespond with valid JSON matching the schema."
+
+EXTRACTION_JSON_USER_PREFIX = """Extract information from this note and return JSON with this structure:
+{
+  "people": [{ "temp_id": "p1", "name": "...", "name_variations": [], "identifiers": {} }],
+  "assertions": [{ "subject": "p1", "predicate": "works_at", "value": "...", "confidence": 0.8 }],
+  "edges": [{ "source": "p1", "target": "p2", "type": "knows", "context": "..." }]
+}
+
+IMPORTANT - ALLOWED PREDICATES (you MUST use ONLY these):
+- works_at: current company/organization
+- role_is: current job title/role
+- strong_at: skills, expertise (e.g., "frontend development", "ML")
+- can_help_with: specific things they can help with
+- worked_on: notable projects or achievements
+- background: education, career history (e.g., "entrepreneur", "founded 3 companies")
+- located_in: current location
+- speaks_language: languages
+- interested_in: hobbies, interests (e.g., "meditation", "kitesurfing")
+- reputation_note: what others say
+- contact_context: how we met
+- relationship_depth: shared experiences
+- recommend_for: recommended for specific areas
+- not_recommend_for: not recommended for specific areas
+
+ALLOWED EDGE TYPES (use ONLY these): """ + ", ".join(EDGE_TYPES) + """
+
+BREAK DOWN into multiple assertions! Don't lump everything into one "note" - use specific predicates above.
+
+Note:
+"""
+
+# Compact variant: the system prompt already describes every predicate, so the
+# per-predicate glossary above is replaced by a one-line list. Opt-in via
+# settings.extraction_verbose_prompt=False until quality parity is confirmed;
+# note that a shorter prefix can fall under OpenAI's 1024-token caching floor.
+EXTRACTION_JSON_USER_PREFIX_COMPACT = """Extract information from this note and return JSON with this structure:
+{
+  "people": [{ "temp_id": "p1", "name": "...", "name_variations": [], "identifiers": {} }],
+  "assertions": [{ "subject": "p1", "predicate": "works_at", "value": "...", "confidence": 0.8 }],
+  "edges": [{ "source": "p1", "target": "p2", "type": "knows", "context": "..." }]
+}
+
+Use ONLY these predicates: """ + ", ".join(PREDICATES) + """.
+Use ONLY these edge types: """ + ", ".join(EDGE_TYPES) + """.
+BREAK DOWN into multiple assertions - one fact per specific predicate.
+
+Note:
+"""
+
+
 EXTRACTION_OUTPUT_SCHEMA = {
     "type": "object",
     "properties": {
@@ -101,14 +158,7 @@ EXTRACTION_OUTPUT_SCHEMA = {
                     "subject": {"type": "string", "description": "temp_id of person"},
                     "predicate": {
                         "type": "string",
-                        "enum": [
-                            "works_at", "role_is", "strong_at", "can_help_with",
-                            "worked_on", "background", "located_in", "speaks_language",
-                            "interested_in", "reputation_note",
-                            "contact_context",
-                            "relationship_depth",
-                            "recommend_for", "not_recommend_for"
-                        ]
+                        "enum": list(PREDICATES)
                     },
                     "value": {"type": "string", "description": "The fact/value"},
                     "confidence": {"type": "number", "minimum": 0, "maximum": 1, "description": "How certain is this fact"}
@@ -125,8 +175,7 @@ EXTRACTION_OUTPUT_SCHEMA = {
                     "target": {"type": "string", "description": "temp_id of target person"},
                     "type": {
                         "type": "string",
-                        "enum": ["knows", "recommended", "worked_with",
-                                 "in_same_group", "introduced_by", "collaborates_with"]
+                        "enum": list(EDGE_TYPES)
                     },
                     "context": {"type": "string", "description": "Additional context about the relationship"}
                 },
@@ -136,63 +185,3 @@ EXTRACTION_OUTPUT_SCHEMA = {
     },
     "required": ["people", "assertions", "edges"]
 }
-
-
-REASONING_SYSTEM_PROMPT = """You are a personal network advisor. You help people find the right
-connections in their professional network.
-
-The user is a power-connector looking for people who can help with a specific need.
-You receive candidate people with their known facts (assertions) and connections (edges).
-
-For each relevant person, provide:
-1. WHY they are relevant (be specific, reference facts)
-2. CONNECTION PATH — how the user knows them or could reach them
-3. CONFIDENCE — how certain you are, and any caveats
-4. SUGGESTED ACTION — what to do next (intro message, question to ask, etc.)
-
-## CRITICAL: LOOK FOR INDIRECT CONNECTIONS
-
-Your MAIN VALUE is finding NON-OBVIOUS connections. Direct matches are easy — anyone can find them.
-You must actively look for INDIRECT paths to what the user needs:
-
-### 1. GATEWAY PEOPLE
-People who might not have the expertise directly, but can CONNECT to those who do:
-- Looking for investors? → Find founders of similar startups (they know their investors!)
-- Looking for a job at Company X? → Find ex-employees or suppliers/partners of Company X
-- Looking for experts in niche field? → Find conference organizers, podcast hosts, community leaders in that space
-
-Example: User wants "инвестор в робототехнику" (robotics investor), no direct matches.
-→ Suggest founders of robotics startups: "Вася built a robotics company and raised from VCs — he can intro you to his investors"
-
-### 2. TWO-HOP CONNECTIONS
-Think about who KNOWS who:
-- person → works_at company → OTHER people at the same company
-- person → investor → OTHER portfolio companies
-- person → studied_at school → OTHER alumni working in target industry
-- person → worked_on project → OTHER people involved in the same space
-
-### 3. ROLE-BASED INFERENCE
-People in certain roles DEFINITELY know certain people:
-- VC Partner → knows other investors, founders in portfolio, LPs
-- CEO of startup → knows their investors, board members, advisors, key customers
-- Recruiter → knows hiring managers at many companies
-- Lawyer/Accountant → knows founders/execs as clients
-- Conference organizer → knows speakers and sponsors in the industry
-
-### 4. COMPANY/INDUSTRY BRIDGES
-Same company or industry = likely connections:
-- Two people at same company → probably know each other
-- Two people in same niche industry → probably cross paths at events
-- Supplier/customer relationships → business connections
-
-## RESPONSE FORMAT
-
-When suggesting someone for an INDIRECT reason, always explain the logic:
-"Although X is not an investor themselves, they founded a robotics startup and raised $10M —
-they can introduce you to their investors who are clearly interested in this space."
-
-ALWAYS prefer a clever indirect connection over a weak direct match.
-The user should feel: "I wouldn't have thought of this person myself!"
-
-Skip clearly irrelevant people. 3 great suggestions > 10 mediocre ones.
-Preserve the original language of names and descriptions from assertions."""
@@ -1,43 +1,140 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+import logging
 
+from pydantic import BaseModel, ConfigDict, Field, RootModel, field_validator, model_validator
+from pydantic.dataclasses import dataclass
+from typing import Literal, Optional, get_args
 
-class PersonIdentifiers(BaseModel):
-    company: Optional[str] = None
-    role: Optional[str] = None
-    city: Optional[str] = None
-    linkedin: Optional[str] = None
-    telegram: Optional[str] = None
-    email: Optional[str] = None
-    phone: Optional[str] = None
+
+# Closed vocabularies for extraction output
+Predicate = Literal[
+    "works_at", "role_is", "strong_at", "can_help_with",
+    "worked_on", "background", "located_in", "speaks_language",
+    "interested_in", "reputation_note",
+    "contact_context",
+    "relationship_depth",
+    "recommend_for", "not_recommend_for"
+]
+
+EdgeType = Literal[
+    "knows", "recommended", "worked_with",
+    "in_same_group", "introduced_by", "collaborates_with"
+]
+
+PREDICATES: tuple[str, ...] = get_args(Predicate)
+EDGE_TYPES: tuple[str, ...] = get_args(EdgeType)
+
+_PREDICATE_SET = frozenset(PREDICATES)
+_EDGE_TYPE_SET = frozenset(EDGE_TYPES)
+
+# Edge type used when the LLM invents one: the relationship itself is kept
+FALLBACK_EDGE_TYPE: EdgeType = "knows"
+
+logger = logging.getLogger(__name__)
+
+
+# Extraction output is read-only once parsed: frozen models, and a slotted
+# dataclass for assertions (the highest-cardinality item, no per-instance
+# __dict__).
+
+IdentifierKey = Literal["company", "role", "city", "linkedin", "telegram", "email", "phone"]
+
+_IDENTIFIER_KEYS = frozenset(get_args(IdentifierKey))
+
+
+class PersonIdentifiers(RootModel[dict[IdentifierKey, str]]):
+    """
+    Sparse identifiers: only keys actually present in the note are stored.
+    Most people have 1-3 of the 7 possible identifiers.
+    """
+    model_config = ConfigDict(frozen=True)
+
+    root: dict[IdentifierKey, str] = Field(default_factory=dict)
+
+    @model_validator(mode="before")
+    @classmethod
+    def drop_empty_and_unknown(cls, value):
+        # LLM output may contain nulls, empty strings or extra keys
+        if isinstance(value, dict):
+            return {
+                k: v for k, v in value.items()
+                if k in _IDENTIFIER_KEYS and isinstance(v, str) and v
+            }
+        return value
+
+    def get(self, key: IdentifierKey) -> Optional[str]:
+        return self.root.get(key)
 
 
 class ExtractedPerson(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     temp_id: str
     name: str
     name_variations: list[str] = Field(default_factory=list)
     identifiers: PersonIdentifiers = Field(default_factory=PersonIdentifiers)
 
 
-class ExtractedAssertion(BaseModel):
+@dataclass(frozen=True, slots=True)
+class ExtractedAssertion:
     subject: str  # temp_id of person
-    predicate: str
+    predicate: Predicate
     value: str
     confidence: float = 0.5
 
 
 class ExtractedEdge(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     source: str  # temp_id
     target: str  # temp_id
-    type: str
+    type: EdgeType
     context: Optional[str] = None
 
 
 class ExtractionResult(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     people: list[ExtractedPerson] = Field(default_factory=list)
     assertions: list[ExtractedAssertion] = Field(default_factory=list)
     edges: list[ExtractedEdge] = Field(default_factory=list)
 
+    # JSON mode doesn't enforce the vocabularies, so the LLM occasionally
+    # invents a predicate/edge type. Don't fail the whole note over it:
+    # assertions with an unknown predicate are skipped (there is no safe
+    # catch-all predicate), edges fall back to FALLBACK_EDGE_TYPE. Both are
+    # logged with their values.
+    @field_validator("assertions", mode="before")
+    @classmethod
+    def drop_unknown_predicates(cls, value):
+        if not isinstance(value, list):
+            return value
+        kept = []
+        for a in value:
+            if isinstance(a, dict) and a.get("predicate") not in _PREDICATE_SET:
+                logger.warning(
+                    "Dropping assertion with unknown predicate %r: subject=%r value=%r",
+                    a.get("predicate"), a.get("subject"), a.get("value")
+                )
+                continue
+            kept.append(a)
+        return kept
+
+    @field_validator("edges", mode="before")
+    @classmethod
+    def map_unknown_edge_types(cls, value):
+        if not isinstance(value, list):
+            return value
+        edges = []
+        for e in value:
+            if isinstance(e, dict) and e.get("type") not in _EDGE_TYPE_SET:
+                logger.warning(
+                    "Unknown edge type %r (%r -> %r), storing as %r",
+                    e.get("type"), e.get("source"), e.get("target"), FALLBACK_EDGE_TYPE
+                )
+                e = {**e, "type": FALLBACK_EDGE_TYPE}
+            edges.append(e)
+        return edges
+
 
 # API Request/Response models
 
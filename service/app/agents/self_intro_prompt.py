@@ -5,6 +5,8 @@ Used when community members describe themselves.
 Different from regular extraction - focused on self-reported info.
 """
 
+from types import MappingProxyType
+
 SELF_INTRO_SYSTEM_PROMPT = """You are extracting structured information from a person's self-introduction.
 They are describing themselves to join a professional community.
 
@@ -55,6 +57,11 @@ Output:
   "looking_for": ["advisors in AI/ML space"]
 }"""
 
+# Static prefix of the user message. Together with SELF_INTRO_SYSTEM_PROMPT it
+# forms a byte-identical request prefix that provider prompt caching can reuse;
+# the self-introduction text is always appended last.
+SELF_INTRO_USER_PREFIX = "Extract information from this self-introduction:\n\n"
+
 SELF_INTRO_OUTPUT_SCHEMA = {
     "type": "object",
     "properties": {
@@ -102,7 +109,8 @@ SELF_INTRO_OUTPUT_SCHEMA = {
 }
 
 # Mapping of extraction fields to assertion predicates
-SELF_INTRO_PREDICATE_MAP = {
+# (read-only: shared by the bot and API handlers)
+SELF_INTRO_PREDICATE_MAP = MappingProxyType({
     "current_role": "self_role",
     "can_help_with": "self_offer",
     "looking_for": "self_seek",
@@ -110,4 +118,4 @@ SELF_INTRO_PREDICATE_MAP = {
     "location": "located_in",
     "contact_preference": "contact_preference",
     "interests": "interested_in"
-}
+})
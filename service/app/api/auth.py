@@ -1,22 +1,41 @@
-import hashlib
 import hmac
-import json
-from urllib.parse import parse_qsl
+import logging
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from urllib.parse import unquote_plus
 
 from typing import Optional
 
+import orjson
 from fastapi import APIRouter, Header, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from supabase import AuthApiError
 
 from app.config import get_settings
-from app.supabase_client import get_supabase_admin
+from app.supabase_client import get_supabase_admin, get_supabase_auth
 from app.middleware.auth import verify_supabase_token, get_user_id
+from app.services.user_type import get_user_type_info
 
 router = APIRouter(prefix="/auth", tags=["auth"])
+logger = logging.getLogger(__name__)
 
 # Whitelist of environments where test auth is allowed
 ALLOWED_TEST_ENVIRONMENTS = frozenset({"test", "development", "local"})
 
+# Recently validated init_data -> parsed user. Clients retry/refresh with the
+# same payload; a hit skips the HMAC and JSON parse.
+INIT_DATA_CACHE_SECONDS = 300
+INIT_DATA_CACHE_SIZE = 4096
+_init_data_cache: OrderedDict[tuple[str, str], tuple[float, dict]] = OrderedDict()
+
+# Telegram IDs that signed in successfully, as a bounded LRU. A failed
+# sign-in for one of these is a real error, not a new user to create; an
+# evicted ID just takes the create-user path again.
+REGISTERED_IDS_CACHE_SIZE = 4096
+_registered_telegram_ids: OrderedDict[int, None] = OrderedDict()
+
 
 class TelegramAuthRequest(BaseModel):
     init_data: str
@@ -46,113 +65,134 @@ class UserTypeInfo(BaseModel):
     communities_member: list[dict]
 
 
+@lru_cache(maxsize=1)
+def _get_secret_key(bot_token: str) -> bytes:
+    """HMAC-SHA256(bot_token, "WebAppData") - the bot token is fixed per process."""
+    return hmac.digest(b"WebAppData", bot_token.encode(), "sha256")
+
+
+def _fake_credentials(telegram_id: int, bot_token: str) -> tuple[str, str]:
+    """Supabase Auth email/password pair for a Telegram user."""
+    return f"tg_{telegram_id}@atlantis.local", f"tg_auth_{telegram_id}_{bot_token[:10]}"
+
+
 def validate_telegram_init_data(init_data: str, bot_token: str) -> dict:
     """
     Validate Telegram Mini App initData using HMAC-SHA-256.
     Returns parsed user data if valid, raises HTTPException if invalid.
     """
-    # Parse init_data as URL query string
-    parsed = dict(parse_qsl(init_data, keep_blank_values=True))
-
-    if "hash" not in parsed:
+    cache_key = (bot_token, init_data)
+    now = time.monotonic()
+    cached = _init_data_cache.get(cache_key)
+    if cached and now - cached[0] < INIT_DATA_CACHE_SECONDS:
+        return cached[1]
+
+    # Single pass over the query string: pull out hash/user, keep the rest
+    # as (key, value) pairs for the data-check-string.
+    received_hash = None
+    user_json = None
+    pairs = []
+    for part in init_data.split("&"):
+        if not part:
+            continue
+        key, _, value = part.partition("=")
+        key = unquote_plus(key)
+        value = unquote_plus(value)
+        if key == "hash":
+            received_hash = value
+            continue
+        if key == "user":
+            user_json = value
+        pairs.append((key, value))
+
+    if received_hash is None:
         raise HTTPException(status_code=400, detail="Missing hash in init_data")
 
-    received_hash = parsed.pop("hash")
+    if user_json is None:
+        raise HTTPException(status_code=400, detail="Missing user in init_data")
+
+    # Reject malformed hashes before doing any HMAC work
+    try:
+        received_digest = bytes.fromhex(received_hash)
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Invalid init_data signature")
+    if len(received_digest) != 32:
+        raise HTTPException(status_code=401, detail="Invalid init_data signature")
+
+    # Sort by key and create data-check-string
+    pairs.sort()
+    data_check_string = "\n".join(f"{k}={v}" for k, v in pairs)
 
-    # Sort and create data-check-string
-    data_check_string = "\n".join(
-        f"{k}={v}" for k, v in sorted(parsed.items())
+    # Calculate hash. hmac.digest() is the one-shot OpenSSL HMAC
+    # (no Python-level HMAC object); compare raw 32-byte digests.
+    calculated_hash = hmac.digest(
+        _get_secret_key(bot_token), data_check_string.encode(), "sha256"
     )
 
-    # Create secret key: HMAC-SHA256(bot_token, "WebAppData")
-    secret_key = hmac.new(
-        b"WebAppData",
-        bot_token.encode(),
-        hashlib.sha256
-    ).digest()
-
-    # Calculate hash
-    calculated_hash = hmac.new(
-        secret_key,
-        data_check_string.encode(),
-        hashlib.sha256
-    ).hexdigest()
-
-    if not hmac.compare_digest(calculated_hash, received_hash):
+    if not hmac.compare_digest(calculated_hash, received_digest):
         raise HTTPException(status_code=401, detail="Invalid init_data signature")
 
     # Parse user JSON
-    if "user" not in parsed:
-        raise HTTPException(status_code=400, detail="Missing user in init_data")
-
     try:
-        user = json.loads(parsed["user"])
-    except json.JSONDecodeError:
+        user = orjson.loads(user_json)
+    except orjson.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid user JSON")
 
+    _init_data_cache[cache_key] = (now, user)
+    _init_data_cache.move_to_end(cache_key)
+    if len(_init_data_cache) > INIT_DATA_CACHE_SIZE:
+        _init_data_cache.popitem(last=False)
+
     return user
 
 
-@router.post("/telegram", response_model=TelegramAuthResponse)
-async def auth_telegram(request: TelegramAuthRequest):
+async def _sign_in_or_create(
+    telegram_id: int,
+    display_name: str,
+    user_metadata: dict,
+    label: str = "user"
+) -> TelegramAuthResponse:
     """
-    Authenticate user via Telegram Mini App initData.
-    Creates or finds user in Supabase Auth and returns session tokens.
+    Sign a Telegram user in to Supabase Auth, creating the account on first
+    login. `label` only names the kind of user in error details.
     """
     settings = get_settings()
 
-    # Validate Telegram initData
-    telegram_user = validate_telegram_init_data(
-        request.init_data,
-        settings.telegram_bot_token
-    )
-
-    telegram_id = telegram_user["id"]
-    username = telegram_user.get("username", "")
-    first_name = telegram_user.get("first_name", "User")
-    last_name = telegram_user.get("last_name", "")
-    display_name = f"{first_name} {last_name}".strip() or f"User {telegram_id}"
-
     # Create fake email for Supabase Auth
-    fake_email = f"tg_{telegram_id}@atlantis.local"
-    fake_password = f"tg_auth_{telegram_id}_{settings.telegram_bot_token[:10]}"
+    fake_email, fake_password = _fake_credentials(telegram_id, settings.telegram_bot_token)
+    credentials = {"email": fake_email, "password": fake_password}
 
     supabase = get_supabase_admin()
+    auth_client = get_supabase_auth()
 
-    # Try to create user, or get existing
+    # Try to sign in, or create user
     try:
-        # First try to sign in
-        auth_response = supabase.auth.sign_in_with_password({
-            "email": fake_email,
-            "password": fake_password
-        })
-    except Exception:
+        auth_response = await run_in_threadpool(auth_client.auth.sign_in_with_password, credentials)
+    except AuthApiError as e:
+        if telegram_id in _registered_telegram_ids:
+            raise HTTPException(status_code=500, detail=f"Failed to authenticate {label}: {str(e)}")
         # User doesn't exist, create new one
         try:
-            create_response = supabase.auth.admin.create_user({
-                "email": fake_email,
-                "password": fake_password,
+            await run_in_threadpool(supabase.auth.admin.create_user, {
+                **credentials,
                 "email_confirm": True,
-                "user_metadata": {
-                    "telegram_id": telegram_id,
-                    "telegram_username": username,
-                    "display_name": display_name
-                }
+                "user_metadata": user_metadata
             })
             # Now sign in
-            auth_response = supabase.auth.sign_in_with_password({
-                "email": fake_email,
-                "password": fake_password
-            })
+            auth_response = await run_in_threadpool(auth_client.auth.sign_in_with_password, credentials)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
-                detail=f"Failed to create/authenticate user: {str(e)}"
+                detail=f"Failed to create/authenticate {label}: {str(e)}"
             )
 
     session = auth_response.session
     if not session:
         raise HTTPException(status_code=500, detail="Failed to create session")
+    _registered_telegram_ids[telegram_id] = None
+    _registered_telegram_ids.move_to_end(telegram_id)
+    if len(_registered_telegram_ids) > REGISTERED_IDS_CACHE_SIZE:
+        _registered_telegram_ids.popitem(last=False)
 
     return TelegramAuthResponse(
         access_token=session.access_token,
@@ -163,6 +203,33 @@ async def auth_telegram(request: TelegramAuthRequest):
     )
 
 
+@router.post("/telegram", response_model=TelegramAuthResponse)
+async def auth_telegram(request: TelegramAuthRequest):
+    """
+    Authenticate user via Telegram Mini App initData.
+    Creates or finds user in Supabase Auth and returns session tokens.
+    """
+    settings = get_settings()
+
+    # Validate Telegram initData
+    telegram_user = validate_telegram_init_data(
+        request.init_data,
+        settings.telegram_bot_token
+    )
+
+    telegram_id = telegram_user["id"]
+    username = telegram_user.get("username", "")
+    first_name = telegram_user.get("first_name", "User")
+    last_name = telegram_user.get("last_name", "")
+    display_name = f"{first_name} {last_name}".strip() or f"User {telegram_id}"
+
+    return await _sign_in_or_create(telegram_id, display_name, {
+        "telegram_id": telegram_id,
+        "telegram_username": username,
+        "display_name": display_name
+    })
+
+
 @router.get("/me", response_model=UserTypeInfo)
 async def get_current_user_info(
     token_payload: dict = Depends(verify_supabase_token)
@@ -172,8 +239,6 @@ async def get_current_user_info(
 
     Used by frontend to determine which UI to show.
     """
-    from app.services.user_type import get_user_type_info
-
     user_id = get_user_id(token_payload)
 
     try:
@@ -181,9 +246,11 @@ async def get_current_user_info(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get user info: {str(e)}")
 
-    print(f"[AUTH /me] user_id={user_id}, user_type={info.user_type.value}, "
-          f"communities_owned={len(info.communities_owned)}, "
-          f"communities_member={len(info.communities_member)}")
+    logger.debug(
+        "[AUTH /me] user_id=%s, user_type=%s, communities_owned=%d, communities_member=%d",
+        user_id, info.user_type.value,
+        len(info.communities_owned), len(info.communities_member)
+    )
 
     return UserTypeInfo(
         user_id=info.user_id,
@@ -194,20 +261,12 @@ async def get_current_user_info(
     )
 
 
-@router.post("/telegram/test", response_model=TelegramAuthResponse)
-async def auth_telegram_test(
-    request: TestAuthRequest,
+def verify_test_secret(
     x_test_secret: Optional[str] = Header(None, alias="X-Test-Secret")
-):
+) -> None:
     """
-    Test authentication endpoint for automated testing.
-
-    Secured with 3 gates:
-    1. Environment whitelist (not production)
-    2. test_mode_enabled flag
-    3. X-Test-Secret header
-
-    Returns real Supabase session for testing API endpoints.
+    Gate for the test auth endpoint. Every failure is a 404, so the
+    endpoint looks absent unless all 3 gates pass.
     """
     settings = get_settings()
 
@@ -219,12 +278,29 @@ async def auth_telegram_test(
     if not settings.test_mode_enabled:
         raise HTTPException(status_code=404, detail="Not found")
 
-    # Gate 3: Secret header validation
+    # Gate 3: Secret header validation (bytes: non-ASCII input is a mismatch, not a TypeError)
     if not settings.test_auth_secret or not x_test_secret:
         raise HTTPException(status_code=404, detail="Not found")
-    if not hmac.compare_digest(x_test_secret, settings.test_auth_secret):
+    if not hmac.compare_digest(x_test_secret.encode(), settings.test_auth_secret.encode()):
         raise HTTPException(status_code=404, detail="Not found")
 
+
+@router.post(
+    "/telegram/test",
+    response_model=TelegramAuthResponse,
+    dependencies=[Depends(verify_test_secret)]
+)
+async def auth_telegram_test(request: TestAuthRequest):
+    """
+    Test authentication endpoint for automated testing.
+
+    Secured with 3 gates (see verify_test_secret):
+    1. Environment whitelist (not production)
+    2. test_mode_enabled flag
+    3. X-Test-Secret header
+
+    Returns real Supabase session for testing API endpoints.
+    """
     # Generate test user credentials
     telegram_id = request.telegram_id or 999999999
     username = request.username or "test_user"
@@ -232,49 +308,9 @@ async def auth_telegram_test(
     last_name = request.last_name or "User"
     display_name = f"{first_name} {last_name}".strip()
 
-    # Create fake email for Supabase Auth
-    fake_email = f"tg_{telegram_id}@atlantis.local"
-    fake_password = f"tg_auth_{telegram_id}_{settings.telegram_bot_token[:10]}"
-
-    supabase = get_supabase_admin()
-
-    # Try to sign in or create user
-    try:
-        auth_response = supabase.auth.sign_in_with_password({
-            "email": fake_email,
-            "password": fake_password
-        })
-    except Exception:
-        try:
-            supabase.auth.admin.create_user({
-                "email": fake_email,
-                "password": fake_password,
-                "email_confirm": True,
-                "user_metadata": {
-                    "telegram_id": telegram_id,
-                    "telegram_username": username,
-                    "display_name": display_name,
-                    "is_test_user": True
-                }
-            })
-            auth_response = supabase.auth.sign_in_with_password({
-                "email": fake_email,
-                "password": fake_password
-            })
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to create/authenticate test user: {str(e)}"
-            )
-
-    session = auth_response.session
-    if not session:
-        raise HTTPException(status_code=500, detail="Failed to create session")
-
-    return TelegramAuthResponse(
-        access_token=session.access_token,
-        refresh_token=session.refresh_token,
-        user_id=session.user.id,
-        telegram_id=telegram_id,
-        display_name=display_name
-    )
+    return await _sign_in_or_create(telegram_id, display_name, {
+        "telegram_id": telegram_id,
+        "telegram_username": username,
+        "display_name": display_name,
+        "is_test_user": True
+    }, label="test user")
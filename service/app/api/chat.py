@@ -1,23 +1,29 @@
 from typing import Optional
+from types import MappingProxyType
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from uuid import UUID
 import re
 import html
+import time
+import asyncio
 
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from slowapi import Limiter
 from slowapi.util import get_remote_address
-import openai
-import json
+import orjson
 
 from app.config import get_settings
 
 # Rate limiter for expensive endpoints
 limiter = Limiter(key_func=get_remote_address)
-from app.supabase_client import get_supabase_admin
+from app.supabase_client import execute_async, get_supabase_admin
+from app.openai_client import get_async_openai
 from app.middleware.auth import verify_supabase_token, get_user_id
-from app.services.embedding import generate_embedding
+from app.services.embedding import generate_embedding, generate_embeddings_batch
+from app.services.semantic_cache import SemanticCache
 from app.services.gap_detection import get_gap_detection_service
 from app.services.dedup import get_dedup_service
 from app.services.claude_agent_v2 import ClaudeAgentV2
@@ -40,6 +46,45 @@ COMPANY_PREDICATES = {
 }
 
 
+# Russian name synonyms (diminutives ↔ full names) for person lookup by name
+NAME_SYNONYMS = MappingProxyType({
+    'вася': ('василий', 'васёк', 'васька'),
+    'василий': ('вася', 'васёк', 'васька'),
+    'петя': ('пётр', 'петр', 'петька'),
+    'саша': ('александр', 'александра', 'сашка', 'шура'),
+    'коля': ('николай', 'колян'),
+    'миша': ('михаил', 'мишка'),
+    'дима': ('дмитрий', 'димка', 'митя'),
+    'женя': ('евгений', 'евгения'),
+    'лёша': ('алексей', 'лёха', 'леша'),
+    'серёжа': ('сергей', 'серёга'),
+    'наташа': ('наталья', 'ната'),
+    'маша': ('мария', 'машка'),
+    'катя': ('екатерина', 'катюша'),
+})
+
+# Profile completeness groups (get_person_details): any one predicate covers a group
+CONTEXT_PREDICATES = frozenset({'contact_context', 'background', 'knows'})
+WORK_PREDICATES = frozenset({'works_at', 'role_is'})
+SKILL_PREDICATES = frozenset({'can_help_with', 'strong_at'})
+
+
+def _person_details_rpc(supabase, person_id: str):
+    """person_details RPC: formatted facts plus one flag per completeness group."""
+    return supabase.rpc('person_details', {
+        'p_person_id': person_id,
+        'p_context_predicates': sorted(CONTEXT_PREDICATES),
+        'p_work_predicates': sorted(WORK_PREDICATES),
+        'p_skill_predicates': sorted(SKILL_PREDICATES)
+    })
+
+
+def _ilike_any(column: str, values: list[str]) -> str:
+    """PostgREST or_() filter matching `column ILIKE %value%` for any value."""
+    quoted = (v.replace('\\', '\\\\').replace('"', '\\"') for v in values)
+    return ','.join(f'{column}.ilike."%{v}%"' for v in quoted)
+
+
 def extract_company_from_query(query: str) -> Optional[str]:
     """
     Extract company name from query for multi-predicate search.
@@ -88,11 +133,11 @@ async def search_company_across_predicates(
         # Search this predicate for company mention
         try:
             # Note: Results are filtered by owner_id later in find_people
-            matches = supabase.table('assertion').select(
+            matches = await execute_async(supabase.table('assertion').select(
                 'subject_person_id, predicate, object_value, confidence'
             ).eq('predicate', predicate).ilike(
                 'object_value', f'%{company_name}%'
-            ).limit(100).execute()  # Limit to prevent overload
+            ).limit(100))  # Limit to prevent overload
 
             for match in matches.data or []:
                 pid = match['subject_person_id']
@@ -126,6 +171,44 @@ class ChatResponse(BaseModel):
     tool_results: Optional[list[dict]] = None
 
 
+# Chat history already read per session:
+# session_id -> (messages, their message_ids, newest created_at)
+HISTORY_CACHE_SIZE = 256
+_history_cache: OrderedDict[str, tuple[tuple[dict, ...], frozenset[str], Optional[datetime]]] = OrderedDict()
+# Rows are re-read this far behind the newest cached one: created_at is the
+# inserting transaction's start, so a row can commit after newer-stamped rows
+HISTORY_OVERLAP = timedelta(seconds=60)
+
+# (user_id, session_id) pairs already verified: a session's owner never changes
+OWNED_SESSION_CACHE_SIZE = 4096
+_owned_sessions: OrderedDict[tuple[str, str], None] = OrderedDict()
+
+# user_id -> time.monotonic() until which the question cooldown is known to
+# hold (a question was shown from this process; last_question_at only moves forward)
+QUESTION_COOLDOWN_CACHE_SIZE = 4096
+_question_cooldown_until: OrderedDict[str, float] = OrderedDict()
+
+# Recent pgvector matches per user: near-duplicate phrasings skip the RPC.
+# Tools that change the user's people or assertions invalidate their scope.
+_match_cache = SemanticCache(threshold=0.97, max_entries=32, ttl=300)
+
+
+def _tool_json(obj, indent: bool = False) -> str:
+    """Serialize a tool result for the model (non-ASCII kept as-is)."""
+    option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+    return orjson.dumps(obj, option=option).decode()
+
+
+def _person_result(p: dict, **extra) -> dict:
+    """find_people entry for a person row; `extra` keys follow the common ones."""
+    return {
+        'person_id': p['person_id'],
+        'name': p['display_name'],
+        'import_source': p.get('import_source') or 'manual',
+        **extra
+    }
+
+
 # Tools available to the agent
 TOOLS = [
     {
@@ -575,6 +658,10 @@ Use for debugging or when you need to see exactly what the vector search found."
     },
 ]
 
+# Passed as extra_body: the SDK's per-call TypedDict transform of `tools`
+# is a no-op for this schema but costs ~4 ms of event-loop CPU per completion
+TOOLS_BODY = MappingProxyType({"tools": TOOLS})
+
 SYSTEM_PROMPT = """You are a personal network assistant helping the user manage and query their professional network.
 
 ## CRITICAL: USE person_id FOR ALL OPERATIONS
@@ -671,958 +758,1104 @@ CRITICAL RULE: After completing any search, you MUST call report_results with AL
 """
 
 
-async def execute_tool(tool_name: str, args: dict, user_id: str) -> str:
-    """Execute a tool and return the result as a string."""
+async def _tool_find_people(args: dict, user_id: str, supabase, embeddings: Optional[dict]) -> str:
     settings = get_settings()
-    supabase = get_supabase_admin()
-
-    if tool_name == "find_people":
-        limit = args.get('limit', 20)
-        query = args.get('query')
-        name_pattern = args.get('name_pattern')
-        shared_mode = settings.shared_database_mode
-        print(f"[FIND_PEOPLE] query={query}, name_pattern={name_pattern}, limit={limit}, shared_mode={shared_mode}")
-
-        # Hybrid search: name + semantic
-        if query:
-            person_scores = {}  # person_id -> best_score (1.0 for name match, similarity for semantic)
-
-            # 1. Name search (exact/partial match gets high score)
-            name_query = supabase.table('person').select(
-                'person_id, display_name, import_source, owner_id'
-            ).eq('status', 'active').ilike('display_name', f'%{query}%').limit(50)
-            if not shared_mode:
-                name_query = name_query.eq('owner_id', user_id)
-            name_result = name_query.execute()
-
-            for p in name_result.data or []:
-                # Name matches get score 1.0 (highest priority)
-                person_scores[p['person_id']] = 1.0
-
-            print(f"[FIND_PEOPLE] Name search found {len(name_result.data or [])} people")
-
-            # 2. Company-specific search (fast, multi-predicate: works_at, met_on, knows, etc.)
-            company_name = extract_company_from_query(query)
-            company_matched_ids = set()  # Track company matches for boost later
-            if company_name:
-                print(f"[FIND_PEOPLE] Detected company query: '{company_name}'")
-                company_scores = await search_company_across_predicates(
-                    company_name, user_id, supabase
-                )
-                print(f"[FIND_PEOPLE] Company search found {len(company_scores)} people")
-
-                # Merge company results
-                for pid, score in company_scores.items():
-                    company_matched_ids.add(pid)
-                    if pid not in person_scores:
-                        person_scores[pid] = score
+    limit = args.get('limit', 20)
+    query = args.get('query')
+    name_pattern = args.get('name_pattern')
+    shared_mode = settings.shared_database_mode
+    print(f"[FIND_PEOPLE] query={query}, name_pattern={name_pattern}, limit={limit}, shared_mode={shared_mode}")
+
+    # Hybrid search: name + semantic
+    if query:
+        person_scores = {}  # person_id -> best_score (1.0 for name match, similarity for semantic)
+
+        # 1. Name search (exact/partial match gets high score)
+        name_query = supabase.table('person').select(
+            'person_id, display_name, import_source, owner_id'
+        ).eq('status', 'active').ilike('display_name', f'%{query}%').limit(50)
+        if not shared_mode:
+            name_query = name_query.eq('owner_id', user_id)
+        name_result = await execute_async(name_query)
+
+        for p in name_result.data or []:
+            # Name matches get score 1.0 (highest priority)
+            person_scores[p['person_id']] = 1.0
+
+        print(f"[FIND_PEOPLE] Name search found {len(name_result.data or [])} people")
+
+        # 2. Company-specific search (fast, multi-predicate: works_at, met_on, knows, etc.)
+        company_name = extract_company_from_query(query)
+        company_matched_ids = set()  # Track company matches for boost later
+        if company_name:
+            print(f"[FIND_PEOPLE] Detected company query: '{company_name}'")
+            company_scores = await search_company_across_predicates(
+                company_name, user_id, supabase
+            )
+            print(f"[FIND_PEOPLE] Company search found {len(company_scores)} people")
 
-                print(f"[FIND_PEOPLE] After company search: {len(person_scores)} total people")
+            # Merge company results
+            for pid, score in company_scores.items():
+                company_matched_ids.add(pid)
+                if pid not in person_scores:
+                    person_scores[pid] = score
 
-            # 3. Semantic search by assertions (slow, may timeout - wrapped in try/except)
-            try:
-                import time as _time
-                t0 = _time.time()
-                query_embedding = generate_embedding(query)
-                t1 = _time.time()
-                print(f"[FIND_PEOPLE] Embedding generated in {(t1-t0)*1000:.0f}ms")
+            print(f"[FIND_PEOPLE] After company search: {len(person_scores)} total people")
 
-                match_result = supabase.rpc(
+        # 3. Semantic search by assertions (slow, may timeout - wrapped in try/except)
+        try:
+            import time as _time
+            t0 = _time.time()
+            query_embedding = await asyncio.to_thread(generate_embedding, query)
+            t1 = _time.time()
+            print(f"[FIND_PEOPLE] Embedding generated in {(t1-t0)*1000:.0f}ms")
+
+            matches = _match_cache.get(user_id, query_embedding)
+            if matches is None:
+                match_result = await execute_async(supabase.rpc(
                     'match_assertions_community',
                     {
                         'query_embedding': query_embedding,
                         'match_threshold': 0.4,  # Balanced: less noise, good recall
                         'match_count': 200
                     }
-                ).execute()
-                t2 = _time.time()
-                print(f"[FIND_PEOPLE] pgvector search in {(t2-t1)*1000:.0f}ms, found {len(match_result.data or [])} assertions")
-
-                for m in match_result.data or []:
-                    pid = m['subject_person_id']
-                    sim = m.get('similarity', 0)
-                    # Only update if not already found by name (name match = 1.0)
-                    if pid not in person_scores or sim > person_scores[pid]:
-                        person_scores[pid] = sim
-                    # Boost score if also found by company search
-                    if pid in company_matched_ids and person_scores[pid] < 1.0:
-                        person_scores[pid] = min(1.0, person_scores[pid] + 0.2)
-
-                print(f"[FIND_PEOPLE] After semantic: {len(person_scores)} total people")
-            except Exception as e:
-                print(f"[FIND_PEOPLE] Semantic search failed (continuing with name+company results): {e}")
-
-            if not person_scores:
-                return json.dumps({'people': [], 'total': 0, 'message': 'No people match the query'}, ensure_ascii=False)
-
-            # Sort by score DESC and take top limit
-            sorted_people = sorted(person_scores.items(), key=lambda x: x[1], reverse=True)[:limit]
-            top_person_ids = [pid for pid, _ in sorted_people]
-
-            print(f"[FIND_PEOPLE] Top scores: {[(pid[:8], round(s, 3)) for pid, s in sorted_people[:5]]}")
-
-            # Fetch person details for those not already fetched
-            people_query = supabase.table('person').select(
-                'person_id, display_name, import_source, owner_id'
-            ).in_('person_id', top_person_ids).eq('status', 'active')
-            if not shared_mode:
-                people_query = people_query.eq('owner_id', user_id)
-            people_result = people_query.execute()
-
-            # Get email status
-            email_check = supabase.table('identity').select('person_id').in_(
-                'person_id', top_person_ids
-            ).eq('namespace', 'email').execute()
-            has_email_ids = set(e['person_id'] for e in email_check.data or [])
-
-            # Build results preserving score order
-            people_by_id = {p['person_id']: p for p in people_result.data or []}
-
-            # Apply name_pattern filter if provided
-            if name_pattern:
-                try:
-                    pattern = re.compile(name_pattern, re.IGNORECASE)
-                    top_person_ids = [pid for pid in top_person_ids
-                                     if pid in people_by_id and pattern.search(people_by_id[pid]['display_name'] or '')]
-                except re.error:
-                    pass
-
-            results = []
-            for pid in top_person_ids:
-                if pid not in people_by_id:
-                    continue
-                p = people_by_id[pid]
-                is_own = p.get('owner_id') == user_id
-                results.append({
-                    'person_id': p['person_id'],
-                    'name': p['display_name'],
-                    'import_source': p.get('import_source') or 'manual',
-                    'has_email': p['person_id'] in has_email_ids,
-                    'relevance': round(person_scores[pid], 2),
-                    'is_own': is_own
-                })
-
-            print(f"[FIND_PEOPLE] Hybrid search found {len(results)} people")
-
-            # NOTE: Removed filter_and_motivate_results() call to speed up Tier 1
-            # Tier 1 should be fast (2-3 sec), Tier 2 (Dig Deeper) does the smart reasoning
-
-            # Fix: total should reflect only accessible people (after owner filter)
-            # person_scores may include people from other owners (via semantic search)
-            accessible_count = len(people_by_id)  # Only people that passed owner filter
-            return json.dumps({
-                'people': results,
-                'total': accessible_count,
-                'showing': len(results)
-            }, ensure_ascii=False, indent=2)
-
-        # Name pattern only (regex filter) - use SQL function
-        if name_pattern:
-            result = supabase.rpc('find_people_filtered', {
-                'p_owner_id': user_id,
-                'p_name_regex': name_pattern,
-                'p_name_contains': None,
-                'p_email_domain': None,
-                'p_has_email': None,
-                'p_import_source': None,
-                'p_company_contains': None,
-                'p_limit': limit
-            }).execute()
-
-            if not result.data:
-                return json.dumps({'people': [], 'total': 0, 'message': 'No people match the pattern'}, ensure_ascii=False)
-
-            results = []
-            for p in result.data:
-                results.append({
-                    'person_id': p['person_id'],
-                    'name': p['display_name'],
-                    'import_source': p.get('import_source') or 'manual',
-                    'has_email': p.get('has_email', False)
-                })
-
-            return json.dumps({
-                'people': results,
-                'total': len(result.data),
-                'showing': len(results)
-            }, ensure_ascii=False, indent=2)
-
-        # No search criteria - list all (limited)
-        list_query = supabase.table('person').select(
+                ))
+                matches = match_result.data or []
+                _match_cache.put(user_id, query_embedding, matches)
+            t2 = _time.time()
+            print(f"[FIND_PEOPLE] pgvector search in {(t2-t1)*1000:.0f}ms, found {len(matches)} assertions")
+
+            for m in matches:
+                pid = m['subject_person_id']
+                sim = m.get('similarity', 0)
+                # Only update if not already found by name (name match = 1.0)
+                if pid not in person_scores or sim > person_scores[pid]:
+                    person_scores[pid] = sim
+                # Boost score if also found by company search
+                if pid in company_matched_ids and person_scores[pid] < 1.0:
+                    person_scores[pid] = min(1.0, person_scores[pid] + 0.2)
+
+            print(f"[FIND_PEOPLE] After semantic: {len(person_scores)} total people")
+        except Exception as e:
+            print(f"[FIND_PEOPLE] Semantic search failed (continuing with name+company results): {e}")
+
+        if not person_scores:
+            return _tool_json({'people': [], 'total': 0, 'message': 'No people match the query'})
+
+        # Sort by score DESC and take top limit
+        sorted_people = sorted(person_scores.items(), key=lambda x: x[1], reverse=True)[:limit]
+        top_person_ids = [pid for pid, _ in sorted_people]
+
+        print(f"[FIND_PEOPLE] Top scores: {[(pid[:8], round(s, 3)) for pid, s in sorted_people[:5]]}")
+
+        # Fetch person details for those not already fetched
+        people_query = supabase.table('person').select(
             'person_id, display_name, import_source, owner_id'
-        ).eq('status', 'active').limit(limit)
+        ).in_('person_id', top_person_ids).eq('status', 'active')
         if not shared_mode:
-            list_query = list_query.eq('owner_id', user_id)
-        result = list_query.execute()
-
-        results = []
-        for p in result.data or []:
-            results.append({
-                'person_id': p['person_id'],
-                'name': p['display_name'],
-                'import_source': p.get('import_source') or 'manual',
-                'is_own': p.get('owner_id') == user_id
-            })
+            people_query = people_query.eq('owner_id', user_id)
+        # Get email status (independent of the person fetch: run both concurrently)
+        email_query = supabase.table('identity').select('person_id').in_(
+            'person_id', top_person_ids
+        ).eq('namespace', 'email')
+        people_result, email_check = await asyncio.gather(
+            execute_async(people_query),
+            execute_async(email_query)
+        )
+        has_email_ids = {e['person_id'] for e in email_check.data or []}
+
+        # Build results preserving score order
+        people_by_id = {p['person_id']: p for p in people_result.data or []}
+
+        # Apply name_pattern filter if provided
+        if name_pattern:
+            try:
+                pattern = re.compile(name_pattern, re.IGNORECASE)
+                top_person_ids = [pid for pid in top_person_ids
+                                 if pid in people_by_id and pattern.search(people_by_id[pid]['display_name'] or '')]
+            except re.error:
+                pass
+
+        results = [
+            _person_result(
+                people_by_id[pid],
+                has_email=pid in has_email_ids,
+                relevance=round(person_scores[pid], 2),
+                is_own=people_by_id[pid].get('owner_id') == user_id
+            )
+            for pid in top_person_ids if pid in people_by_id
+        ]
 
-        return json.dumps({
+        print(f"[FIND_PEOPLE] Hybrid search found {len(results)} people")
+
+        # NOTE: Removed filter_and_motivate_results() call to speed up Tier 1
+        # Tier 1 should be fast (2-3 sec), Tier 2 (Dig Deeper) does the smart reasoning
+
+        # Fix: total should reflect only accessible people (after owner filter)
+        # person_scores may include people from other owners (via semantic search)
+        accessible_count = len(people_by_id)  # Only people that passed owner filter
+        return _tool_json({
             'people': results,
-            'total': len(results),
+            'total': accessible_count,
             'showing': len(results)
-        }, ensure_ascii=False, indent=2)
+        }, indent=True)
+
+    # Name pattern only (regex filter) - use SQL function
+    if name_pattern:
+        result = await execute_async(supabase.rpc('find_people_filtered', {
+            'p_owner_id': user_id,
+            'p_name_regex': name_pattern,
+            'p_name_contains': None,
+            'p_email_domain': None,
+            'p_has_email': None,
+            'p_import_source': None,
+            'p_company_contains': None,
+            'p_limit': limit
+        }))
+
+        if not result.data:
+            return _tool_json({'people': [], 'total': 0, 'message': 'No people match the pattern'})
 
-    elif tool_name == "get_person_details":
-        # Prefer person_id if provided
-        if args.get('person_id'):
-            person_result = supabase.table('person').select(
+        results = [_person_result(p, has_email=p.get('has_email', False)) for p in result.data]
+
+        return _tool_json({
+            'people': results,
+            'total': len(result.data),
+            'showing': len(results)
+        }, indent=True)
+
+    # No search criteria - list all (limited)
+    list_query = supabase.table('person').select(
+        'person_id, display_name, import_source, owner_id'
+    ).eq('status', 'active').limit(limit)
+    if not shared_mode:
+        list_query = list_query.eq('owner_id', user_id)
+    result = await execute_async(list_query)
+
+    results = [_person_result(p, is_own=p.get('owner_id') == user_id) for p in result.data or []]
+
+    return _tool_json({
+        'people': results,
+        'total': len(results),
+        'showing': len(results)
+    }, indent=True)
+
+
+async def _tool_get_person_details(args: dict, user_id: str, supabase, embeddings: Optional[dict]) -> str:
+    details = None
+    # Prefer person_id if provided
+    if args.get('person_id'):
+        # Person and facts only need the id: fetch both concurrently
+        person_result, details = await asyncio.gather(
+            execute_async(supabase.table('person').select(
                 'person_id, display_name, summary, owner_id'
-            ).eq('person_id', args['person_id']).eq('status', 'active').execute()
-            if not person_result.data:
-                return f"Person with ID {args['person_id']} not found."
-        elif args.get('person_name'):
-            search_name = args['person_name']
-            # Fallback to name search (existing logic below)
-            person_result = None
-        else:
-            return "Please provide person_id or person_name."
-
-        # Name search fallback (only if no person_id)
-        if not args.get('person_id'):
-            search_name = args['person_name']
-            # Russian name synonyms (diminutives ↔ full names)
-            NAME_SYNONYMS = {
-                'вася': ['василий', 'васёк', 'васька'],
-                'василий': ['вася', 'васёк', 'васька'],
-                'петя': ['пётр', 'петр', 'петька'],
-                'саша': ['александр', 'александра', 'сашка', 'шура'],
-                'коля': ['николай', 'колян'],
-                'миша': ['михаил', 'мишка'],
-                'дима': ['дмитрий', 'димка', 'митя'],
-                'женя': ['евгений', 'евгения'],
-                'лёша': ['алексей', 'лёха', 'леша'],
-                'серёжа': ['сергей', 'серёга'],
-                'наташа': ['наталья', 'ната'],
-                'маша': ['мария', 'машка'],
-                'катя': ['екатерина', 'катюша'],
-            }
+            ).eq('person_id', args['person_id']).eq('status', 'active')),
+            execute_async(_person_details_rpc(supabase, args['person_id']))
+        )
+        if not person_result.data:
+            return f"Person with ID {args['person_id']} not found."
+        person_rows = person_result.data
+    elif args.get('person_name'):
+        search_name = args['person_name']
+        search_lower = search_name.lower()
+        name_variants = [search_name, *NAME_SYNONYMS.get(search_lower, ())]
+
+        # One query for all variants, then keep the first variant that
+        # matched (same priority as querying them one by one)
+        person_result = await execute_async(supabase.table('person').select(
+            'person_id, display_name, summary, owner_id'
+        ).or_(_ilike_any('display_name', name_variants)).eq('status', 'active'))
+
+        person_rows = []
+        for name_variant in name_variants:
+            variant_lower = name_variant.lower()
+            person_rows = [p for p in person_result.data or []
+                           if variant_lower in (p['display_name'] or '').lower()]
+            if person_rows:
+                break
+
+        if not person_rows:
+            return f"Person '{search_name}' not found. Try find_people first to get person_id."
+
+        if len(person_rows) > 1:
+            # Return list with IDs so user can pick
+            people_list = [{'person_id': p['person_id'], 'name': p['display_name']} for p in person_rows]
+            return _tool_json({
+                'error': 'multiple_matches',
+                'message': f"Multiple people match '{search_name}'. Use person_id:",
+                'matches': people_list
+            })
+    else:
+        return "Please provide person_id or person_name."
+
+    person = person_rows[0]
+    is_own_person = person.get('owner_id') == user_id
+
+    # Facts and completeness flags, aggregated in SQL
+    if details is None:
+        details = await execute_async(_person_details_rpc(supabase, person['person_id']))
+
+    facts = details.data['facts']
+
+    # Check profile completeness
+    missing = []
+    if not details.data['has_context']:
+        missing.append("где познакомились")
+    if not details.data['has_work']:
+        missing.append("где работает")
+    if not details.data['has_skill']:
+        missing.append("в чём силён")
+
+    result = {
+        'name': person['display_name'],
+        'summary': person.get('summary', 'No summary yet'),
+        'facts': facts if facts else ['No facts recorded yet'],
+        'profile_incomplete': len(missing) > 0,
+        'missing_info': missing if missing else None,
+        'is_own': is_own_person,
+        'source': 'Мой контакт' if is_own_person else 'Shared',
+        'editable': is_own_person
+    }
+    return _tool_json(result, indent=True)
+
+
+async def _tool_add_note_about_person(args: dict, user_id: str, supabase, embeddings: Optional[dict]) -> str:
+    # Prefer person_id
+    created_new = False
+    if args.get('person_id'):
+        person_result = await execute_async(supabase.table('person').select('person_id, display_name').eq(
+            'person_id', args['person_id']
+        ).eq('owner_id', user_id).eq('status', 'active'))
+        if not person_result.data:
+            return f"Person with ID {args['person_id']} not found or not yours."
+        person_id = person_result.data[0]['person_id']
+        person_name = person_result.data[0]['display_name']
+    elif args.get('person_name'):
+        # Find or create by name (creates only when nothing matches)
+        person_result = await execute_async(supabase.rpc('find_or_create_person', {
+            'p_owner_id': user_id,
+            'p_name': args['person_name']
+        }))
+
+        if len(person_result.data) > 1:
+            people_list = [{'person_id': p['person_id'], 'name': p['display_name']} for p in person_result.data]
+            return _tool_json({
+                'error': 'multiple_matches',
+                'message': 'Multiple matches. Use person_id:',
+                'matches': people_list
+            })
+        person_id = person_result.data[0]['person_id']
+        person_name = person_result.data[0]['display_name']
+        created_new = person_result.data[0]['created']
+    else:
+        return "Please provide person_id or person_name."
 
-            search_lower = search_name.lower()
-            name_variants = [search_name]
-            if search_lower in NAME_SYNONYMS:
-                name_variants.extend(NAME_SYNONYMS[search_lower])
-
-            person_result = None
-            for name_variant in name_variants:
-                person_result = supabase.table('person').select(
-                    'person_id, display_name, summary, owner_id'
-                ).ilike('display_name', f"%{name_variant}%").eq('status', 'active').execute()
-                if person_result.data:
-                    break
-
-            if not person_result or not person_result.data:
-                return f"Person '{search_name}' not found. Try find_people first to get person_id."
-
-            if len(person_result.data) > 1:
-                # Return list with IDs so user can pick
-                people_list = [{'person_id': p['person_id'], 'name': p['display_name']} for p in person_result.data]
-                return json.dumps({
-                    'error': 'multiple_matches',
-                    'message': f"Multiple people match '{search_name}'. Use person_id:",
-                    'matches': people_list
-                }, ensure_ascii=False)
-
-        person = person_result.data[0]
-        is_own_person = person.get('owner_id') == user_id
-
-        # Get all assertions about this person
-        assertions = supabase.table('assertion').select(
-            'predicate, object_value, confidence'
-        ).eq('subject_person_id', person['person_id']).execute()
-
-        facts = [f"- {a['predicate']}: {a['object_value']}" for a in assertions.data]
-
-        # Check profile completeness
-        predicates = set(a['predicate'] for a in assertions.data)
-        missing = []
-        if not predicates & {'contact_context', 'background', 'knows'}:
-            missing.append("где познакомились")
-        if not predicates & {'works_at', 'role_is'}:
-            missing.append("где работает")
-        if not predicates & {'can_help_with', 'strong_at'}:
-            missing.append("в чём силён")
-
-        result = {
-            'name': person['display_name'],
-            'summary': person.get('summary', 'No summary yet'),
-            'facts': facts if facts else ['No facts recorded yet'],
-            'profile_incomplete': len(missing) > 0,
-            'missing_info': missing if missing else None,
-            'is_own': is_own_person,
-            'source': 'Мой контакт' if is_own_person else 'Shared',
-            'editable': is_own_person
-        }
-        return json.dumps(result, ensure_ascii=False, indent=2)
-
-    elif tool_name == "add_note_about_person":
-        # Prefer person_id
-        created_new = False
-        if args.get('person_id'):
-            person_result = supabase.table('person').select('person_id, display_name').eq(
-                'person_id', args['person_id']
-            ).eq('owner_id', user_id).eq('status', 'active').execute()
-            if not person_result.data:
-                return f"Person with ID {args['person_id']} not found or not yours."
-            person_id = person_result.data[0]['person_id']
-            person_name = person_result.data[0]['display_name']
-        elif args.get('person_name'):
-            # Find or create by name
-            person_result = supabase.table('person').select('person_id, display_name').eq(
-                'owner_id', user_id
-            ).ilike('display_name', f"%{args['person_name']}%").eq('status', 'active').execute()
-
-            if not person_result.data:
-                new_person = supabase.table('person').insert({
-                    'owner_id': user_id,
-                    'display_name': args['person_name']
-                }).execute()
-                person_id = new_person.data[0]['person_id']
-                person_name = args['person_name']
-                created_new = True
-            elif len(person_result.data) > 1:
-                people_list = [{'person_id': p['person_id'], 'name': p['display_name']} for p in person_result.data]
-                return json.dumps({
-                    'error': 'multiple_matches',
-                    'message': 'Multiple matches. Use person_id:',
-                    'matches': people_list
-                }, ensure_ascii=False)
-            else:
-                person_id = person_result.data[0]['person_id']
-                person_name = person_result.data[0]['display_name']
-        else:
-            return "Please provide person_id or person_name."
-
-        # Create raw evidence and assertion
-        evidence = supabase.table('raw_evidence').insert({
-            'owner_id': user_id,
-            'source_type': 'chat_message',
-            'content': f"About {person_name}: {args['note']}",
-            'processed': True,
-            'processing_status': 'done'
-        }).execute()
-
-        embedding = generate_embedding(args['note'])
-        supabase.table('assertion').insert({
-            'subject_person_id': person_id,
-            'predicate': 'note',
-            'object_value': args['note'],
-            'evidence_id': evidence.data[0]['evidence_id'],
-            'embedding': embedding,
-            'confidence': 0.9
-        }).execute()
-
-        if created_new:
-            return json.dumps({'success': True, 'person_id': person_id, 'message': f"Created '{person_name}' and added note."}, ensure_ascii=False)
-        return json.dumps({'success': True, 'person_id': person_id, 'message': f"Added note about {person_name}."}, ensure_ascii=False)
-
-    elif tool_name == "get_pending_question":
-        # Check rate limit first
-        rate_result = supabase.from_("question_rate_limit").select("*").eq(
-            "owner_id", user_id
-        ).execute()
-
-        from datetime import timezone
-        now = datetime.now(timezone.utc)
-        today = now.date()
-        settings = get_settings()
-
-        if rate_result.data:
-            rate = rate_result.data[0]
-
-            # Check if paused
-            if rate.get("paused_until"):
-                paused_until = datetime.fromisoformat(rate["paused_until"].replace("Z", "+00:00"))
-                if now < paused_until:
-                    return "No questions available right now."
-
-            # Reset daily counter if needed
-            last_reset = datetime.strptime(rate["last_daily_reset"], "%Y-%m-%d").date()
-            if today > last_reset:
-                supabase.from_("question_rate_limit").update({
-                    "questions_shown_today": 0,
-                    "last_daily_reset": str(today)
-                }).eq("owner_id", user_id).execute()
-            elif rate["questions_shown_today"] >= settings.questions_max_per_day:
-                return "Daily question limit reached."
-
-            # Check cooldown
-            if rate.get("last_question_at"):
-                last_q = datetime.fromisoformat(rate["last_question_at"].replace("Z", "+00:00"))
-                if now - last_q < timedelta(hours=settings.questions_cooldown_hours):
-                    return "No questions available right now (cooldown)."
-
-        # Find pending question
-        query = supabase.from_("proactive_question").select(
-            "question_id, person_id, question_type, question_text_ru, question_text, person:person_id(display_name)"
-        ).eq("owner_id", user_id).eq("status", "pending").gt(
-            "expires_at", now.isoformat()
-        ).order("priority", desc=True).limit(1)
-
-        # Filter by person if specified
-        if args.get("person_name"):
-            # Find person first
-            person_match = supabase.from_("person").select("person_id").eq(
-                "owner_id", user_id
-            ).ilike("display_name", f"%{args['person_name']}%").execute()
-
-            if person_match.data:
-                query = query.eq("person_id", person_match.data[0]["person_id"])
-
-        result = query.execute()
+    embedding = (embeddings or {}).get(args['note'])
+    if embedding is None:
+        embedding = await asyncio.to_thread(generate_embedding, args['note'])
+
+    # Raw evidence + assertion in one call
+    await execute_async(supabase.rpc('record_note', {
+        'p_owner_id': user_id,
+        'p_person_id': person_id,
+        'p_person_name': person_name,
+        'p_note': args['note'],
+        'p_embedding': embedding
+    }))
+    _match_cache.invalidate(user_id)
+
+    if created_new:
+        return _tool_json({'success': True, 'person_id': person_id, 'message': f"Created '{person_name}' and added note."})
+    return _tool_json({'success': True, 'person_id': person_id, 'message': f"Added note about {person_name}."})
+
+
+async def _tool_get_pending_question(args: dict, user_id: str, supabase, embeddings: Optional[dict]) -> str:
+    settings = get_settings()
+    until = _question_cooldown_until.get(user_id)
+    if until is not None:
+        if time.monotonic() < until:
+            return "No questions available right now (cooldown)."
+        del _question_cooldown_until[user_id]
+
+    # Rate-limit gates and the top pending question in one call
+    fetch = supabase.rpc("fetch_pending_question", {
+        "p_owner_id": user_id,
+        "p_max_per_day": settings.questions_max_per_day,
+        "p_cooldown_hours": settings.questions_cooldown_hours,
+        "p_person_name": args.get("person_name")
+    })
+    result = (await execute_async(fetch)).data
+
+    if result["blocked"] == "daily_limit":
+        return "Daily question limit reached."
+    if result["blocked"] == "cooldown":
+        return "No questions available right now (cooldown)."
+    if result["blocked"]:
+        return "No questions available right now."
+
+    if not result["question"]:
+        # Try generating new questions
+        gap_service = get_gap_detection_service()
+        await gap_service.generate_questions_batch(UUID(user_id), limit=3)
+        result = (await execute_async(fetch)).data
+
+    question = result["question"]
+    if not question:
+        return "No pending questions."
+
+    # Mark as shown and count it against the rate limit
+    await execute_async(supabase.rpc("mark_question_shown", {
+        "p_owner_id": user_id,
+        "p_question_id": question["question_id"]
+    }))
+    _question_cooldown_until[user_id] = time.monotonic() + settings.questions_cooldown_hours * 3600
+    _question_cooldown_until.move_to_end(user_id)
+    if len(_question_cooldown_until) > QUESTION_COOLDOWN_CACHE_SIZE:
+        _question_cooldown_until.popitem(last=False)
+
+    return _tool_json({
+        "question_id": question["question_id"],
+        "person_name": question["person_name"] or "",
+        "question_text": question.get("question_text_ru") or question["question_text"],
+        "question_type": question["question_type"]
+    })
+
+
+# Candidates returned for a name; enough to list in a multiple_matches reply
+PERSON_MATCH_LIMIT = 10
+
+
+async def _resolve_person(
+    supabase,
+    user_id: str,
+    person_id: Optional[str],
+    name: Optional[str],
+    missing_error: str = "Missing person_id or name"
+) -> tuple[Optional[dict], Optional[str]]:
+    """
+    Find one of the user's active people by id, else by exact or partial name.
 
+    Returns (person, None) or (None, error) where error is the tool result to
+    return as-is (not found, or a multiple_matches list to pick from).
+    """
+    if person_id:
+        result = await execute_async(supabase.table('person').select('person_id, display_name').eq(
+            'person_id', person_id
+        ).eq('owner_id', user_id).eq('status', 'active'))
         if not result.data:
-            # Try generating new questions
-            gap_service = get_gap_detection_service()
-            await gap_service.generate_questions_batch(UUID(user_id), limit=3)
-            result = query.execute()
+            return None, f"Person with ID {person_id} not found."
+        return result.data[0], None
+    if name:
+        def people():
+            # Fresh builder per query: postgrest builders accumulate filters
+            return supabase.table('person').select('person_id, display_name').eq(
+                'owner_id', user_id
+            ).eq('status', 'active').limit(PERSON_MATCH_LIMIT)
 
+        # Full names (usually copied from earlier tool results) match exactly;
+        # only fall back to a substring search when they don't
+        result = await execute_async(people().eq('display_name', name))
         if not result.data:
-            return "No pending questions."
-
-        question = result.data[0]
-
-        # Mark as shown and update rate limit
-        supabase.from_("proactive_question").update({
-            "status": "shown",
-            "shown_at": now.isoformat()
-        }).eq("question_id", question["question_id"]).execute()
-
-        # Update rate limit
-        supabase.from_("question_rate_limit").upsert({
-            "owner_id": user_id,
-            "last_question_at": now.isoformat(),
-            "last_daily_reset": str(today)
-        }, on_conflict="owner_id").execute()
-
-        # Increment shown count
-        if rate_result.data:
-            supabase.from_("question_rate_limit").update({
-                "questions_shown_today": rate_result.data[0].get("questions_shown_today", 0) + 1
-            }).eq("owner_id", user_id).execute()
-
-        person_name = ""
-        if question.get("person") and question["person"]:
-            person_name = question["person"].get("display_name", "")
-
-        return json.dumps({
-            "question_id": question["question_id"],
-            "person_name": person_name,
-            "question_text": question.get("question_text_ru") or question["question_text"],
-            "question_type": question["question_type"]
-        }, ensure_ascii=False)
-
-    elif tool_name == "merge_people":
-        dedup_service = get_dedup_service()
-
-        # Helper to find person by ID or name
-        def find_person(id_key, name_key):
-            if args.get(id_key):
-                result = supabase.table('person').select('person_id, display_name').eq(
-                    'person_id', args[id_key]
-                ).eq('owner_id', user_id).eq('status', 'active').execute()
-                if not result.data:
-                    return None, f"Person with ID {args[id_key]} not found."
-                return result.data[0], None
-            elif args.get(name_key):
-                result = supabase.table('person').select('person_id, display_name').eq(
-                    'owner_id', user_id
-                ).ilike('display_name', f"%{args[name_key]}%").eq('status', 'active').execute()
-                if not result.data:
-                    return None, f"Person '{args[name_key]}' not found."
-                if len(result.data) > 1:
-                    people_list = [{'person_id': p['person_id'], 'name': p['display_name']} for p in result.data]
-                    return None, json.dumps({'error': 'multiple_matches', 'matches': people_list}, ensure_ascii=False)
-                return result.data[0], None
-            return None, "Missing person_id or name"
-
-        person_a, error_a = find_person('person_a_id', 'person_a_name')
-        if error_a:
-            return error_a
-
-        person_b, error_b = find_person('person_b_id', 'person_b_name')
-        if error_b:
-            return error_b
-
-        if person_a['person_id'] == person_b['person_id']:
-            return "These are the same person already."
-
-        # Perform merge
-        result = await dedup_service.merge_persons(
-            UUID(user_id),
-            UUID(person_a['person_id']),
-            UUID(person_b['person_id'])
-        )
+            result = await execute_async(people().ilike('display_name', f"%{name}%"))
+        if not result.data:
+            return None, f"Person '{name}' not found."
+        if len(result.data) > 1:
+            people_list = [{'person_id': p['person_id'], 'name': p['display_name']} for p in result.data]
+            return None, _tool_json({'error': 'multiple_matches', 'matches': people_list})
+        return result.data[0], None
+    return None, missing_error
+
+
+async def _resolve_person_pair(supabase, user_id: str, args: dict):
+    """Resolve person_a/person_b tool args concurrently; first error wins."""
+    (person_a, error_a), (person_b, error_b) = await asyncio.gather(
+        _resolve_person(supabase, user_id, args.get('person_a_id'), args.get('person_a_name')),
+        _resolve_person(supabase, user_id, args.get('person_b_id'), args.get('person_b_name'))
+    )
+    return person_a, person_b, error_a or error_b
 
-        # Rename if requested
-        final_name = person_a['display_name']
-        if args.get('new_display_name'):
-            supabase.table('person').update({
-                'display_name': args['new_display_name'],
-                'updated_at': datetime.utcnow().isoformat()
-            }).eq('person_id', person_a['person_id']).execute()
-            final_name = args['new_display_name']
-
-        return json.dumps({
-            "success": True,
-            "person_id": person_a['person_id'],
-            "final_name": final_name,
-            "merged_from": person_b['display_name'],
-            "assertions_moved": result.assertions_moved,
-            "edges_moved": result.edges_moved,
-            "identities_moved": result.identities_moved
-        }, ensure_ascii=False)
-
-    elif tool_name == "suggest_merge_candidates":
-        dedup_service = get_dedup_service()
-        limit = args.get('limit', 5)
-
-        candidates = await dedup_service.find_all_duplicates(UUID(user_id), limit=limit)
-
-        if not candidates:
-            return "No potential duplicates found in your network."
-
-        return json.dumps({
-            "candidates": candidates,
-            "total": len(candidates)
-        }, ensure_ascii=False, indent=2)
-
-    elif tool_name == "edit_person":
-        # Prefer person_id
-        if args.get('person_id'):
-            person_result = supabase.table('person').select('person_id, display_name').eq(
-                'person_id', args['person_id']
-            ).eq('owner_id', user_id).eq('status', 'active').execute()
-            if not person_result.data:
-                return f"Person with ID {args['person_id']} not found."
-        elif args.get('current_name'):
-            person_result = supabase.table('person').select('person_id, display_name').eq(
-                'owner_id', user_id
-            ).ilike('display_name', f"%{args['current_name']}%").eq('status', 'active').execute()
-            if not person_result.data:
-                return f"Person '{args['current_name']}' not found."
-            if len(person_result.data) > 1:
-                people_list = [{'person_id': p['person_id'], 'name': p['display_name']} for p in person_result.data]
-                return json.dumps({'error': 'multiple_matches', 'matches': people_list}, ensure_ascii=False)
-        else:
-            return "Please provide person_id or current_name."
 
-        person = person_result.data[0]
-        old_name = person['display_name']
+async def _tool_merge_people(args: dict, user_id: str, supabase, embeddings: Optional[dict]) -> str:
+    dedup_service = get_dedup_service()
+
+    person_a, person_b, error = await _resolve_person_pair(supabase, user_id, args)
+    if error:
+        return error
+
+    if person_a['person_id'] == person_b['person_id']:
+        return "These are the same person already."
+
+    # Perform merge
+    result = await dedup_service.merge_persons(
+        UUID(user_id),
+        UUID(person_a['person_id']),
+        UUID(person_b['person_id'])
+    )
+    _match_cache.invalidate(user_id)
 
-        supabase.table('person').update({
-            'display_name': args['new_name'],
+    # Rename if requested
+    final_name = person_a['display_name']
+    if args.get('new_display_name'):
+        await execute_async(supabase.table('person').update({
+            'display_name': args['new_display_name'],
             'updated_at': datetime.utcnow().isoformat()
-        }).eq('person_id', person['person_id']).execute()
-
-        return json.dumps({'success': True, 'person_id': person['person_id'], 'old_name': old_name, 'new_name': args['new_name']}, ensure_ascii=False)
-
-    elif tool_name == "reject_merge":
-        dedup_service = get_dedup_service()
-
-        # Helper to find person
-        def find_person(id_key, name_key):
-            if args.get(id_key):
-                r = supabase.table('person').select('person_id, display_name').eq(
-                    'person_id', args[id_key]).eq('owner_id', user_id).eq('status', 'active').execute()
-                return (r.data[0], None) if r.data else (None, f"Person with ID {args[id_key]} not found.")
-            elif args.get(name_key):
-                r = supabase.table('person').select('person_id, display_name').eq(
-                    'owner_id', user_id).ilike('display_name', f"%{args[name_key]}%").eq('status', 'active').execute()
-                if not r.data:
-                    return None, f"Person '{args[name_key]}' not found."
-                if len(r.data) > 1:
-                    return None, json.dumps({'error': 'multiple_matches', 'matches': [{'person_id': p['person_id'], 'name': p['display_name']} for p in r.data]}, ensure_ascii=False)
-                return r.data[0], None
-            return None, "Missing person_id or name"
-
-        person_a, error_a = find_person('person_a_id', 'person_a_name')
-        if error_a:
-            return error_a
-        person_b, error_b = find_person('person_b_id', 'person_b_name')
-        if error_b:
-            return error_b
-
-        await dedup_service.reject_duplicate(
-            UUID(user_id),
-            UUID(person_a['person_id']),
-            UUID(person_b['person_id'])
-        )
+        }, returning='minimal').eq('person_id', person_a['person_id']))
+        final_name = args['new_display_name']
 
-        return json.dumps({'success': True, 'person_a': person_a['display_name'], 'person_b': person_b['display_name']}, ensure_ascii=False)
+    return _tool_json({
+        "success": True,
+        "person_id": person_a['person_id'],
+        "final_name": final_name,
+        "merged_from": person_b['display_name'],
+        "assertions_moved": result.assertions_moved,
+        "edges_moved": result.edges_moved,
+        "identities_moved": result.identities_moved
+    })
 
-    elif tool_name == "delete_people":
-        person_ids = args.get('person_ids', [])
-        confirm = args.get('confirm', False)
 
-        if not person_ids:
-            return "No person_ids provided. Use find_people first to get IDs."
+async def _tool_suggest_merge_candidates(args: dict, user_id: str, supabase, embeddings: Optional[dict]) -> str:
+    dedup_service = get_dedup_service()
+    limit = args.get('limit', 5)
 
-        # Verify all IDs belong to user and are active
-        result = supabase.table('person').select(
-            'person_id, display_name'
-        ).in_('person_id', person_ids).eq('owner_id', user_id).eq('status', 'active').execute()
+    candidates = await dedup_service.find_all_duplicates(UUID(user_id), limit=limit)
 
-        if not result.data:
-            return "No matching people found. Check that IDs are correct and belong to you."
-
-        found_people = result.data
-        found_ids = [p['person_id'] for p in found_people]
-
-        # Check for missing IDs
-        missing = set(person_ids) - set(found_ids)
-        if missing:
-            print(f"[DELETE_PEOPLE] Warning: {len(missing)} IDs not found or not owned by user")
-
-        if not confirm:
-            return json.dumps({
-                'preview': True,
-                'will_delete': len(found_people),
-                'people': [{'person_id': p['person_id'], 'name': p['display_name']} for p in found_people],
-                'message': f"This will delete {len(found_people)} people. Call with confirm=true to proceed."
-            }, ensure_ascii=False, indent=2)
-
-        # Actually delete
-        supabase.table('person').update({
-            'status': 'deleted',
-            'updated_at': datetime.utcnow().isoformat()
-        }).in_('person_id', found_ids).execute()
-
-        return json.dumps({
-            'deleted': len(found_people),
-            'deleted_names': [p['display_name'] for p in found_people],
-            'message': f"Deleted {len(found_people)} people."
-        }, ensure_ascii=False)
-
-    elif tool_name == "get_import_stats":
-        # Get stats by import source
-        query = supabase.table('person').select(
-            'import_source, import_batch_id'
-        ).eq('owner_id', user_id).eq('status', 'active')
-
-        if args.get('import_source'):
-            query = query.eq('import_source', args['import_source'])
-
-        people = query.execute()
-
-        if not people.data:
-            return "No imported contacts found."
-
-        # Count by source
-        by_source = {}
-        batch_ids = set()
-        for p in people.data:
-            source = p.get('import_source') or 'manual'
-            by_source[source] = by_source.get(source, 0) + 1
-            if p.get('import_batch_id'):
-                batch_ids.add(p['import_batch_id'])
-
-        # Get batch details
-        batches = []
-        if batch_ids:
-            batch_result = supabase.table('import_batch').select(
-                'batch_id, import_type, status, total_contacts, new_people, analytics, created_at'
-            ).in_('batch_id', list(batch_ids)).order('created_at', desc=True).limit(5).execute()
-
-            for b in batch_result.data or []:
-                batches.append({
-                    'batch_id': b['batch_id'],
-                    'type': b['import_type'],
-                    'status': b['status'],
-                    'imported': b.get('new_people', 0),
-                    'date': b['created_at'][:10] if b.get('created_at') else 'unknown',
-                    'analytics': b.get('analytics')
-                })
-
-        return json.dumps({
-            'total_people': len(people.data),
-            'by_source': by_source,
-            'recent_batches': batches
-        }, ensure_ascii=False, indent=2)
-
-    elif tool_name == "rollback_import":
-        batch_id = args['batch_id']
-
-        # Verify batch exists and belongs to user
-        batch_check = supabase.table('import_batch').select(
-            'batch_id, status, import_type, new_people'
-        ).eq('batch_id', batch_id).eq('owner_id', user_id).single().execute()
-
-        if not batch_check.data:
-            return f"Batch {batch_id} not found or doesn't belong to you."
-
-        if batch_check.data['status'] == 'rolled_back':
-            return f"Batch {batch_id} was already rolled back."
-
-        # Soft delete all people from this batch
-        delete_result = supabase.table('person').update({
-            'status': 'deleted',
-            'updated_at': datetime.utcnow().isoformat()
-        }).eq('import_batch_id', batch_id).eq('status', 'active').execute()
+    if not candidates:
+        return "No potential duplicates found in your network."
 
-        deleted_count = len(delete_result.data) if delete_result.data else 0
+    return _tool_json({
+        "candidates": candidates,
+        "total": len(candidates)
+    }, indent=True)
 
-        # Mark batch as rolled back
-        supabase.table('import_batch').update({
-            'status': 'rolled_back',
-            'rolled_back_at': datetime.utcnow().isoformat()
-        }).eq('batch_id', batch_id).execute()
 
-        return json.dumps({
-            'success': True,
-            'batch_id': batch_id,
-            'import_type': batch_check.data['import_type'],
-            'deleted_count': deleted_count,
-            'message': f"Rolled back {batch_check.data['import_type']} import. Deleted {deleted_count} people."
-        }, ensure_ascii=False)
+async def _tool_edit_person(args: dict, user_id: str, supabase, embeddings: Optional[dict]) -> str:
+    # Prefer person_id
+    person, error = await _resolve_person(
+        supabase, user_id, args.get('person_id'), args.get('current_name'),
+        missing_error="Please provide person_id or current_name."
+    )
+    if error:
+        return error
 
-    # =============================================================================
-    # LOW-LEVEL EXPLORATION TOOLS
-    # =============================================================================
+    old_name = person['display_name']
 
-    elif tool_name == "explore_company_names":
-        pattern = args['pattern']
-        shared_mode = settings.shared_database_mode
+    await execute_async(supabase.table('person').update({
+        'display_name': args['new_name'],
+        'updated_at': datetime.utcnow().isoformat()
+    }, returning='minimal').eq('person_id', person['person_id']))
 
-        # Get assertions matching the pattern
-        result = supabase.table('assertion').select(
-            'object_value, subject_person_id'
-        ).in_('predicate', ['works_at', 'met_on']).ilike(
-            'object_value', pattern
-        ).limit(500).execute()
+    return _tool_json({'success': True, 'person_id': person['person_id'], 'old_name': old_name, 'new_name': args['new_name']})
 
-        # In non-shared mode, filter to only user's people
-        allowed_person_ids = None
-        if not shared_mode:
-            people_result = supabase.table('person').select('person_id').eq(
-                'owner_id', user_id
-            ).eq('status', 'active').execute()
-            allowed_person_ids = set(p['person_id'] for p in people_result.data or [])
-
-        # Aggregate in Python (simpler than raw SQL via Supabase)
-        company_counts: dict[str, set] = {}
-        for row in result.data or []:
-            # Filter by owner if not shared mode
-            if allowed_person_ids is not None and row['subject_person_id'] not in allowed_person_ids:
-                continue
-
-            company = row['object_value']
-            if company not in company_counts:
-                company_counts[company] = set()
-            company_counts[company].add(row['subject_person_id'])
-
-        # Sort by count descending
-        sorted_companies = sorted(
-            [(c, len(pids)) for c, pids in company_counts.items()],
-            key=lambda x: x[1],
-            reverse=True
-        )[:30]  # Top 30
-
-        return json.dumps({
-            'pattern': pattern,
-            'variants': [
-                {'company': html.escape(c), 'people_count': cnt}
-                for c, cnt in sorted_companies
-            ],
-            'total_variants': len(company_counts),
-            'hint': 'Use search_by_company_exact with specific variant to get people'
-        }, ensure_ascii=False, indent=2)
-
-    elif tool_name == "count_people_by_filter":
-        company_pattern = args.get('company_pattern')
-        name_pattern = args.get('name_pattern')
-        shared_mode = settings.shared_database_mode
-
-        # Start with person query
-        query = supabase.table('person').select('person_id', count='exact').eq('status', 'active')
 
-        if not shared_mode:
-            query = query.eq('owner_id', user_id)
+async def _tool_reject_merge(args: dict, user_id: str, supabase, embeddings: Optional[dict]) -> str:
+    dedup_service = get_dedup_service()
 
-        if name_pattern:
-            query = query.ilike('display_name', name_pattern)
+    person_a, person_b, error = await _resolve_person_pair(supabase, user_id, args)
+    if error:
+        return error
 
-        if company_pattern:
-            # Get person IDs from assertions first
-            assertion_result = supabase.table('assertion').select(
-                'subject_person_id'
-            ).eq('predicate', 'works_at').ilike('object_value', company_pattern).execute()
+    await dedup_service.reject_duplicate(
+        UUID(user_id),
+        UUID(person_a['person_id']),
+        UUID(person_b['person_id'])
+    )
 
-            if not assertion_result.data:
-                return json.dumps({'count': 0, 'filters': args}, ensure_ascii=False)
+    return _tool_json({'success': True, 'person_a': person_a['display_name'], 'person_b': person_b['display_name']})
 
-            person_ids = list(set(r['subject_person_id'] for r in assertion_result.data))
-            query = query.in_('person_id', person_ids)
 
-        result = query.execute()
+async def _tool_delete_people(args: dict, user_id: str, supabase, embeddings: Optional[dict]) -> str:
+    person_ids = args.get('person_ids', [])
+    confirm = args.get('confirm', False)
 
-        return json.dumps({
-            'count': result.count if hasattr(result, 'count') and result.count is not None else len(result.data or []),
-            'filters': {k: v for k, v in args.items() if v}
-        }, ensure_ascii=False)
+    if not person_ids:
+        return "No person_ids provided. Use find_people first to get IDs."
 
-    elif tool_name == "search_by_company_exact":
-        pattern = args['pattern']
-        predicate = args.get('predicate', 'works_at')
-        limit = args.get('limit', 50)
-        shared_mode = settings.shared_database_mode
+    if confirm:
+        # Ownership check and soft delete in one statement
+        result = await execute_async(supabase.rpc('soft_delete_people', {
+            'p_owner_id': user_id,
+            'p_person_ids': person_ids
+        }))
+    else:
+        # Verify all IDs belong to user and are active
+        result = await execute_async(supabase.table('person').select(
+            'person_id, display_name'
+        ).in_('person_id', person_ids).eq('owner_id', user_id).eq('status', 'active'))
+
+    if not result.data:
+        return "No matching people found. Check that IDs are correct and belong to you."
+
+    found_people = result.data
+    if confirm:
+        _match_cache.invalidate(user_id)
+
+    # Check for missing IDs
+    missing = set(person_ids) - {p['person_id'] for p in found_people}
+    if missing:
+        print(f"[DELETE_PEOPLE] Warning: {len(missing)} IDs not found or not owned by user")
+
+    if not confirm:
+        return _tool_json({
+            'preview': True,
+            'will_delete': len(found_people),
+            'people': [{'person_id': p['person_id'], 'name': p['display_name']} for p in found_people],
+            'message': f"This will delete {len(found_people)} people. Call with confirm=true to proceed."
+        }, indent=True)
+
+    return _tool_json({
+        'deleted': len(found_people),
+        'deleted_names': [p['display_name'] for p in found_people],
+        'message': f"Deleted {len(found_people)} people."
+    })
+
+
+async def _tool_get_import_stats(args: dict, user_id: str, supabase, embeddings: Optional[dict]) -> str:
+    # Counts by import source and the recent batches, aggregated in the database
+    stats = (await execute_async(supabase.rpc('get_import_summary', {
+        'p_owner_id': user_id,
+        'p_import_source': args.get('import_source')
+    }))).data
+
+    if not stats['total_people']:
+        return "No imported contacts found."
+
+    batches = [{
+        'batch_id': b['batch_id'],
+        'type': b['import_type'],
+        'status': b['status'],
+        'imported': b.get('new_people', 0),
+        'date': b['created_at'][:10] if b.get('created_at') else 'unknown',
+        'analytics': b.get('analytics')
+    } for b in stats['recent_batches']]
+
+    return _tool_json({
+        'total_people': stats['total_people'],
+        'by_source': stats['by_source'],
+        'recent_batches': batches
+    }, indent=True)
+
+
+async def _tool_rollback_import(args: dict, user_id: str, supabase, embeddings: Optional[dict]) -> str:
+    batch_id = args['batch_id']
+
+    # Ownership check, soft delete and batch status update in one transaction
+    rollback = (await execute_async(supabase.rpc('rollback_import_batch', {
+        'p_batch_id': batch_id,
+        'p_owner_id': user_id
+    }))).data
+
+    if rollback['result'] == 'not_found':
+        return f"Batch {batch_id} not found or doesn't belong to you."
+
+    if rollback['result'] == 'already_rolled_back':
+        return f"Batch {batch_id} was already rolled back."
+    _match_cache.invalidate(user_id)
+
+    deleted_count = rollback['deleted_count']
+    return _tool_json({
+        'success': True,
+        'batch_id': batch_id,
+        'import_type': rollback['import_type'],
+        'deleted_count': deleted_count,
+        'message': f"Rolled back {rollback['import_type']} import. Deleted {deleted_count} people."
+    })
 
-        # Get assertions matching the pattern
-        result = supabase.table('assertion').select(
-            'subject_person_id, predicate, object_value, confidence'
-        ).eq('predicate', predicate).ilike('object_value', pattern).limit(limit * 2).execute()
 
-        if not result.data:
-            return json.dumps({
-                'people': [],
-                'total': 0,
-                'pattern': pattern,
-                'predicate': predicate
-            }, ensure_ascii=False)
+# =============================================================================
+# LOW-LEVEL EXPLORATION TOOLS
+# =============================================================================
 
-        # Get person details
-        person_ids = list(set(r['subject_person_id'] for r in result.data))
+async def _tool_explore_company_names(args: dict, user_id: str, supabase, embeddings: Optional[dict]) -> str:
+    settings = get_settings()
+    pattern = args['pattern']
+    shared_mode = settings.shared_database_mode
+
+    # Group, sort and limit in SQL - already the top 30 variants
+    result = await execute_async(supabase.rpc('company_counts', {
+        'pattern': pattern,
+        'p_owner_id': None if shared_mode else user_id,
+        'p_limit': 30,
+    }))
+    top_companies = result.data or []
+
+    return _tool_json({
+        'pattern': pattern,
+        'variants': [
+            {'company': html.escape(row['company']), 'people_count': row['people_count']}
+            for row in top_companies
+        ],
+        'total_variants': top_companies[0]['total_variants'] if top_companies else 0,
+        'hint': 'Use search_by_company_exact with specific variant to get people'
+    }, indent=True)
+
+
+async def _tool_count_people_by_filter(args: dict, user_id: str, supabase, embeddings: Optional[dict]) -> str:
+    settings = get_settings()
+    company_pattern = args.get('company_pattern')
+    name_pattern = args.get('name_pattern')
+    shared_mode = settings.shared_database_mode
 
-        people_query = supabase.table('person').select(
-            'person_id, display_name, owner_id'
-        ).in_('person_id', person_ids).eq('status', 'active')
+    # Start with person query
+    query = supabase.table('person').select('person_id', count='exact').eq('status', 'active')
 
-        if not shared_mode:
-            people_query = people_query.eq('owner_id', user_id)
+    if not shared_mode:
+        query = query.eq('owner_id', user_id)
 
-        people_result = people_query.limit(limit).execute()
-        people_by_id = {p['person_id']: p for p in people_result.data or []}
+    if name_pattern:
+        query = query.ilike('display_name', name_pattern)
 
-        # Build results (with HTML escaping for safe display)
-        people = []
-        for row in result.data:
-            pid = row['subject_person_id']
-            if pid in people_by_id:
-                p = people_by_id[pid]
-                people.append({
-                    'person_id': pid,
-                    'name': html.escape(p['display_name']),
-                    'company': html.escape(row['object_value']),
-                    'predicate': row['predicate'],
-                    'is_own': p.get('owner_id') == user_id
-                })
-
-        # Dedupe by person_id
-        seen = set()
-        unique_people = []
-        for p in people:
-            if p['person_id'] not in seen:
-                seen.add(p['person_id'])
-                unique_people.append(p)
-
-        return json.dumps({
-            'people': unique_people[:limit],
-            'total': len(unique_people),
+    if company_pattern:
+        # Get person IDs from assertions first
+        assertion_result = await execute_async(supabase.table('assertion').select(
+            'subject_person_id'
+        ).eq('predicate', 'works_at').ilike('object_value', company_pattern))
+
+        if not assertion_result.data:
+            return _tool_json({'count': 0, 'filters': args})
+
+        person_ids = list(dict.fromkeys(r['subject_person_id'] for r in assertion_result.data))
+        query = query.in_('person_id', person_ids)
+
+    result = await execute_async(query)
+
+    return _tool_json({
+        'count': result.count if hasattr(result, 'count') and result.count is not None else len(result.data or []),
+        'filters': {k: v for k, v in args.items() if v}
+    })
+
+
+async def _tool_search_by_company_exact(args: dict, user_id: str, supabase, embeddings: Optional[dict]) -> str:
+    settings = get_settings()
+    pattern = args['pattern']
+    predicate = args.get('predicate', 'works_at')
+    limit = args.get('limit', 50)
+    shared_mode = settings.shared_database_mode
+
+    # Get assertions matching the pattern
+    result = await execute_async(supabase.table('assertion').select(
+        'subject_person_id, predicate, object_value, confidence'
+    ).eq('predicate', predicate).ilike('object_value', pattern).limit(limit * 2))
+
+    if not result.data:
+        return _tool_json({
+            'people': [],
+            'total': 0,
             'pattern': pattern,
             'predicate': predicate
-        }, ensure_ascii=False, indent=2)
-
-    elif tool_name == "search_by_name_fuzzy":
-        name = args['name']
-        threshold = args.get('threshold', 0.4)
-        shared_mode = settings.shared_database_mode
-
-        if shared_mode:
-            # Use community version
-            result = supabase.rpc('find_similar_names_community', {
-                'p_name': name,
-                'p_threshold': threshold
-            }).execute()
-        else:
-            result = supabase.rpc('find_similar_names', {
-                'p_owner_id': user_id,
-                'p_name': name,
-                'p_threshold': threshold
-            }).execute()
-
-        people = [
-            {
-                'person_id': r['person_id'],
-                'name': html.escape(r['display_name']),
-                'similarity': round(r['similarity'], 3)
-            }
-            for r in result.data or []
-        ]
+        })
 
-        return json.dumps({
-            'people': people,
-            'total': len(people),
-            'search_name': name,
-            'threshold': threshold
-        }, ensure_ascii=False, indent=2)
-
-    elif tool_name == "semantic_search_raw":
-        query = args['query']
-        threshold = args.get('threshold', 0.4)
-        limit = args.get('limit', 20)
-        shared_mode = settings.shared_database_mode
-
-        # Generate embedding
-        query_embedding = generate_embedding(query)
-
-        # Call match_assertions RPC
-        if shared_mode:
-            result = supabase.rpc('match_assertions_community', {
-                'query_embedding': query_embedding,
-                'match_threshold': threshold,
-                'match_count': limit
-            }).execute()
-        else:
-            result = supabase.rpc('match_assertions', {
-                'query_embedding': query_embedding,
-                'match_threshold': threshold,
-                'match_count': limit,
-                'p_owner_id': user_id
-            }).execute()
-
-        # Get person names
-        person_ids = list(set(r['subject_person_id'] for r in result.data or []))
-        if person_ids:
-            people_result = supabase.table('person').select(
-                'person_id, display_name'
-            ).in_('person_id', person_ids).execute()
-            name_by_id = {p['person_id']: p['display_name'] for p in people_result.data or []}
+    # Get person details
+    person_ids = list(dict.fromkeys(r['subject_person_id'] for r in result.data))
+
+    people_query = supabase.table('person').select(
+        'person_id, display_name, owner_id'
+    ).in_('person_id', person_ids).eq('status', 'active')
+
+    if not shared_mode:
+        people_query = people_query.eq('owner_id', user_id)
+
+    people_result = await execute_async(people_query.limit(limit))
+    people_by_id = {p['person_id']: p for p in people_result.data or []}
+
+    # Build results, one per person in assertion order (with HTML escaping for safe display)
+    seen = set()
+    unique_people = []
+    for row in result.data:
+        pid = row['subject_person_id']
+        p = people_by_id.get(pid)
+        if p is None or pid in seen:
+            continue
+        seen.add(pid)
+        unique_people.append({
+            'person_id': pid,
+            'name': html.escape(p['display_name']),
+            'company': html.escape(row['object_value']),
+            'predicate': row['predicate'],
+            'is_own': p.get('owner_id') == user_id
+        })
+
+    return _tool_json({
+        'people': unique_people[:limit],
+        'total': len(unique_people),
+        'pattern': pattern,
+        'predicate': predicate
+    }, indent=True)
+
+
+async def _tool_search_by_name_fuzzy(args: dict, user_id: str, supabase, embeddings: Optional[dict]) -> str:
+    settings = get_settings()
+    name = args['name']
+    threshold = args.get('threshold', 0.4)
+    shared_mode = settings.shared_database_mode
+
+    if shared_mode:
+        # Use community version
+        result = await execute_async(supabase.rpc('find_similar_names_community', {
+            'p_name': name,
+            'p_threshold': threshold
+        }))
+    else:
+        result = await execute_async(supabase.rpc('find_similar_names', {
+            'p_owner_id': user_id,
+            'p_name': name,
+            'p_threshold': threshold
+        }))
+
+    people = [
+        {
+            'person_id': r['person_id'],
+            'name': html.escape(r['display_name']),
+            'similarity': round(r['similarity'], 3)
+        }
+        for r in result.data or []
+    ]
+
+    return _tool_json({
+        'people': people,
+        'total': len(people),
+        'search_name': name,
+        'threshold': threshold
+    }, indent=True)
+
+
+async def _tool_semantic_search_raw(args: dict, user_id: str, supabase, embeddings: Optional[dict]) -> str:
+    settings = get_settings()
+    query = args['query']
+    threshold = args.get('threshold', 0.4)
+    limit = args.get('limit', 20)
+    shared_mode = settings.shared_database_mode
+
+    # Generate embedding
+    query_embedding = await asyncio.to_thread(generate_embedding, query)
+
+    # Call match_assertions RPC
+    if shared_mode:
+        result = await execute_async(supabase.rpc('match_assertions_community', {
+            'query_embedding': query_embedding,
+            'match_threshold': threshold,
+            'match_count': limit
+        }))
+    else:
+        result = await execute_async(supabase.rpc('match_assertions', {
+            'query_embedding': query_embedding,
+            'match_threshold': threshold,
+            'match_count': limit,
+            'p_owner_id': user_id
+        }))
+
+    # Get person names
+    person_ids = list(dict.fromkeys(r['subject_person_id'] for r in result.data or []))
+    if person_ids:
+        people_result = await execute_async(supabase.table('person').select(
+            'person_id, display_name'
+        ).in_('person_id', person_ids))
+        name_by_id = {p['person_id']: p['display_name'] for p in people_result.data or []}
+    else:
+        name_by_id = {}
+
+    assertions = [
+        {
+            'person_id': r['subject_person_id'],
+            'person_name': html.escape(name_by_id.get(r['subject_person_id'], 'Unknown')),
+            'predicate': r['predicate'],
+            'value': html.escape(r['object_value'] or ''),
+            'similarity': round(r['similarity'], 3)
+        }
+        for r in result.data or []
+    ]
+
+    return _tool_json({
+        'assertions': assertions,
+        'total': len(assertions),
+        'query': query,
+        'threshold': threshold
+    }, indent=True)
+
+
+async def _tool_report_results(args: dict, user_id: str, supabase, embeddings: Optional[dict]) -> str:
+    return _tool_json({"status": "reported", "count": len(args.get("people", []))})
+
+
+async def _tool_execute_sql(args: dict, user_id: str, supabase, embeddings: Optional[dict]) -> str:
+    # SQL tool for agent v2
+    return await handle_sql_tool(args, user_id)
+
+
+# Tool name -> handler(args, user_id, supabase, embeddings)
+_TOOL_HANDLERS = {
+    'find_people': _tool_find_people,
+    'get_person_details': _tool_get_person_details,
+    'add_note_about_person': _tool_add_note_about_person,
+    'get_pending_question': _tool_get_pending_question,
+    'merge_people': _tool_merge_people,
+    'suggest_merge_candidates': _tool_suggest_merge_candidates,
+    'edit_person': _tool_edit_person,
+    'reject_merge': _tool_reject_merge,
+    'delete_people': _tool_delete_people,
+    'get_import_stats': _tool_get_import_stats,
+    'rollback_import': _tool_rollback_import,
+    'explore_company_names': _tool_explore_company_names,
+    'count_people_by_filter': _tool_count_people_by_filter,
+    'search_by_company_exact': _tool_search_by_company_exact,
+    'search_by_name_fuzzy': _tool_search_by_name_fuzzy,
+    'semantic_search_raw': _tool_semantic_search_raw,
+    'report_results': _tool_report_results,
+    'execute_sql': _tool_execute_sql,
+}
+
+
+# Tools without side effects; consecutive calls to these run concurrently
+READ_ONLY_TOOLS = frozenset({
+    'find_people',
+    'get_person_details',
+    'suggest_merge_candidates',
+    'get_import_stats',
+    'explore_company_names',
+    'count_people_by_filter',
+    'search_by_company_exact',
+    'search_by_name_fuzzy',
+    'semantic_search_raw',
+    'report_results',
+    'execute_sql',
+})
+
+
+def _group_tool_calls(calls: list[tuple]) -> list[list[tuple]]:
+    """
+    Split (tool_call, tool_name, tool_args) into batches that are safe to run
+    concurrently. Consecutive read-only calls share a batch; any other call
+    runs alone, so writes keep the order the model asked for.
+    """
+    groups: list[list[tuple]] = []
+    for call in calls:
+        if call[1] in READ_ONLY_TOOLS and groups and groups[-1][0][1] in READ_ONLY_TOOLS:
+            groups[-1].append(call)
         else:
-            name_by_id = {}
-
-        assertions = [
-            {
-                'person_id': r['subject_person_id'],
-                'person_name': html.escape(name_by_id.get(r['subject_person_id'], 'Unknown')),
-                'predicate': r['predicate'],
-                'value': html.escape(r['object_value'] or ''),
-                'similarity': round(r['similarity'], 3)
-            }
-            for r in result.data or []
-        ]
+            groups.append([call])
+    return groups
+
+
+async def execute_tool(
+    tool_name: str,
+    args: dict,
+    user_id: str,
+    embeddings: Optional[dict[str, list[float]]] = None
+) -> str:
+    """
+    Execute a tool and return the result as a string.
+
+    `embeddings` maps texts already embedded for this turn to their vectors
+    (see _run_tool_calls); anything missing is embedded on demand.
+    """
+    handler = _TOOL_HANDLERS.get(tool_name)
+    if handler is None:
+        return f"Unknown tool: {tool_name}"
+    return await handler(args, user_id, get_supabase_admin(), embeddings)
+
+
+async def _start_chat_turn(supabase, user_id: str, chat_request: ChatRequest) -> tuple[str, list[dict]]:
+    """Resolve/create the session, save the user message, build OpenAI messages."""
+    if chat_request.session_id:
+        session_id = chat_request.session_id
+        if not await _owns_session(supabase, user_id, session_id):
+            raise HTTPException(status_code=404, detail="Session not found")
+
+        # Save user message
+        await execute_async(supabase.table('chat_message').insert({
+            'session_id': session_id,
+            'role': 'user',
+            'content': chat_request.message
+        }, returning='minimal'))
+    else:
+        session_id = await _start_session(supabase, user_id, chat_request.message)
+
+    # Build messages for OpenAI (fresh list: the caller appends to it)
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    messages.extend(await _load_history(supabase, session_id))
+
+    return session_id, messages
 
-        return json.dumps({
-            'assertions': assertions,
-            'total': len(assertions),
-            'query': query,
-            'threshold': threshold
-        }, ensure_ascii=False, indent=2)
 
-    elif tool_name == "report_results":
-        return json.dumps({"status": "reported", "count": len(args.get("people", []))})
+async def _start_session(supabase, user_id: str, message: str) -> str:
+    """Create a session titled after its first user message, saving that message too."""
+    session = await execute_async(supabase.rpc('start_session_with_message', {
+        'p_owner_id': user_id,
+        'p_title': message[:50] + ('...' if len(message) > 50 else ''),
+        'p_message': message
+    }))
+    session_id = session.data
+    _remember_owned_session(user_id, session_id)
+    return session_id
 
-    elif tool_name == "execute_sql":
-        # SQL tool for agent v2
-        return await handle_sql_tool(args, user_id)
 
-    return f"Unknown tool: {tool_name}"
+async def _owns_session(supabase, user_id: str, session_id: str) -> bool:
+    """Whether session_id belongs to user_id; positive answers are cached."""
+    if (user_id, session_id) in _owned_sessions:
+        _owned_sessions.move_to_end((user_id, session_id))
+        return True
+
+    session_check = await execute_async(supabase.table('chat_session').select('session_id').eq(
+        'session_id', session_id
+    ).eq('owner_id', user_id))
+    if not session_check.data:
+        return False
+
+    _remember_owned_session(user_id, session_id)
+    return True
+
+
+def _remember_owned_session(user_id: str, session_id: str) -> None:
+    _owned_sessions[(user_id, session_id)] = None
+    if len(_owned_sessions) > OWNED_SESSION_CACHE_SIZE:
+        _owned_sessions.popitem(last=False)
+
+
+def _history_message(msg: dict) -> dict:
+    """chat_message row -> OpenAI message."""
+    if msg['role'] == 'tool':
+        return {
+            "role": "tool",
+            "content": msg['content'],
+            "tool_call_id": msg['tool_call_id']
+        }
+    if msg['role'] == 'assistant' and msg.get('tool_calls'):
+        return {
+            "role": "assistant",
+            "content": msg['content'] or "",
+            "tool_calls": msg['tool_calls']
+        }
+    return {
+        "role": msg['role'],
+        "content": msg['content']
+    }
+
+
+async def _load_history(supabase, session_id: str) -> list[dict]:
+    """
+    Session history as OpenAI messages, fetching only the recent tail.
+
+    chat_message rows are append-only, so rows already read stay valid. The
+    tail query re-reads HISTORY_OVERLAP behind the newest cached created_at
+    and skips message_ids already cached, so a row another worker committed
+    late is still picked up (appended after the cached rows, not in its
+    created_at slot) as long as its transaction took less than the overlap.
+    """
+    cached, seen, newest = _history_cache.get(session_id, ((), frozenset(), None))
+
+    query = supabase.table('chat_message').select(
+        'message_id, role, content, tool_calls, tool_call_id, created_at'
+    ).eq('session_id', session_id)
+    if newest is not None:
+        query = query.gt('created_at', (newest - HISTORY_OVERLAP).isoformat())
+    tail = await execute_async(query.order('created_at').order('message_seq'))
+
+    fresh = [msg for msg in tail.data if msg['message_id'] not in seen]
+    if fresh:
+        cached = (*cached, *map(_history_message, fresh))
+        seen = seen.union(msg['message_id'] for msg in fresh)
+        # The overlap includes the previous newest row, so this never moves back
+        newest = max(datetime.fromisoformat(msg['created_at']) for msg in tail.data)
+
+    _history_cache[session_id] = (cached, seen, newest)
+    _history_cache.move_to_end(session_id)
+    if len(_history_cache) > HISTORY_CACHE_SIZE:
+        _history_cache.popitem(last=False)
+
+    return list(cached)
+
+
+async def _run_tool_calls(
+    supabase,
+    session_id: str,
+    user_id: str,
+    messages: list[dict],
+    content: str,
+    tool_calls_json: list[dict]
+) -> tuple[list[dict], asyncio.Task]:
+    """
+    Execute the tools (consecutive read-only calls concurrently, writes one at
+    a time in call order), then save the assistant tool-call message and all
+    tool results with one insert (a failed tool leaves no dangling
+    tool_calls).
+
+    The insert runs as a task so it overlaps with the next completion; the
+    caller must await it before writing any newer message.
+    """
+    rows = [{
+        'session_id': session_id,
+        'role': 'assistant',
+        'content': content,
+        'tool_calls': tool_calls_json,
+        'tool_call_id': None
+    }]
+
+    messages.append({
+        "role": "assistant",
+        "content": content,
+        "tool_calls": tool_calls_json
+    })
+
+    calls = [
+        (tool_call, tool_call['function']['name'], orjson.loads(tool_call['function']['arguments'] or '{}'))
+        for tool_call in tool_calls_json
+    ]
+
+    # Several notes in one turn: embed them in a single API call up front
+    notes = list(dict.fromkeys(
+        tool_args['note'] for _, tool_name, tool_args in calls
+        if tool_name == 'add_note_about_person' and tool_args.get('note')
+    ))
+    embeddings = None
+    if len(notes) > 1:
+        embeddings = dict(zip(notes, await asyncio.to_thread(generate_embeddings_batch, notes)))
+
+    for _, tool_name, tool_args in calls:
+        print(f"[CHAT] Executing tool: {tool_name} with args: {tool_args}")
+    results = []
+    for group in _group_tool_calls(calls):
+        results.extend(await asyncio.gather(*(
+            execute_tool(tool_name, tool_args, user_id, embeddings)
+            for _, tool_name, tool_args in group
+        )))
+
+    tool_results = []
+    for (tool_call, tool_name, tool_args), result in zip(calls, results):
+        tool_results.append({
+            "tool": tool_name,
+            "args": tool_args,
+            "result": result
+        })
+
+        rows.append({
+            'session_id': session_id,
+            'role': 'tool',
+            'content': result,
+            'tool_calls': None,
+            'tool_call_id': tool_call['id']
+        })
+
+        messages.append({
+            "role": "tool",
+            "content": result,
+            "tool_call_id": tool_call['id']
+        })
+
+    # Same created_at for all rows; message_seq keeps them in list order
+    pending_save = asyncio.create_task(execute_async(supabase.table('chat_message').insert(rows, returning='minimal')))
+
+    return tool_results, pending_save
+
+
+async def _finish_chat_turn(supabase, session_id: str, final_content: str) -> None:
+    """Save the final assistant message and bump the session timestamp (one transaction)."""
+    await execute_async(supabase.rpc('finish_chat_turn', {
+        'p_session_id': session_id,
+        'p_content': final_content
+    }))
+
+
+CHAT_MAX_ITERATIONS = 5  # Prevent infinite tool loops
+CHAT_GIVE_UP_MESSAGE = "I apologize, but I'm having trouble completing this request. Please try again."
 
 
 @router.post("/chat", response_model=ChatResponse)
@@ -1637,160 +1870,175 @@ async def chat(
 
     Rate limited to 20 requests/minute to prevent API cost abuse.
     """
-    settings = get_settings()
     user_id = get_user_id(token_payload)
     supabase = get_supabase_admin()
-    client = openai.OpenAI(api_key=settings.openai_api_key)
+    client = get_async_openai()
 
-    # Get or create session
-    if chat_request.session_id:
-        # Verify session belongs to user
-        session_check = supabase.table('chat_session').select('session_id').eq(
-            'session_id', chat_request.session_id
-        ).eq('owner_id', user_id).execute()
+    session_id, messages = await _start_chat_turn(supabase, user_id, chat_request)
 
-        if not session_check.data:
-            raise HTTPException(status_code=404, detail="Session not found")
+    tool_results = []
+    pending_save = None  # previous round's history insert, overlapping this completion
+    try:
+        for _ in range(CHAT_MAX_ITERATIONS):
+            # Call OpenAI
+            response = await client.chat.completions.create(
+                model="gpt-4o",
+                messages=messages,
+                extra_body=TOOLS_BODY,
+                tool_choice="auto",
+                temperature=0.7
+            )
+            if pending_save:
+                await pending_save
+                pending_save = None
 
-        session_id = chat_request.session_id
-    else:
-        # Create new session
-        session = supabase.table('chat_session').insert({
-            'owner_id': user_id,
-            'title': chat_request.message[:50] + ('...' if len(chat_request.message) > 50 else '')
-        }).execute()
-        session_id = session.data[0]['session_id']
-
-    # Save user message
-    supabase.table('chat_message').insert({
-        'session_id': session_id,
-        'role': 'user',
-        'content': chat_request.message
-    }).execute()
+            assistant_message = response.choices[0].message
 
-    # Load conversation history
-    history = supabase.table('chat_message').select(
-        'role, content, tool_calls, tool_call_id'
-    ).eq('session_id', session_id).order('created_at').execute()
+            # Check if we need to call tools
+            if assistant_message.tool_calls:
+                tool_calls_json = [
+                    {
+                        "id": tc.id,
+                        "type": "function",
+                        "function": {
+                            "name": tc.function.name,
+                            "arguments": tc.function.arguments
+                        }
+                    }
+                    for tc in assistant_message.tool_calls
+                ]
+                round_results, pending_save = await _run_tool_calls(
+                    supabase, session_id, user_id, messages,
+                    assistant_message.content or "", tool_calls_json
+                )
+                tool_results.extend(round_results)
+            else:
+                # No more tool calls, save final response
+                final_content = assistant_message.content or ""
+                await _finish_chat_turn(supabase, session_id, final_content)
+
+                return ChatResponse(
+                    session_id=session_id,
+                    message=final_content,
+                    tool_results=tool_results if tool_results else None
+                )
 
-    # Build messages for OpenAI
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        # If we hit max iterations, return what we have
+        if pending_save:
+            await pending_save
+            pending_save = None
+        await _finish_chat_turn(supabase, session_id, CHAT_GIVE_UP_MESSAGE)
+        return ChatResponse(
+            session_id=session_id,
+            message=CHAT_GIVE_UP_MESSAGE,
+            tool_results=tool_results if tool_results else None
+        )
+    finally:
+        # Also when a completion fails or the client disconnects: let the
+        # history insert finish and raise its own error, if any
+        if pending_save:
+            await pending_save
 
-    for msg in history.data:
-        if msg['role'] == 'tool':
-            messages.append({
-                "role": "tool",
-                "content": msg['content'],
-                "tool_call_id": msg['tool_call_id']
-            })
-        elif msg['role'] == 'assistant' and msg.get('tool_calls'):
-            messages.append({
-                "role": "assistant",
-                "content": msg['content'] or "",
-                "tool_calls": msg['tool_calls']
-            })
-        else:
-            messages.append({
-                "role": msg['role'],
-                "content": msg['content']
-            })
 
-    tool_results = []
-    max_iterations = 5  # Prevent infinite loops
-
-    for _ in range(max_iterations):
-        # Call OpenAI
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=messages,
-            tools=TOOLS,
-            tool_choice="auto",
-            temperature=0.7
-        )
+def _sse(event: dict) -> bytes:
+    """One Server-Sent Events frame."""
+    return b"data: " + orjson.dumps(event) + b"\n\n"
 
-        assistant_message = response.choices[0].message
-
-        # Check if we need to call tools
-        if assistant_message.tool_calls:
-            # Save assistant message with tool calls
-            tool_calls_json = [
-                {
-                    "id": tc.id,
-                    "type": "function",
-                    "function": {
-                        "name": tc.function.name,
-                        "arguments": tc.function.arguments
-                    }
-                }
-                for tc in assistant_message.tool_calls
-            ]
-
-            supabase.table('chat_message').insert({
-                'session_id': session_id,
-                'role': 'assistant',
-                'content': assistant_message.content or '',
-                'tool_calls': tool_calls_json
-            }).execute()
-
-            messages.append({
-                "role": "assistant",
-                "content": assistant_message.content or "",
-                "tool_calls": tool_calls_json
-            })
 
-            # Execute each tool
-            for tool_call in assistant_message.tool_calls:
-                tool_name = tool_call.function.name
-                tool_args = json.loads(tool_call.function.arguments)
-
-                print(f"[CHAT] Executing tool: {tool_name} with args: {tool_args}")
-
-                result = await execute_tool(tool_name, tool_args, user_id)
-                tool_results.append({
-                    "tool": tool_name,
-                    "args": tool_args,
-                    "result": result
-                })
-
-                # Save tool response
-                supabase.table('chat_message').insert({
-                    'session_id': session_id,
-                    'role': 'tool',
-                    'content': result,
-                    'tool_call_id': tool_call.id
-                }).execute()
-
-                messages.append({
-                    "role": "tool",
-                    "content": result,
-                    "tool_call_id": tool_call.id
-                })
-        else:
-            # No more tool calls, save final response
-            final_content = assistant_message.content or ""
-
-            supabase.table('chat_message').insert({
-                'session_id': session_id,
-                'role': 'assistant',
-                'content': final_content
-            }).execute()
-
-            # Update session timestamp
-            supabase.table('chat_session').update({
-                'updated_at': 'now()'
-            }).eq('session_id', session_id).execute()
-
-            return ChatResponse(
-                session_id=session_id,
-                message=final_content,
-                tool_results=tool_results if tool_results else None
+async def _chat_stream(client, supabase, session_id: str, user_id: str, messages: list[dict]):
+    """
+    Run the tool loop with stream=True and forward text deltas as SSE.
+
+    Events: {"type": "delta", "content"}, {"type": "tool", "tool", "args"}
+    after each executed tool, then {"type": "done", "session_id", "message"}.
+    """
+    pending_save = None  # previous round's history insert, overlapping this stream
+    try:
+        for _ in range(CHAT_MAX_ITERATIONS):
+            stream = await client.chat.completions.create(
+                model="gpt-4o",
+                messages=messages,
+                extra_body=TOOLS_BODY,
+                tool_choice="auto",
+                temperature=0.7,
+                stream=True
             )
 
-    # If we hit max iterations, return what we have
-    return ChatResponse(
-        session_id=session_id,
-        message="I apologize, but I'm having trouble completing this request. Please try again.",
-        tool_results=tool_results if tool_results else None
+            content_parts = []
+            tool_calls: dict[int, dict] = {}  # index -> tool call assembled from deltas
+
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    content_parts.append(delta.content)
+                    yield _sse({"type": "delta", "content": delta.content})
+                for tc in delta.tool_calls or ():
+                    call = tool_calls.setdefault(tc.index, {
+                        "id": "",
+                        "type": "function",
+                        "function": {"name": "", "arguments": ""}
+                    })
+                    if tc.id:
+                        call["id"] = tc.id
+                    if tc.function:
+                        if tc.function.name:
+                            call["function"]["name"] += tc.function.name
+                        if tc.function.arguments:
+                            call["function"]["arguments"] += tc.function.arguments
+
+            content = "".join(content_parts)
+            if pending_save:
+                await pending_save
+                pending_save = None
+
+            if tool_calls:
+                tool_calls_json = [tool_calls[i] for i in sorted(tool_calls)]
+                round_results, pending_save = await _run_tool_calls(
+                    supabase, session_id, user_id, messages, content, tool_calls_json
+                )
+                for tool_result in round_results:
+                    yield _sse({"type": "tool", "tool": tool_result["tool"], "args": tool_result["args"]})
+            else:
+                await _finish_chat_turn(supabase, session_id, content)
+                yield _sse({"type": "done", "session_id": session_id, "message": content})
+                return
+
+        if pending_save:
+            await pending_save
+            pending_save = None
+        await _finish_chat_turn(supabase, session_id, CHAT_GIVE_UP_MESSAGE)
+        yield _sse({"type": "done", "session_id": session_id, "message": CHAT_GIVE_UP_MESSAGE})
+    finally:
+        # Also when a completion fails or the client disconnects: let the
+        # history insert finish and raise its own error, if any
+        if pending_save:
+            await pending_save
+
+
+@router.post("/chat/stream")
+@limiter.limit("20/minute")  # Same budget as /chat
+async def chat_stream(
+    request: Request,  # Required for rate limiter
+    chat_request: ChatRequest,
+    token_payload: dict = Depends(verify_supabase_token)
+):
+    """
+    Streaming variant of /chat: text/event-stream of model output as it is
+    generated. /chat keeps returning a single ChatResponse.
+    """
+    user_id = get_user_id(token_payload)
+    supabase = get_supabase_admin()
+    client = get_async_openai()
+
+    # Before the first byte, so an unknown session is still a plain 404
+    session_id, messages = await _start_chat_turn(supabase, user_id, chat_request)
+
+    return StreamingResponse(
+        _chat_stream(client, supabase, session_id, user_id, messages),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
@@ -1802,9 +2050,9 @@ async def list_sessions(
     user_id = get_user_id(token_payload)
     supabase = get_supabase_admin()
 
-    sessions = supabase.table('chat_session').select(
+    sessions = await execute_async(supabase.table('chat_session').select(
         'session_id, title, created_at, updated_at'
-    ).eq('owner_id', user_id).order('updated_at', desc=True).limit(20).execute()
+    ).eq('owner_id', user_id).order('updated_at', desc=True).limit(20))
 
     return {"sessions": sessions.data}
 
@@ -1819,16 +2067,12 @@ async def get_session_messages(
     supabase = get_supabase_admin()
 
     # Verify session belongs to user
-    session_check = supabase.table('chat_session').select('session_id').eq(
-        'session_id', session_id
-    ).eq('owner_id', user_id).execute()
-
-    if not session_check.data:
+    if not await _owns_session(supabase, user_id, session_id):
         raise HTTPException(status_code=404, detail="Session not found")
 
-    messages = supabase.table('chat_message').select(
+    messages = await execute_async(supabase.table('chat_message').select(
         'message_id, role, content, created_at'
-    ).eq('session_id', session_id).neq('role', 'tool').order('created_at').execute()
+    ).eq('session_id', session_id).neq('role', 'tool').order('created_at').order('message_seq'))
 
     return {"messages": messages.data}
 
@@ -1884,33 +2128,23 @@ async def chat_direct(message: str, user_id: str, session_id: Optional[str] = No
     Just calls find_people once, returns results.
     No agentic loop, no multiple tools — that's what Tier 2 (Claude Agent) is for.
     """
-    settings = get_settings()
     supabase = get_supabase_admin()
-    client = openai.OpenAI(api_key=settings.openai_api_key)
 
     print(f"[TIER1] Starting fast search for: {message[:50]}...")
 
     # Get or create session (for history/context)
+    if session_id and not await _owns_session(supabase, user_id, session_id):
+        session_id = None
+
     if session_id:
-        session_check = supabase.table('chat_session').select('session_id').eq(
-            'session_id', session_id
-        ).eq('owner_id', user_id).execute()
-        if not session_check.data:
-            session_id = None
-
-    if not session_id:
-        session = supabase.table('chat_session').insert({
-            'owner_id': user_id,
-            'title': message[:50] + ('...' if len(message) > 50 else '')
-        }).execute()
-        session_id = session.data[0]['session_id']
-
-    # Save user message
-    supabase.table('chat_message').insert({
-        'session_id': session_id,
-        'role': 'user',
-        'content': message
-    }).execute()
+        # Save user message
+        await execute_async(supabase.table('chat_message').insert({
+            'session_id': session_id,
+            'role': 'user',
+            'content': message
+        }, returning='minimal'))
+    else:
+        session_id = await _start_session(supabase, user_id, message)
 
     # === TIER 1: Single call to find_people ===
     search_result = await execute_tool("find_people", {"query": message, "limit": 20}, user_id)
@@ -1918,7 +2152,7 @@ async def chat_direct(message: str, user_id: str, session_id: Optional[str] = No
     # Parse results
     found_people = []
     try:
-        result_data = json.loads(search_result)
+        result_data = orjson.loads(search_result)
         people_list = result_data.get('people', [])
         for p in people_list:
             if isinstance(p, dict):
@@ -1932,7 +2166,7 @@ async def chat_direct(message: str, user_id: str, session_id: Optional[str] = No
                         'motivation': motivation
                     })
         print(f"[TIER1] find_people returned {len(found_people)} people")
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         print(f"[TIER1] ERROR parsing find_people result: {e}")
 
     # Generate simple response text
@@ -1954,11 +2188,11 @@ async def chat_direct(message: str, user_id: str, session_id: Optional[str] = No
         response_text = "I couldn't find anyone matching your query. Try 'Dig deeper' for a more thorough search, or rephrase your query."
 
     # Save assistant response
-    supabase.table('chat_message').insert({
+    await execute_async(supabase.table('chat_message').insert({
         'session_id': session_id,
         'role': 'assistant',
         'content': response_text
-    }).execute()
+    }, returning='minimal'))
 
     print(f"[TIER1] Complete in single call, {len(found_people)} people found")
 
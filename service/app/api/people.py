@@ -4,6 +4,7 @@ People API.
 Endpoints for managing people and their identities/contacts.
 """
 
+from collections import Counter
 from typing import Optional
 from uuid import UUID
 
@@ -166,19 +167,15 @@ async def list_people(
     ).in_('person_id', person_ids).execute()
 
     # Count identities per person and check for email
-    identity_counts = {}
-    has_email_map = {}
-    for i in identities_result.data or []:
-        pid = i['person_id']
-        identity_counts[pid] = identity_counts.get(pid, 0) + 1
-        if i['namespace'] == 'email':
-            has_email_map[pid] = True
+    identities = identities_result.data or []
+    identity_counts = Counter(i['person_id'] for i in identities)
+    people_with_email = {i['person_id'] for i in identities if i['namespace'] == 'email'}
 
     # Filter by has_email if specified
     result = []
     for p in people_result.data:
         pid = p['person_id']
-        person_has_email = has_email_map.get(pid, False)
+        person_has_email = pid in people_with_email
 
         if has_email is not None:
             if has_email and not person_has_email:
@@ -194,7 +191,7 @@ async def list_people(
             created_at=p['created_at'],
             owner_id=p['owner_id'],
             is_own=p['owner_id'] == user_id,
-            identity_count=identity_counts.get(pid, 0),
+            identity_count=identity_counts[pid],
             has_email=person_has_email
         ))
 
@@ -16,9 +16,10 @@ from app.middleware.auth import verify_supabase_token, get_user_id
 from app.services.embedding import generate_embeddings_batch, create_assertion_text
 from app.agents.self_intro_prompt import (
     SELF_INTRO_SYSTEM_PROMPT,
+    SELF_INTRO_USER_PREFIX,
     SELF_INTRO_PREDICATE_MAP
 )
-from app.config import get_settings
+from app.openai_client import get_openai
 
 router = APIRouter(prefix="/profile", tags=["profile"])
 
@@ -72,15 +73,13 @@ def extract_self_intro(text: str) -> dict:
 
     Returns dict with: name, current_role, can_help_with, looking_for, etc.
     """
-    import openai
-    settings = get_settings()
-    client = openai.OpenAI(api_key=settings.openai_api_key)
+    client = get_openai()
 
     response = client.chat.completions.create(
         model="gpt-4o",
         messages=[
             {"role": "system", "content": SELF_INTRO_SYSTEM_PROMPT},
-            {"role": "user", "content": f"Extract information from this self-introduction:\n\n{text}"}
+            {"role": "user", "content": SELF_INTRO_USER_PREFIX + text}
         ],
         response_format={"type": "json_object"},
         temperature=0.1
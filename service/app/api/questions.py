@@ -4,7 +4,7 @@ Proactive Questions API
 Endpoints for managing proactive questions that help fill profile gaps.
 """
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Optional
 from uuid import UUID
 
@@ -74,12 +74,12 @@ def _check_rate_limit(supabase, user_id: str, settings) -> tuple[bool, Optional[
 
     # Check if paused
     if rate.get("paused_until"):
-        paused_until = datetime.fromisoformat(rate["paused_until"].replace("Z", "+00:00"))
+        paused_until = datetime.fromisoformat(rate["paused_until"])
         if now < paused_until:
             return False, f"Questions paused until {paused_until.date()}"
 
     # Reset daily counter if needed
-    last_reset = datetime.strptime(rate["last_daily_reset"], "%Y-%m-%d").date()
+    last_reset = date.fromisoformat(rate["last_daily_reset"])
     if today > last_reset:
         supabase.from_("question_rate_limit").update({
             "questions_shown_today": 0,
@@ -94,7 +94,7 @@ def _check_rate_limit(supabase, user_id: str, settings) -> tuple[bool, Optional[
 
     # Check cooldown
     if rate.get("last_question_at"):
-        last_question = datetime.fromisoformat(rate["last_question_at"].replace("Z", "+00:00"))
+        last_question = datetime.fromisoformat(rate["last_question_at"])
         cooldown = timedelta(hours=settings.questions_cooldown_hours)
         if now - last_question < cooldown:
             remaining = cooldown - (now - last_question)
@@ -103,29 +103,6 @@ def _check_rate_limit(supabase, user_id: str, settings) -> tuple[bool, Optional[
     return True, None
 
 
-def _update_rate_limit_on_show(supabase, user_id: str):
-    """Update rate limit when a question is shown."""
-    supabase.from_("question_rate_limit").upsert({
-        "owner_id": user_id,
-        "questions_shown_today": supabase.rpc("increment_questions_shown", {"p_user_id": user_id}).execute().data or 1,
-        "last_question_at": datetime.utcnow().isoformat(),
-        "updated_at": "now()"
-    }, on_conflict="owner_id").execute()
-
-    # Simpler approach: just update
-    result = supabase.from_("question_rate_limit").select("questions_shown_today").eq(
-        "owner_id", user_id
-    ).execute()
-
-    current = result.data[0]["questions_shown_today"] if result.data else 0
-
-    supabase.from_("question_rate_limit").update({
-        "questions_shown_today": current + 1,
-        "last_question_at": datetime.utcnow().isoformat(),
-        "updated_at": "now()"
-    }).eq("owner_id", user_id).execute()
-
-
 def _update_rate_limit_on_dismiss(supabase, user_id: str, settings):
     """Update rate limit when a question is dismissed."""
     result = supabase.from_("question_rate_limit").select("consecutive_dismisses").eq(
@@ -207,14 +184,11 @@ async def get_next_question(
 
     question = result.data[0]
 
-    # Mark as shown
-    supabase.from_("proactive_question").update({
-        "status": "shown",
-        "shown_at": datetime.utcnow().isoformat()
-    }).eq("question_id", question["question_id"]).execute()
-
-    # Update rate limit
-    _update_rate_limit_on_show(supabase, user_id)
+    # Mark as shown and count it against the rate limit
+    supabase.rpc("mark_question_shown", {
+        "p_owner_id": user_id,
+        "p_question_id": question["question_id"]
+    }).execute()
 
     person_name = None
     if question.get("person") and question["person"]:
@@ -28,6 +28,9 @@ class Settings(BaseSettings):
     pdl_monthly_limit: int = 100
     pdl_daily_limit: int = 5
 
+    # Extraction prompt: False sends the compact user prefix (A/B)
+    extraction_verbose_prompt: bool = True
+
     # Proactive questions
     questions_max_per_day: int = 3
     questions_cooldown_hours: int = 1
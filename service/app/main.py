@@ -1,7 +1,7 @@
 import asyncio
 from fastapi import FastAPI, Request, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
@@ -27,7 +27,8 @@ from app.telegram_bot.bot import handle_telegram_update, initialize_bot, shutdow
 app = FastAPI(
     title="Atlantis Plus API",
     description="AI-first Personal Network Memory",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=ORJSONResponse
 )
 
 # Attach rate limiter to app
@@ -78,10 +79,9 @@ async def deep_health_check():
     Deep health check - verifies all external integrations.
     Safe to call anytime, useful for automated testing.
     """
-    import openai
+    from app.openai_client import get_openai
     from app.supabase_client import get_supabase_admin
 
-    settings = get_settings()
     checks = {}
 
     # Check Supabase
@@ -95,8 +95,7 @@ async def deep_health_check():
 
     # Check OpenAI (using models.list - cheaper than chat completion)
     try:
-        client = openai.OpenAI(api_key=settings.openai_api_key)
-        models = client.models.list()
+        models = get_openai().models.list()
         checks["openai"] = "ok" if models.data else "error"
     except Exception as e:
         print(f"[HEALTH] OpenAI check failed: {e}")
@@ -0,0 +1,19 @@
+from functools import lru_cache
+
+from openai import AsyncOpenAI, OpenAI
+from app.config import get_settings
+
+
+@lru_cache(maxsize=1)
+def get_openai() -> OpenAI:
+    """
+    Process-wide sync client so calls reuse one HTTP connection pool
+    (no TCP/TLS handshake per call). Thread-safe: also used from to_thread.
+    """
+    return OpenAI(api_key=get_settings().openai_api_key)
+
+
+@lru_cache(maxsize=1)
+def get_async_openai() -> AsyncOpenAI:
+    """Process-wide async client for the API's event loop (chat endpoints)."""
+    return AsyncOpenAI(api_key=get_settings().openai_api_key)
@@ -9,7 +9,7 @@ from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
-from ..supabase_client import get_supabase_admin
+from ..supabase_client import execute_async, get_supabase_admin
 
 
 @dataclass
@@ -53,7 +53,7 @@ class DeduplicationService:
         2. Name similarity (pg_trgm)
         3. Embedding similarity (if both have embeddings)
         """
-        result = self.supabase.rpc(
+        result = await execute_async(self.supabase.rpc(
             "find_similar_people",
             {
                 "p_owner_id": str(owner_id),
@@ -61,7 +61,7 @@ class DeduplicationService:
                 "p_name_threshold": name_threshold,
                 "p_embedding_threshold": embedding_threshold
             }
-        ).execute()
+        ))
 
         if not result.data:
             return []
@@ -95,9 +95,9 @@ class DeduplicationService:
         Returns pairs of people who might be duplicates.
         """
         # Get all active people
-        people = self.supabase.from_("person").select(
+        people = await execute_async(self.supabase.from_("person").select(
             "person_id, display_name"
-        ).eq("owner_id", str(owner_id)).eq("status", "active").execute()
+        ).eq("owner_id", str(owner_id)).eq("status", "active"))
 
         if not people.data:
             return []
@@ -147,24 +147,24 @@ class DeduplicationService:
     ) -> Optional[dict]:
         """Create a proactive question for dedup confirmation."""
         # Check if question already exists
-        existing = self.supabase.from_("proactive_question").select(
+        existing = await execute_async(self.supabase.from_("proactive_question").select(
             "question_id"
         ).eq("owner_id", str(owner_id)).eq("question_type", "dedup_confirm").eq(
             "status", "pending"
-        ).execute()
+        ))
 
         # Check if this specific pair already has a question
         for q in existing.data or []:
-            q_detail = self.supabase.from_("proactive_question").select(
+            q_detail = await execute_async(self.supabase.from_("proactive_question").select(
                 "metadata"
-            ).eq("question_id", q["question_id"]).execute()
+            ).eq("question_id", q["question_id"]))
             if q_detail.data:
                 meta = q_detail.data[0].get("metadata", {})
                 if meta.get("candidate_person_id") in [str(person_a_id), str(person_b_id)]:
                     return None  # Already exists
 
         # Create question
-        result = self.supabase.from_("proactive_question").insert({
+        result = await execute_async(self.supabase.from_("proactive_question").insert({
             "owner_id": str(owner_id),
             "person_id": str(person_a_id),
             "question_type": "dedup_confirm",
@@ -177,7 +177,7 @@ class DeduplicationService:
                 "match_score": match_score
             },
             "status": "pending"
-        }).execute()
+        }))
 
         return result.data[0] if result.data else None
 
@@ -195,27 +195,27 @@ class DeduplicationService:
         - Marks merge_person as 'merged'
         """
         # Verify both belong to owner
-        check = self.supabase.from_("person").select("person_id").eq(
+        check = await execute_async(self.supabase.from_("person").select("person_id").eq(
             "owner_id", str(owner_id)
-        ).in_("person_id", [str(keep_person_id), str(merge_person_id)]).execute()
+        ).in_("person_id", [str(keep_person_id), str(merge_person_id)]))
 
         if len(check.data) != 2:
             raise ValueError("Both people must belong to the owner")
 
         # Move assertions
-        assertions_result = self.supabase.from_("assertion").update({
+        assertions_result = await execute_async(self.supabase.from_("assertion").update({
             "subject_person_id": str(keep_person_id)
-        }).eq("subject_person_id", str(merge_person_id)).execute()
+        }).eq("subject_person_id", str(merge_person_id)))
         assertions_moved = len(assertions_result.data) if assertions_result.data else 0
 
         # Move edges (both directions)
-        edges_src = self.supabase.from_("edge").update({
+        edges_src = await execute_async(self.supabase.from_("edge").update({
             "src_person_id": str(keep_person_id)
-        }).eq("src_person_id", str(merge_person_id)).execute()
+        }).eq("src_person_id", str(merge_person_id)))
 
-        edges_dst = self.supabase.from_("edge").update({
+        edges_dst = await execute_async(self.supabase.from_("edge").update({
             "dst_person_id": str(keep_person_id)
-        }).eq("dst_person_id", str(merge_person_id)).execute()
+        }).eq("dst_person_id", str(merge_person_id)))
 
         edges_moved = (
             (len(edges_src.data) if edges_src.data else 0) +
@@ -223,29 +223,29 @@ class DeduplicationService:
         )
 
         # Remove self-referential edges that might have been created
-        self.supabase.from_("edge").delete().eq(
+        await execute_async(self.supabase.from_("edge").delete().eq(
             "src_person_id", str(keep_person_id)
-        ).eq("dst_person_id", str(keep_person_id)).execute()
+        ).eq("dst_person_id", str(keep_person_id)))
 
         # Move identities
-        identities_result = self.supabase.from_("identity").update({
+        identities_result = await execute_async(self.supabase.from_("identity").update({
             "person_id": str(keep_person_id)
-        }).eq("person_id", str(merge_person_id)).execute()
+        }).eq("person_id", str(merge_person_id)))
         identities_moved = len(identities_result.data) if identities_result.data else 0
 
         # Mark merged person
-        self.supabase.from_("person").update({
+        await execute_async(self.supabase.from_("person").update({
             "status": "merged",
             "merged_into_person_id": str(keep_person_id),
             "updated_at": datetime.utcnow().isoformat()
-        }).eq("person_id", str(merge_person_id)).execute()
+        }).eq("person_id", str(merge_person_id)))
 
         # Update person_match_candidate if exists
-        self.supabase.from_("person_match_candidate").update({
+        await execute_async(self.supabase.from_("person_match_candidate").update({
             "status": "merged"
         }).or_(
             f"a_person_id.eq.{merge_person_id},b_person_id.eq.{merge_person_id}"
-        ).execute()
+        ))
 
         return MergeResult(
             kept_person_id=keep_person_id,
@@ -263,21 +263,21 @@ class DeduplicationService:
     ) -> bool:
         """Mark two people as definitely NOT duplicates."""
         # Create or update match candidate as rejected
-        self.supabase.from_("person_match_candidate").upsert({
+        await execute_async(self.supabase.from_("person_match_candidate").upsert({
             "owner_id": str(owner_id),
             "a_person_id": str(min(person_a_id, person_b_id, key=str)),
             "b_person_id": str(max(person_a_id, person_b_id, key=str)),
             "score": 0,
             "reasons": {"rejected_by_user": True},
             "status": "rejected"
-        }, on_conflict="a_person_id,b_person_id").execute()
+        }, on_conflict="a_person_id,b_person_id"))
 
         # Dismiss any pending questions about this pair
-        self.supabase.from_("proactive_question").update({
+        await execute_async(self.supabase.from_("proactive_question").update({
             "status": "dismissed"
         }).eq("person_id", str(person_a_id)).eq("question_type", "dedup_confirm").contains(
             "metadata", {"candidate_person_id": str(person_b_id)}
-        ).execute()
+        ))
 
         return True
 
@@ -329,9 +329,9 @@ class DeduplicationService:
         Returns dict with checked count and duplicates found.
         """
         # Get all people from this batch
-        batch_people = self.supabase.from_("person").select(
+        batch_people = await execute_async(self.supabase.from_("person").select(
             "person_id, display_name"
-        ).eq("import_batch_id", batch_id).eq("status", "active").execute()
+        ).eq("import_batch_id", batch_id).eq("status", "active"))
 
         if not batch_people.data:
             return {"checked": 0, "duplicates_found": 0}
@@ -362,14 +362,14 @@ class DeduplicationService:
                 seen_pairs.add(pair)
 
                 # Check if this pair already has a candidate record
-                existing = self.supabase.from_("person_match_candidate").select(
+                existing = await execute_async(self.supabase.from_("person_match_candidate").select(
                     "id"
-                ).eq("a_person_id", pair[0]).eq("b_person_id", pair[1]).execute()
+                ).eq("a_person_id", pair[0]).eq("b_person_id", pair[1]))
 
                 if not existing.data:
                     # Create match candidate
                     try:
-                        self.supabase.from_("person_match_candidate").insert({
+                        await execute_async(self.supabase.from_("person_match_candidate").insert({
                             "a_person_id": pair[0],
                             "b_person_id": pair[1],
                             "score": candidate.match_score,
@@ -381,7 +381,7 @@ class DeduplicationService:
                                 **candidate.match_details
                             },
                             "status": "pending"
-                        }).execute()
+                        }))
                         duplicates_found += 1
                     except Exception as e:
                         print(f"[DEDUP] Failed to create match candidate: {e}")
@@ -1,5 +1,28 @@
-from openai import OpenAI
-from app.config import get_settings
+from array import array
+from functools import lru_cache
+
+from app.openai_client import get_openai
+
+# Query embeddings are cached per process: repeated searches and agent
+# retries embed the same strings. Vectors are stored as array('d')
+# (~12 KB each) rather than lists of float objects (~50 KB each).
+EMBEDDING_CACHE_SIZE = 512
+EMBEDDING_CACHE_MAX_CHARS = 2000  # longer texts (notes) are embedded uncached
+
+
+def _embed(text: str) -> list[float]:
+    response = get_openai().embeddings.create(
+        model="text-embedding-3-small",
+        input=text,
+        dimensions=1536
+    )
+
+    return response.data[0].embedding
+
+
+@lru_cache(maxsize=EMBEDDING_CACHE_SIZE)
+def _embed_cached(text: str) -> array:
+    return array("d", _embed(text))
 
 
 def generate_embedding(text: str) -> list[float]:
@@ -12,16 +35,9 @@ def generate_embedding(text: str) -> list[float]:
     Returns:
         1536-dimensional embedding vector
     """
-    settings = get_settings()
-    client = OpenAI(api_key=settings.openai_api_key)
-
-    response = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=text,
-        dimensions=1536
-    )
-
-    return response.data[0].embedding
+    if len(text) > EMBEDDING_CACHE_MAX_CHARS:
+        return _embed(text)
+    return _embed_cached(text).tolist()
 
 
 def generate_embeddings_batch(texts: list[str]) -> list[list[float]]:
@@ -37,10 +53,7 @@ def generate_embeddings_batch(texts: list[str]) -> list[list[float]]:
     if not texts:
         return []
 
-    settings = get_settings()
-    client = OpenAI(api_key=settings.openai_api_key)
-
-    response = client.embeddings.create(
+    response = get_openai().embeddings.create(
         model="text-embedding-3-small",
         input=texts,
         dimensions=1536
@@ -81,8 +81,8 @@ class EnrichmentService:
         quota = result.data[0]
 
         # Reset counters if needed
-        last_daily = datetime.strptime(quota["last_daily_reset"], "%Y-%m-%d").date()
-        last_monthly = datetime.strptime(quota["last_monthly_reset"], "%Y-%m-%d").date()
+        last_daily = date.fromisoformat(quota["last_daily_reset"])
+        last_monthly = date.fromisoformat(quota["last_monthly_reset"])
 
         updates = {}
         if today > last_daily:
@@ -1,9 +1,12 @@
-import json
 from typing import Optional
 from dataclasses import dataclass
-from openai import OpenAI
 from app.config import get_settings
-from app.agents.prompts import EXTRACTION_SYSTEM_PROMPT
+from app.openai_client import get_openai
+from app.agents.prompts import (
+    EXTRACTION_JSON_SYSTEM_PROMPT,
+    EXTRACTION_JSON_USER_PREFIX,
+    EXTRACTION_JSON_USER_PREFIX_COMPACT,
+)
 from app.agents.schemas import ExtractionResult
 from app.services.embedding import generate_embeddings_batch, create_assertion_text
 from app.utils import normalize_linkedin_url
@@ -77,8 +80,10 @@ def process_extraction_result(
                 })
 
         # Add structured identifiers (with normalization)
-        if person.identifiers.telegram:
-            tg_value = person.identifiers.telegram.lstrip('@')
+        identifiers = person.identifiers
+        telegram = identifiers.get("telegram")
+        if telegram:
+            tg_value = telegram.lstrip('@')
             if tg_value:
                 identities.append({
                     "person_id": person_id,
@@ -86,15 +91,17 @@ def process_extraction_result(
                     "value": tg_value
                 })
 
-        if person.identifiers.email:
+        email = identifiers.get("email")
+        if email:
             identities.append({
                 "person_id": person_id,
                 "namespace": "email",
-                "value": person.identifiers.email.lower()
+                "value": email.lower()
             })
 
-        if person.identifiers.linkedin:
-            normalized_linkedin = normalize_linkedin_url(person.identifiers.linkedin)
+        linkedin = identifiers.get("linkedin")
+        if linkedin:
+            normalized_linkedin = normalize_linkedin_url(linkedin)
             if normalized_linkedin:
                 identities.append({
                     "person_id": person_id,
@@ -102,16 +109,15 @@ def process_extraction_result(
                     "value": normalized_linkedin
                 })
 
-        if person.identifiers.phone:
-            phone_value = person.identifiers.phone
-            if phone_value:
-                normalized = ''.join(c for c in phone_value if c.isdigit() or c == '+')
-                if normalized:
-                    identities.append({
-                        "person_id": person_id,
-                        "namespace": "phone",
-                        "value": normalized
-                    })
+        phone_value = identifiers.get("phone")
+        if phone_value:
+            normalized = ''.join(c for c in phone_value if c.isdigit() or c == '+')
+            if normalized:
+                identities.append({
+                    "person_id": person_id,
+                    "namespace": "phone",
+                    "value": normalized
+                })
 
         # Insert identities (ignore duplicates)
         for identity in identities:
@@ -192,50 +198,24 @@ def extract_from_text_simple(text: str) -> ExtractionResult:
     Fallback extraction using regular JSON mode (if strict schema fails).
     """
     settings = get_settings()
-    client = OpenAI(api_key=settings.openai_api_key)
+    client = get_openai()
+    user_prefix = (
+        EXTRACTION_JSON_USER_PREFIX if settings.extraction_verbose_prompt
+        else EXTRACTION_JSON_USER_PREFIX_COMPACT
+    )
 
     response = client.chat.completions.create(
         model="gpt-4o",
         messages=[
-            {"role": "system", "content": EXTRACTION_SYSTEM_PROMPT + "\n\nRespond with valid JSON matching the schema."},
-            {"role": "user", "content": f"""Extract information from this note and return JSON with this structure:
-{{
-  "people": [{{ "temp_id": "p1", "name": "...", "name_variations": [], "identifiers": {{}} }}],
-  "assertions": [{{ "subject": "p1", "predicate": "works_at", "value": "...", "confidence": 0.8 }}],
-  "edges": [{{ "source": "p1", "target": "p2", "type": "knows", "context": "..." }}]
-}}
-
-IMPORTANT - ALLOWED PREDICATES (you MUST use ONLY these):
-- works_at: current company/organization
-- role_is: current job title/role
-- strong_at: skills, expertise (e.g., "frontend development", "ML")
-- can_help_with: specific things they can help with
-- worked_on: notable projects or achievements
-- background: education, career history (e.g., "entrepreneur", "founded 3 companies")
-- located_in: current location
-- speaks_language: languages
-- interested_in: hobbies, interests (e.g., "meditation", "kitesurfing")
-- reputation_note: what others say
-- contact_context: how we met
-- relationship_depth: shared experiences
-- recommend_for: recommended for specific areas
-- not_recommend_for: not recommended for specific areas
-
-BREAK DOWN into multiple assertions! Don't lump everything into one "note" - use specific predicates above.
-
-Note:
-{text}"""}
+            {"role": "system", "content": EXTRACTION_JSON_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prefix + text}
         ],
         response_format={"type": "json_object"},
         temperature=0.1
     )
 
     result_json = response.choices[0].message.content
-    result_dict = json.loads(result_json)
-
-    # Handle missing fields
-    result_dict.setdefault("people", [])
-    result_dict.setdefault("assertions", [])
-    result_dict.setdefault("edges", [])
 
-    return ExtractionResult(**result_dict)
+    # pydantic-core parses the JSON text directly (no intermediate dict).
+    # Missing people/assertions/edges fall back to the model defaults.
+    return ExtractionResult.model_validate_json(result_json)
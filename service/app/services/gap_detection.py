@@ -10,7 +10,7 @@ from datetime import datetime, timedelta
 from typing import Optional
 from uuid import UUID
 
-from ..supabase_client import get_supabase_admin
+from ..supabase_client import execute_async, get_supabase_admin
 
 
 @dataclass
@@ -80,10 +80,10 @@ class GapDetectionService:
 
     async def get_profile_completeness(self, person_id: UUID) -> ProfileCompleteness:
         """Calculate profile completeness for a person."""
-        result = self.supabase.rpc(
+        result = await execute_async(self.supabase.rpc(
             "calculate_profile_completeness",
             {"p_person_id": str(person_id)}
-        ).execute()
+        ))
 
         if not result.data:
             return ProfileCompleteness(
@@ -163,7 +163,7 @@ class GapDetectionService:
         seven_days_ago = (datetime.utcnow() - timedelta(days=7)).isoformat()
 
         # Get active people with completeness info
-        result = self.supabase.from_("person").select(
+        result = await execute_async(self.supabase.from_("person").select(
             "person_id, display_name, created_at"
         ).eq(
             "owner_id", str(owner_id)
@@ -171,7 +171,7 @@ class GapDetectionService:
             "status", "active"
         ).order(
             "created_at", desc=True
-        ).limit(50).execute()
+        ).limit(50))
 
         if not result.data:
             return []
@@ -185,13 +185,13 @@ class GapDetectionService:
                 continue  # No gaps
 
             # Check if already has pending question
-            pending = self.supabase.from_("proactive_question").select(
+            pending = await execute_async(self.supabase.from_("proactive_question").select(
                 "question_id"
             ).eq(
                 "person_id", str(person_id)
             ).eq(
                 "status", "pending"
-            ).limit(1).execute()
+            ).limit(1))
 
             if pending.data:
                 continue  # Already has question
@@ -220,7 +220,7 @@ class GapDetectionService:
         question: GapQuestion
     ) -> Optional[dict]:
         """Create a proactive question in the database."""
-        result = self.supabase.from_("proactive_question").insert({
+        result = await execute_async(self.supabase.from_("proactive_question").insert({
             "owner_id": str(owner_id),
             "person_id": str(person_id),
             "question_type": question.question_type,
@@ -229,7 +229,7 @@ class GapDetectionService:
             "priority": question.priority,
             "metadata": question.metadata,
             "status": "pending"
-        }).execute()
+        }))
 
         return result.data[0] if result.data else None
 
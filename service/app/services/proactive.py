@@ -223,9 +223,7 @@ class ProactiveNotificationService:
 
                 # Check if paused
                 if rate.get("paused_until"):
-                    paused_until = datetime.fromisoformat(
-                        rate["paused_until"].replace("Z", "+00:00")
-                    )
+                    paused_until = datetime.fromisoformat(rate["paused_until"])
                     if now < paused_until:
                         return None
 
@@ -0,0 +1,75 @@
+"""
+Semantic Cache Service
+
+Reuses recent vector-search results for near-duplicate queries.
+"AI experts" and "people good at AI" embed to almost the same vector and
+match the same assertions, so a cached result is returned when cosine
+similarity with a recent query is above the threshold.
+"""
+
+import math
+import time
+from array import array
+from collections import OrderedDict, deque
+from operator import mul
+from typing import Any, Optional
+
+
+class SemanticCache:
+    """
+    Small per-scope (per-user) cache of (embedding -> result).
+
+    Scopes keep tenants apart; entries expire after `ttl` seconds so new
+    notes show up in search. Lookups are a linear scan over at most
+    `max_entries` vectors per scope.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.97,
+        max_entries: int = 32,
+        ttl: float = 300,
+        max_scopes: int = 1024
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_scopes = max_scopes
+        # scope -> deque of (expires_at, unit vector, value)
+        self._entries: OrderedDict[str, deque] = OrderedDict()
+
+    @staticmethod
+    def _unit(embedding: list[float]) -> array:
+        norm = math.sqrt(sum(map(mul, embedding, embedding))) or 1.0
+        return array("d", (x / norm for x in embedding))
+
+    def get(self, scope: str, embedding: list[float]) -> Optional[Any]:
+        entries = self._entries.get(scope)
+        if not entries:
+            return None
+
+        now = time.monotonic()
+        while entries and entries[0][0] <= now:
+            entries.popleft()
+
+        query = self._unit(embedding)
+        best_score, best_value = 0.0, None
+        for _, vector, value in entries:
+            score = sum(map(mul, query, vector))
+            if score > best_score:
+                best_score, best_value = score, value
+        return best_value if best_score >= self.threshold else None
+
+    def put(self, scope: str, embedding: list[float], value: Any) -> None:
+        entries = self._entries.get(scope)
+        if entries is None:
+            entries = self._entries[scope] = deque(maxlen=self.max_entries)
+            if len(self._entries) > self.max_scopes:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(scope)
+        entries.append((time.monotonic() + self.ttl, self._unit(embedding), value))
+
+    def invalidate(self, scope: str) -> None:
+        """Forget a scope's entries (call after the scope's data changed)."""
+        self._entries.pop(scope, None)
@@ -1,6 +1,6 @@
 import httpx
-from openai import OpenAI
 from app.config import get_settings
+from app.openai_client import get_openai
 
 
 async def download_audio_from_storage(storage_path: str, supabase_url: str, service_key: str) -> bytes:
@@ -28,8 +28,7 @@ def transcribe_audio(audio_bytes: bytes, filename: str = "audio.webm") -> str:
     Returns:
         Transcribed text
     """
-    settings = get_settings()
-    client = OpenAI(api_key=settings.openai_api_key)
+    client = get_openai()
 
     # Create a file-like object for the API
     audio_file = (filename, audio_bytes)
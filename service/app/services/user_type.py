@@ -152,6 +152,9 @@ async def get_user_type_info(user_id: str, telegram_id: Optional[int] = None) ->
     """
     Get full user type information including related communities.
 
+    Resolved in a single round trip by the get_user_type_info SQL function
+    (same priority as get_user_type_by_user_id).
+
     Args:
         user_id: Supabase auth user ID
         telegram_id: Optional Telegram ID (for member lookup)
@@ -161,62 +164,18 @@ async def get_user_type_info(user_id: str, telegram_id: Optional[int] = None) ->
     """
     supabase = get_supabase_admin()
 
-    # Get telegram_id if not provided
-    if not telegram_id:
-        try:
-            user = supabase.auth.admin.get_user_by_id(user_id)
-            telegram_id = user.user.user_metadata.get("telegram_id")
-        except Exception:
-            pass
-
-    user_type = get_user_type_by_user_id(user_id)
-    communities_owned = []
-    communities_member = []
-
-    # Get owned communities (for ATLANTIS_PLUS and COMMUNITY_ADMIN)
-    if user_type in [UserType.ATLANTIS_PLUS, UserType.COMMUNITY_ADMIN]:
-        try:
-            result = supabase.table("community").select(
-                "community_id, name, description, invite_code, telegram_channel_id, is_active, created_at, updated_at"
-            ).eq("owner_id", user_id).eq("is_active", True).execute()
-
-            # Add member_count for each community
-            for community in result.data or []:
-                count_result = supabase.table("person").select(
-                    "person_id", count="exact"
-                ).eq("community_id", community["community_id"]).eq("status", "active").execute()
-                community["member_count"] = count_result.count or 0
-
-            communities_owned = result.data or []
-        except Exception:
-            pass
-
-    # Get member communities (for COMMUNITY_MEMBER, but also useful for others)
-    if telegram_id:
-        try:
-            result = supabase.table("person").select(
-                "person_id, community_id, created_at, community:community_id(name, community_id)"
-            ).eq("telegram_id", telegram_id).not_.is_("community_id", "null").eq(
-                "status", "active"
-            ).execute()
-
-            for row in result.data or []:
-                if row.get("community"):
-                    communities_member.append({
-                        "community_id": row["community"]["community_id"],
-                        "name": row["community"]["name"],
-                        "person_id": row["person_id"],
-                        "created_at": row["created_at"]
-                    })
-        except Exception:
-            pass
+    result = supabase.rpc("get_user_type_info", {
+        "p_user_id": user_id,
+        "p_telegram_id": telegram_id
+    }).execute()
+    data = result.data or {}
 
     return UserTypeInfo(
-        user_type=user_type,
+        user_type=UserType(data.get("user_type", UserType.NEW_USER)),
         user_id=user_id,
-        telegram_id=telegram_id,
-        communities_owned=communities_owned,
-        communities_member=communities_member
+        telegram_id=data.get("telegram_id"),
+        communities_owned=data.get("communities_owned", []),
+        communities_member=data.get("communities_member", [])
     )
 
 
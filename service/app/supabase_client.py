@@ -1,9 +1,19 @@
-from supabase import create_client, Client
+import asyncio
+from functools import lru_cache
+
+from supabase import create_client, Client, ClientOptions
 from app.config import get_settings
 
 
+@lru_cache(maxsize=1)
 def get_supabase_admin() -> Client:
-    """Service role client — bypasses RLS, for server-side operations."""
+    """
+    Service role client — bypasses RLS, for server-side operations.
+
+    Process-wide singleton so requests share one HTTP connection pool.
+    Never sign users in on it: a sign-in swaps its Authorization header
+    to the user's token. Use get_supabase_auth() for that.
+    """
     settings = get_settings()
     return create_client(
         settings.supabase_url,
@@ -11,6 +21,23 @@ def get_supabase_admin() -> Client:
     )
 
 
+@lru_cache(maxsize=1)
+def get_supabase_auth() -> Client:
+    """Anon client for password sign-ins only (shared, never queries tables)."""
+    settings = get_settings()
+    return create_client(
+        settings.supabase_url,
+        settings.supabase_anon_key,
+        # Server side: don't keep signed-in sessions or schedule token refreshes
+        options=ClientOptions(auto_refresh_token=False, persist_session=False)
+    )
+
+
+async def execute_async(query):
+    """Run a blocking supabase-py query in a worker thread, off the event loop."""
+    return await asyncio.to_thread(query.execute)
+
+
 def get_supabase_anon() -> Client:
     """Anon client — respects RLS, for testing."""
     settings = get_settings()
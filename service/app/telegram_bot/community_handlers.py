@@ -26,9 +26,10 @@ from app.services.transcription import transcribe_from_storage
 from app.services.embedding import generate_embeddings_batch, create_assertion_text
 from app.agents.self_intro_prompt import (
     SELF_INTRO_SYSTEM_PROMPT,
+    SELF_INTRO_USER_PREFIX,
     SELF_INTRO_PREDICATE_MAP
 )
-from app.config import get_settings
+from app.openai_client import get_openai
 
 
 # ============================================
@@ -117,15 +118,13 @@ PENDING_COMMUNITY_CREATION: dict[int, dict] = {}
 
 def extract_self_intro(text: str) -> dict:
     """Extract structured data from self-introduction using GPT-4o."""
-    import openai
-    settings = get_settings()
-    client = openai.OpenAI(api_key=settings.openai_api_key)
+    client = get_openai()
 
     response = client.chat.completions.create(
         model="gpt-4o",
         messages=[
             {"role": "system", "content": SELF_INTRO_SYSTEM_PROMPT},
-            {"role": "user", "content": f"Extract information from this self-introduction:\n\n{text}"}
+            {"role": "user", "content": SELF_INTRO_USER_PREFIX + text}
         ],
         response_format={"type": "json_object"},
         temperature=0.1
@@ -5,8 +5,7 @@ Phase 1: Placeholder
 Phase 2: Full implementation with GPT-4o-mini classifier
 """
 
-import openai
-from app.config import get_settings
+from app.openai_client import get_openai
 
 
 async def classify_message(text: str, context: dict) -> str:
@@ -28,8 +27,7 @@ async def classify_message(text: str, context: dict) -> str:
         return "dialog"
 
     # Phase 2: GPT-4o-mini classification
-    settings = get_settings()
-    client = openai.OpenAI(api_key=settings.openai_api_key)
+    client = get_openai()
 
     prompt = f'''Classify this user message into ONE category:
 
@@ -0,0 +1,183 @@
+"""
+Tests for Telegram Mini App initData validation.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+from collections import OrderedDict
+from types import SimpleNamespace
+from urllib.parse import urlencode
+
+import pytest
+from fastapi import HTTPException
+from supabase import AuthApiError
+
+from app.api import auth
+from app.api.auth import validate_telegram_init_data
+
+
+BOT_TOKEN = "123456:TEST-token"
+
+
+def sign_init_data(fields: dict, bot_token: str = BOT_TOKEN) -> str:
+    """Build initData the way Telegram does (reference HMAC implementation)."""
+    data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(fields.items()))
+    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+    fields = dict(fields)
+    fields["hash"] = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    return urlencode(fields)
+
+
+USER = {"id": 42, "first_name": "Анна", "username": "anna_k"}
+FIELDS = {
+    "query_id": "AAHdF6IQAAAAAN0XohDhrOrc",
+    "user": json.dumps(USER, ensure_ascii=False),
+    "auth_date": "1700000000",
+}
+
+
+class TestValidateTelegramInitData:
+    """validate_telegram_init_data."""
+
+    def test_valid_signature_returns_user(self):
+        assert validate_telegram_init_data(sign_init_data(FIELDS), BOT_TOKEN) == USER
+
+    def test_keys_sorted_by_key_not_by_pair(self):
+        """'chat' sorts before 'chat1' even though 'chat1=' < 'chat=' as raw strings."""
+        fields = dict(FIELDS, chat="x y", chat_type="private", chat1="z")
+        assert validate_telegram_init_data(sign_init_data(fields), BOT_TOKEN) == USER
+
+    def test_repeat_payload_served_from_cache(self):
+        init_data = sign_init_data(dict(FIELDS, auth_date="1700000123"))
+        first = validate_telegram_init_data(init_data, BOT_TOKEN)
+        assert validate_telegram_init_data(init_data, BOT_TOKEN) is first
+
+    def test_cached_payload_still_checked_against_bot_token(self):
+        init_data = sign_init_data(FIELDS)
+        validate_telegram_init_data(init_data, BOT_TOKEN)
+        with pytest.raises(HTTPException):
+            validate_telegram_init_data(init_data, "other:token")
+
+    def test_wrong_bot_token_rejected(self):
+        with pytest.raises(HTTPException) as exc:
+            validate_telegram_init_data(sign_init_data(FIELDS), "other:token")
+        assert exc.value.status_code == 401
+
+    def test_tampered_field_rejected(self):
+        init_data = sign_init_data(FIELDS).replace("auth_date=1700000000", "auth_date=1700000001")
+        with pytest.raises(HTTPException) as exc:
+            validate_telegram_init_data(init_data, BOT_TOKEN)
+        assert exc.value.status_code == 401
+
+    @pytest.mark.parametrize("bad_hash", ["zz", "ab" * 31, "ab" * 33])
+    def test_malformed_hash_rejected(self, bad_hash):
+        with pytest.raises(HTTPException) as exc:
+            validate_telegram_init_data(urlencode(dict(FIELDS, hash=bad_hash)), BOT_TOKEN)
+        assert exc.value.status_code == 401
+
+    def test_missing_hash(self):
+        with pytest.raises(HTTPException) as exc:
+            validate_telegram_init_data(urlencode(FIELDS), BOT_TOKEN)
+        assert exc.value.status_code == 400
+
+    def test_invalid_user_json(self):
+        fields = dict(FIELDS, user="{not json")
+        with pytest.raises(HTTPException) as exc:
+            validate_telegram_init_data(sign_init_data(fields), BOT_TOKEN)
+        assert exc.value.status_code == 400
+
+    def test_missing_user(self):
+        fields = {k: v for k, v in FIELDS.items() if k != "user"}
+        with pytest.raises(HTTPException) as exc:
+            validate_telegram_init_data(sign_init_data(fields), BOT_TOKEN)
+        assert exc.value.status_code == 400
+
+
+class TestVerifyTestSecret:
+    """Gates of the test auth endpoint."""
+
+    @pytest.fixture
+    def settings(self, monkeypatch):
+        settings = SimpleNamespace(
+            environment="test", test_mode_enabled=True, test_auth_secret="s3cret"
+        )
+        monkeypatch.setattr(auth, "get_settings", lambda: settings)
+        return settings
+
+    def test_all_gates_pass(self, settings):
+        assert auth.verify_test_secret("s3cret") is None
+
+    @pytest.mark.parametrize("secret", [None, "", "wrong", "sécret"])
+    def test_bad_secret_is_not_found(self, settings, secret):
+        with pytest.raises(HTTPException) as exc:
+            auth.verify_test_secret(secret)
+        assert exc.value.status_code == 404
+
+    def test_production_is_not_found(self, settings):
+        settings.environment = "production"
+        with pytest.raises(HTTPException) as exc:
+            auth.verify_test_secret("s3cret")
+        assert exc.value.status_code == 404
+
+    def test_test_mode_disabled_is_not_found(self, settings):
+        settings.test_mode_enabled = False
+        with pytest.raises(HTTPException) as exc:
+            auth.verify_test_secret("s3cret")
+        assert exc.value.status_code == 404
+
+
+class FakeAuth:
+    """Records sign-in / create calls; sign-in fails until the user exists."""
+
+    def __init__(self, existing: bool):
+        self.existing = existing
+        self.calls = []
+        self.admin = SimpleNamespace(create_user=self.create_user)
+
+    def sign_in_with_password(self, credentials):
+        self.calls.append("sign_in")
+        if not self.existing:
+            raise AuthApiError("Invalid login credentials", 400, None)
+        session = SimpleNamespace(
+            access_token="at", refresh_token="rt", user=SimpleNamespace(id="user-1")
+        )
+        return SimpleNamespace(session=session)
+
+    def create_user(self, attributes):
+        self.calls.append("create")
+        self.existing = True
+
+
+class TestSignInOrCreate:
+    """_sign_in_or_create flow against a fake Supabase Auth."""
+
+    @pytest.fixture
+    def fake_auth(self, monkeypatch):
+        fake = FakeAuth(existing=False)
+        client = SimpleNamespace(auth=fake)
+        monkeypatch.setattr(auth, "get_settings", lambda: SimpleNamespace(telegram_bot_token=BOT_TOKEN))
+        monkeypatch.setattr(auth, "get_supabase_admin", lambda: client)
+        monkeypatch.setattr(auth, "get_supabase_auth", lambda: client)
+        monkeypatch.setattr(auth, "_registered_telegram_ids", OrderedDict())
+        return fake
+
+    def test_new_user_is_created_then_signed_in(self, fake_auth):
+        response = asyncio.run(auth._sign_in_or_create(7, "Anna", {"telegram_id": 7}))
+        assert fake_auth.calls == ["sign_in", "create", "sign_in"]
+        assert response.user_id == "user-1"
+
+    def test_known_user_failure_skips_creation(self, fake_auth):
+        auth._registered_telegram_ids[7] = None
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(auth._sign_in_or_create(7, "Anna", {"telegram_id": 7}))
+        assert exc.value.status_code == 500
+        assert fake_auth.calls == ["sign_in"]
+
+    def test_registered_ids_are_bounded(self, fake_auth, monkeypatch):
+        monkeypatch.setattr(auth, "REGISTERED_IDS_CACHE_SIZE", 2)
+        fake_auth.existing = True
+        for telegram_id in (1, 2, 3):
+            asyncio.run(auth._sign_in_or_create(telegram_id, "Anna", {"telegram_id": telegram_id}))
+        assert list(auth._registered_telegram_ids) == [2, 3]
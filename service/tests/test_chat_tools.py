@@ -0,0 +1,538 @@
+"""
+Tests for chat tool dispatch.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.api import chat
+from app.services.sql_tool import SQL_TOOL_DEFINITION
+
+
+class TestToolHandlers:
+    """_TOOL_HANDLERS / execute_tool."""
+
+    def test_every_declared_tool_has_a_handler(self):
+        declared = {t['function']['name'] for t in chat.TOOLS}
+        declared.add(SQL_TOOL_DEFINITION['function']['name'])
+        assert declared == set(chat._TOOL_HANDLERS)
+
+    def test_unknown_tool(self, monkeypatch):
+        monkeypatch.setattr(chat, "get_supabase_admin", lambda: None)
+        result = asyncio.run(chat.execute_tool("no_such_tool", {}, "user-1"))
+        assert result == "Unknown tool: no_such_tool"
+
+    def test_dispatch_passes_turn_embeddings(self, monkeypatch):
+        seen = {}
+
+        async def handler(args, user_id, supabase, embeddings):
+            seen.update(args=args, user_id=user_id, embeddings=embeddings)
+            return "ok"
+
+        monkeypatch.setattr(chat, "get_supabase_admin", lambda: None)
+        monkeypatch.setitem(chat._TOOL_HANDLERS, "add_note_about_person", handler)
+        embeddings = {"note": [0.1]}
+        result = asyncio.run(chat.execute_tool("add_note_about_person", {"note": "note"}, "u", embeddings))
+        assert result == "ok"
+        assert seen == {"args": {"note": "note"}, "user_id": "u", "embeddings": embeddings}
+
+
+class FakeQuery:
+    """Chainable stand-in for a PostgREST select; filters are ignored."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return SimpleNamespace(data=self.rows)
+
+
+class FakeSupabase:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def table(self, name):
+        return FakeQuery(self.rows)
+
+
+class NameSearch:
+    """person stand-in applying display_name eq / ilike filters."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.searches = []
+
+    def table(self, name):
+        self.match = None
+        return self
+
+    def select(self, columns):
+        return self
+
+    def limit(self, count):
+        return self
+
+    def eq(self, column, value):
+        if column == 'display_name':
+            self.searches.append('eq')
+            self.match = lambda n: n == value
+        return self
+
+    def ilike(self, column, pattern):
+        self.searches.append('ilike')
+        self.match = lambda n: pattern.strip('%').lower() in n.lower()
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=[r for r in self.rows if self.match(r['display_name'])])
+
+
+ANNA = {'person_id': 'p1', 'display_name': 'Anna'}
+BORIS = {'person_id': 'p2', 'display_name': 'Boris'}
+
+
+class TestResolvePerson:
+    """_resolve_person / _resolve_person_pair."""
+
+    def resolve(self, rows, person_id=None, name=None, **kwargs):
+        return asyncio.run(chat._resolve_person(FakeSupabase(rows), "u", person_id, name, **kwargs))
+
+    def test_by_id(self):
+        assert self.resolve([ANNA], person_id='p1') == (ANNA, None)
+
+    def test_by_id_not_found(self):
+        assert self.resolve([], person_id='p1') == (None, "Person with ID p1 not found.")
+
+    def test_by_name_multiple_matches(self):
+        person, error = self.resolve([ANNA, BORIS], name='a')
+        assert person is None
+        assert '"multiple_matches"' in error
+
+    def test_missing_arguments_message(self):
+        assert self.resolve([ANNA], missing_error="Need a person.") == (None, "Need a person.")
+
+    def test_exact_name_skips_substring_search(self):
+        supabase = NameSearch([ANNA, {'person_id': 'p3', 'display_name': 'Annabel'}])
+        assert asyncio.run(chat._resolve_person(supabase, "u", None, 'Anna')) == (ANNA, None)
+        assert supabase.searches == ['eq']
+
+    def test_partial_name_falls_back_to_substring_search(self):
+        supabase = NameSearch([ANNA, BORIS])
+        assert asyncio.run(chat._resolve_person(supabase, "u", None, 'bor')) == (BORIS, None)
+        assert supabase.searches == ['eq', 'ilike']
+
+    def test_pair_reports_first_error(self):
+        args = {'person_a_name': 'Anna'}
+        person_a, person_b, error = asyncio.run(chat._resolve_person_pair(FakeSupabase([ANNA]), "u", args))
+        assert person_a == ANNA
+        assert person_b is None
+        assert error == "Missing person_id or name"
+
+
+def history_row(message_id, second, content, role='user', tool_calls=None, tool_call_id=None):
+    return {
+        'message_id': message_id, 'role': role, 'content': content, 'tool_calls': tool_calls,
+        'tool_call_id': tool_call_id, 'created_at': f'2026-10-17T12:00:{second:02d}+00:00',
+    }
+
+
+class HistoryTable:
+    """chat_message stand-in honouring the created_at > cursor filter."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.cursors = []
+
+    def table(self, name):
+        return self
+
+    def select(self, columns):
+        self.cursor = None
+        return self
+
+    def eq(self, column, value):
+        return self
+
+    def gt(self, column, value):
+        self.cursor = chat.datetime.fromisoformat(value)
+        return self
+
+    def order(self, column):
+        return self
+
+    def execute(self):
+        self.cursors.append(self.cursor)
+        rows = [
+            r for r in self.rows
+            if self.cursor is None or chat.datetime.fromisoformat(r['created_at']) > self.cursor
+        ]
+        return SimpleNamespace(data=sorted(rows, key=lambda r: r['created_at']))
+
+
+class TestLoadHistory:
+    """_load_history: incremental fetch of chat_message rows."""
+
+    @pytest.fixture(autouse=True)
+    def empty_cache(self, monkeypatch):
+        monkeypatch.setattr(chat, "_history_cache", chat.OrderedDict())
+
+    def test_second_load_fetches_only_recent_rows(self):
+        table = HistoryTable([history_row('m1', 0, 'hi'), history_row('m2', 1, 'hello', role='assistant')])
+        first = asyncio.run(chat._load_history(table, "s1"))
+        table.rows.append(history_row('m3', 2, 'again'))
+        second = asyncio.run(chat._load_history(table, "s1"))
+
+        newest = chat.datetime.fromisoformat('2026-10-17T12:00:01+00:00')
+        assert table.cursors == [None, newest - chat.HISTORY_OVERLAP]
+        assert [m['content'] for m in first] == ['hi', 'hello']
+        assert [m['content'] for m in second] == ['hi', 'hello', 'again']
+
+    def test_late_commit_behind_newest_row_is_picked_up(self):
+        """A row stamped before the newest cached one but committed after the
+        previous read (another worker's slow insert) is not lost or doubled."""
+        table = HistoryTable([history_row('m1', 0, 'hi'), history_row('m3', 5, 'later')])
+        asyncio.run(chat._load_history(table, "s1"))
+        table.rows.append(history_row('m2', 3, 'late'))
+        history = asyncio.run(chat._load_history(table, "s1"))
+        assert [m['content'] for m in history] == ['hi', 'later', 'late']
+        assert [m['content'] for m in asyncio.run(chat._load_history(table, "s1"))] == ['hi', 'later', 'late']
+
+    def test_returned_list_is_a_copy(self):
+        table = HistoryTable([history_row('m1', 0, 'hi')])
+        asyncio.run(chat._load_history(table, "s1")).append({'role': 'tool'})
+        assert len(asyncio.run(chat._load_history(table, "s1"))) == 1
+
+    def test_tool_rows_keep_call_ids(self):
+        calls = [{'id': 'c1', 'type': 'function', 'function': {'name': 'find_people', 'arguments': '{}'}}]
+        table = HistoryTable([
+            history_row('m1', 0, None, role='assistant', tool_calls=calls),
+            history_row('m2', 0, '[]', role='tool', tool_call_id='c1'),
+        ])
+        assert asyncio.run(chat._load_history(table, "s1")) == [
+            {'role': 'assistant', 'content': '', 'tool_calls': calls},
+            {'role': 'tool', 'content': '[]', 'tool_call_id': 'c1'},
+        ]
+
+
+class SessionTable:
+    """chat_session / chat_message stand-in counting session lookups."""
+
+    def __init__(self, owned):
+        self.owned = owned
+        self.session_checks = 0
+        self.inserts = 0
+        self.rpcs = []
+
+    def table(self, name):
+        self.name = name
+        self.filters = {}
+        return self
+
+    def select(self, columns):
+        return self
+
+    def insert(self, row, **kwargs):
+        self.inserts += 1
+        return self
+
+    def rpc(self, name, params):
+        self.rpcs.append((name, params['p_title']))
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data='new-session'))
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def gt(self, column, value):
+        return self
+
+    def order(self, column):
+        return self
+
+    def execute(self):
+        if self.name == 'chat_session':
+            self.session_checks += 1
+            key = (self.filters['owner_id'], self.filters['session_id'])
+            return SimpleNamespace(data=[{'session_id': key[1]}] if key in self.owned else [])
+        return SimpleNamespace(data=[])
+
+
+class TestOwnedSessions:
+    """_start_chat_turn: session ownership check is done once per session."""
+
+    @pytest.fixture(autouse=True)
+    def caches(self, monkeypatch):
+        monkeypatch.setattr(chat, "_owned_sessions", chat.OrderedDict())
+        monkeypatch.setattr(chat, "_history_cache", chat.OrderedDict())
+
+    def start(self, supabase, user_id, session_id):
+        request = chat.ChatRequest(message="hi", session_id=session_id)
+        return asyncio.run(chat._start_chat_turn(supabase, user_id, request))
+
+    def test_verified_session_is_not_rechecked(self):
+        supabase = SessionTable({('u', 's1')})
+        self.start(supabase, 'u', 's1')
+        self.start(supabase, 'u', 's1')
+        assert supabase.session_checks == 1
+
+    def test_other_user_is_still_checked(self):
+        supabase = SessionTable({('u', 's1')})
+        self.start(supabase, 'u', 's1')
+        with pytest.raises(HTTPException) as exc:
+            self.start(supabase, 'intruder', 's1')
+        assert exc.value.status_code == 404
+        assert supabase.session_checks == 2
+
+    def test_new_session_is_created_with_its_message_and_cached(self):
+        supabase = SessionTable(set())
+        session_id, messages = self.start(supabase, 'u', None)
+        assert session_id == 'new-session'
+        assert supabase.rpcs == [('start_session_with_message', 'hi')]
+        assert supabase.inserts == 0
+        self.start(supabase, 'u', 'new-session')
+        assert supabase.session_checks == 0
+
+    def test_unowned_session_is_not_cached(self):
+        supabase = SessionTable(set())
+        for _ in range(2):
+            assert asyncio.run(chat._owns_session(supabase, 'u', 's1')) is False
+        assert supabase.session_checks == 2
+
+
+class QuestionRpc:
+    """supabase.rpc stand-in for fetch_pending_question / mark_question_shown."""
+
+    QUESTION = {
+        'question_id': 'q1', 'person_id': 'p1', 'question_type': 'gap',
+        'question_text': 'Where does Anna work?', 'question_text_ru': None, 'person_name': 'Anna',
+    }
+
+    def __init__(self):
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append(name)
+        data = {'blocked': None, 'question': self.QUESTION} if name == 'fetch_pending_question' else None
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=data))
+
+
+class TestQuestionCooldown:
+    """_tool_get_pending_question: local cooldown after a question is shown."""
+
+    @pytest.fixture(autouse=True)
+    def cooldown(self, monkeypatch):
+        monkeypatch.setattr(chat, "_question_cooldown_until", chat.OrderedDict())
+        settings = SimpleNamespace(questions_max_per_day=5, questions_cooldown_hours=1)
+        monkeypatch.setattr(chat, "get_settings", lambda: settings)
+        return settings
+
+    def ask(self, supabase, user_id="u"):
+        return asyncio.run(chat._tool_get_pending_question({}, user_id, supabase, None))
+
+    def test_shown_question_starts_local_cooldown(self):
+        supabase = QuestionRpc()
+        assert '"question_id":"q1"' in self.ask(supabase)
+        assert self.ask(supabase) == "No questions available right now (cooldown)."
+        assert supabase.calls == ['fetch_pending_question', 'mark_question_shown']
+
+    def test_cooldown_is_per_user(self):
+        supabase = QuestionRpc()
+        self.ask(supabase, "u1")
+        assert '"question_id":"q1"' in self.ask(supabase, "u2")
+
+    def test_expired_cooldown_goes_back_to_database(self, cooldown):
+        cooldown.questions_cooldown_hours = 0
+        supabase = QuestionRpc()
+        self.ask(supabase)
+        self.ask(supabase)
+        assert supabase.calls.count('fetch_pending_question') == 2
+
+
+class ToolLoopClient:
+    """AsyncOpenAI stand-in whose every streamed completion asks for a tool."""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        call = SimpleNamespace(index=0, id='c1', function=SimpleNamespace(name='find_people', arguments='{}'))
+        delta = SimpleNamespace(content=None, tool_calls=[call])
+
+        async def stream():
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+        return stream()
+
+
+class TestChatGiveUp:
+    """_chat_stream: a turn that runs out of tool iterations is still saved."""
+
+    def test_give_up_message_is_saved(self, monkeypatch):
+        finished = []
+
+        async def run_tool_calls(supabase, session_id, user_id, messages, content, tool_calls_json):
+            return [], None
+
+        async def finish(supabase, session_id, content):
+            finished.append((session_id, content))
+
+        monkeypatch.setattr(chat, "_run_tool_calls", run_tool_calls)
+        monkeypatch.setattr(chat, "_finish_chat_turn", finish)
+
+        async def drain():
+            return [e async for e in chat._chat_stream(ToolLoopClient(), None, "s1", "u", [])]
+
+        events = asyncio.run(drain())
+        assert finished == [("s1", chat.CHAT_GIVE_UP_MESSAGE)]
+        assert b'"type":"done"' in events[-1]
+
+
+class FailingSecondCompletion:
+    """AsyncOpenAI stand-in: the first completion asks for a tool, the next one fails."""
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, stream=False, **kwargs):
+        self.calls += 1
+        if self.calls > 1:
+            raise RuntimeError("openai down")
+        call = SimpleNamespace(index=0, id='c1', function=SimpleNamespace(name='find_people', arguments='{}'))
+        if not stream:
+            message = SimpleNamespace(content=None, tool_calls=[call])
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+        async def chunks():
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None, tool_calls=[call]))])
+        return chunks()
+
+
+class TestPendingSave:
+    """The previous round's history insert finishes even when the next completion fails."""
+
+    @pytest.fixture
+    def saves(self, monkeypatch):
+        saves = []
+
+        async def save():
+            await asyncio.sleep(0)
+            saves.append("saved")
+
+        async def run_tool_calls(supabase, session_id, user_id, messages, content, tool_calls_json):
+            return [], asyncio.create_task(save())
+
+        monkeypatch.setattr(chat, "_run_tool_calls", run_tool_calls)
+        return saves
+
+    def test_stream(self, saves):
+        async def drain():
+            return [e async for e in chat._chat_stream(FailingSecondCompletion(), None, "s1", "u", [])]
+
+        with pytest.raises(RuntimeError, match="openai down"):
+            asyncio.run(drain())
+        assert saves == ["saved"]
+
+    def test_non_stream(self, saves, monkeypatch):
+        async def start_chat_turn(supabase, user_id, chat_request):
+            return "s1", []
+
+        monkeypatch.setattr(chat, "get_user_id", lambda payload: "u")
+        monkeypatch.setattr(chat, "get_supabase_admin", lambda: None)
+        monkeypatch.setattr(chat, "get_async_openai", FailingSecondCompletion)
+        monkeypatch.setattr(chat, "_start_chat_turn", start_chat_turn)
+
+        with pytest.raises(RuntimeError, match="openai down"):
+            asyncio.run(chat.chat.__wrapped__(None, chat.ChatRequest(message="hi"), {}))
+        assert saves == ["saved"]
+
+    def test_failed_save_is_raised(self, monkeypatch):
+        async def save():
+            raise RuntimeError("insert failed")
+
+        async def run_tool_calls(supabase, session_id, user_id, messages, content, tool_calls_json):
+            return [], asyncio.create_task(save())
+
+        monkeypatch.setattr(chat, "_run_tool_calls", run_tool_calls)
+
+        async def drain():
+            return [e async for e in chat._chat_stream(FailingSecondCompletion(), None, "s1", "u", [])]
+
+        with pytest.raises(RuntimeError, match="insert failed"):
+            asyncio.run(drain())
+
+
+class TestMatchCacheInvalidation:
+    """Write tools drop the user's cached pgvector matches."""
+
+    def test_note_invalidates_user_scope(self, monkeypatch):
+        cache = chat.SemanticCache()
+        cache.put("u", [1.0, 0.0], ["stale"])
+        cache.put("other", [1.0, 0.0], ["kept"])
+        monkeypatch.setattr(chat, "_match_cache", cache)
+
+        supabase = FakeSupabase([ANNA])
+        supabase.rpc = lambda name, params: FakeQuery(None)
+        args = {'person_id': 'p1', 'note': 'likes chess'}
+        asyncio.run(chat._tool_add_note_about_person(args, "u", supabase, {'likes chess': [0.1]}))
+
+        assert cache.get("u", [1.0, 0.0]) is None
+        assert cache.get("other", [1.0, 0.0]) == ["kept"]
+
+
+class TestRunToolCalls:
+    """_run_tool_calls: reads run concurrently, writes in call order."""
+
+    @staticmethod
+    def _call(call_id, name, arguments):
+        return {'id': call_id, 'type': 'function', 'function': {'name': name, 'arguments': arguments}}
+
+    def test_notes_for_same_new_name_run_in_order(self, monkeypatch):
+        people = {}
+
+        async def add_note(args, user_id, supabase, embeddings):
+            # find_or_create_person: yield between the lookup and the insert
+            existing = people.get(args['person_name'])
+            await asyncio.sleep(0)
+            if existing is None:
+                people[args['person_name']] = existing = f"p{len(people) + 1}"
+                return f"created {existing}"
+            return f"added to {existing}"
+
+        monkeypatch.setattr(chat, "get_supabase_admin", lambda: None)
+        monkeypatch.setattr(chat, "generate_embeddings_batch", lambda texts: [[0.0]] * len(texts))
+        monkeypatch.setitem(chat._TOOL_HANDLERS, "add_note_about_person", add_note)
+
+        calls = [
+            self._call('c1', 'add_note_about_person', '{"person_name": "Vera", "note": "likes chess"}'),
+            self._call('c2', 'add_note_about_person', '{"person_name": "Vera", "note": "lives in Riga"}'),
+        ]
+
+        async def run():
+            results, pending_save = await chat._run_tool_calls(FakeSupabase([]), "s1", "u", [], "", calls)
+            await pending_save
+            return results
+
+        results = asyncio.run(run())
+        assert [r['result'] for r in results] == ["created p1", "added to p1"]
+        assert people == {"Vera": "p1"}
+
+    def test_consecutive_reads_share_a_batch(self):
+        calls = [
+            (None, 'find_people', {}),
+            (None, 'get_person_details', {}),
+            (None, 'merge_people', {}),
+            (None, 'find_people', {}),
+            (None, 'execute_sql', {}),
+        ]
+        groups = chat._group_tool_calls(calls)
+        assert [[name for _, name, _ in group] for group in groups] == [
+            ['find_people', 'get_person_details'],
+            ['merge_people'],
+            ['find_people', 'execute_sql'],
+        ]
@@ -0,0 +1,42 @@
+"""
+Tests for the query embedding cache.
+"""
+
+import pytest
+
+from app.services import embedding
+
+
+@pytest.fixture
+def fake_embed(monkeypatch):
+    """Replace the OpenAI call with a counting stub."""
+    calls = []
+
+    def _embed(text):
+        calls.append(text)
+        return [float(len(text)), 0.5]
+
+    monkeypatch.setattr(embedding, "_embed", _embed)
+    embedding._embed_cached.cache_clear()
+    yield calls
+    embedding._embed_cached.cache_clear()
+
+
+class TestGenerateEmbedding:
+    """generate_embedding caching."""
+
+    def test_repeat_query_hits_cache(self, fake_embed):
+        first = embedding.generate_embedding("AI experts")
+        second = embedding.generate_embedding("AI experts")
+        assert first == second == [10.0, 0.5]
+        assert fake_embed == ["AI experts"]
+
+    def test_returns_fresh_list(self, fake_embed):
+        embedding.generate_embedding("query").append(1.0)
+        assert embedding.generate_embedding("query") == [5.0, 0.5]
+
+    def test_long_text_not_cached(self, fake_embed):
+        text = "x" * (embedding.EMBEDDING_CACHE_MAX_CHARS + 1)
+        embedding.generate_embedding(text)
+        embedding.generate_embedding(text)
+        assert len(fake_embed) == 2
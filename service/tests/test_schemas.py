@@ -0,0 +1,122 @@
+"""
+Tests for extraction output models.
+"""
+
+import pytest
+from pydantic import ValidationError
+
+from app.agents.prompts import (
+    EXTRACTION_JSON_USER_PREFIX,
+    EXTRACTION_JSON_USER_PREFIX_COMPACT,
+    EXTRACTION_OUTPUT_SCHEMA,
+)
+from app.agents.schemas import (
+    EDGE_TYPES,
+    PREDICATES,
+    ExtractedAssertion,
+    ExtractionResult,
+)
+
+
+class TestVocabularies:
+    """Predicate / edge type vocabularies."""
+
+    def test_schema_enums_match_models(self):
+        """JSON schema enums are generated from the model vocabularies."""
+        props = EXTRACTION_OUTPUT_SCHEMA["properties"]
+        assert props["assertions"]["items"]["properties"]["predicate"]["enum"] == list(PREDICATES)
+        assert props["edges"]["items"]["properties"]["type"]["enum"] == list(EDGE_TYPES)
+
+    def test_compact_prefix_lists_every_predicate(self):
+        """The compact user prefix still names the full predicate vocabulary."""
+        for predicate in PREDICATES:
+            assert predicate in EXTRACTION_JSON_USER_PREFIX_COMPACT
+
+    @pytest.mark.parametrize("prefix", [EXTRACTION_JSON_USER_PREFIX, EXTRACTION_JSON_USER_PREFIX_COMPACT])
+    def test_json_prefixes_list_every_edge_type(self, prefix):
+        """JSON mode has no enum to enforce edge types, so the prompt names them."""
+        for edge_type in EDGE_TYPES:
+            assert edge_type in prefix
+
+    def test_known_predicate_accepted(self):
+        assertion = ExtractedAssertion(subject="p1", predicate="works_at", value="Google")
+        assert assertion.predicate == "works_at"
+
+    def test_parsed_values_share_vocabulary_strings(self):
+        """Literal validation returns the canonical vocabulary object, so
+        thousands of parsed assertions don't each hold a copy of the string."""
+        result = ExtractionResult.model_validate_json(
+            '{"assertions": [{"subject": "p1", "predicate": "works_at", "value": "A"},'
+            ' {"subject": "p2", "predicate": "works_at", "value": "B"}],'
+            ' "edges": [{"source": "p1", "target": "p2", "type": "knows"}]}'
+        )
+        assert all(a.predicate is PREDICATES[0] for a in result.assertions)
+        assert result.edges[0].type is EDGE_TYPES[0]
+
+    def test_unknown_predicate_rejected_on_model(self):
+        with pytest.raises(ValidationError):
+            ExtractedAssertion(subject="p1", predicate="note", value="something")
+
+
+class TestExtractionResult:
+    """Parsing LLM output into ExtractionResult."""
+
+    def test_missing_sections_default_to_empty(self):
+        result = ExtractionResult.model_validate({"people": [{"temp_id": "p1", "name": "Вася"}]})
+        assert len(result.people) == 1
+        assert result.assertions == []
+        assert result.edges == []
+
+    def test_unknown_predicates_are_dropped(self):
+        """One invented predicate doesn't fail the whole note."""
+        result = ExtractionResult.model_validate({
+            "people": [{"temp_id": "p1", "name": "Вася"}],
+            "assertions": [
+                {"subject": "p1", "predicate": "works_at", "value": "Яндекс"},
+                {"subject": "p1", "predicate": "note", "value": "likes coffee"},
+            ],
+            "edges": [],
+        })
+        assert [a.predicate for a in result.assertions] == ["works_at"]
+
+    def test_dropped_predicate_is_logged_with_its_value(self, caplog):
+        with caplog.at_level("WARNING", logger="app.agents.schemas"):
+            ExtractionResult.model_validate({
+                "assertions": [{"subject": "p1", "predicate": "note", "value": "likes coffee"}],
+            })
+        assert "'note'" in caplog.text
+        assert "likes coffee" in caplog.text
+
+    def test_identifiers_keep_only_present_keys(self):
+        """Nulls, empty strings and unknown keys are not stored."""
+        result = ExtractionResult.model_validate({
+            "people": [{
+                "temp_id": "p1",
+                "name": "Вася",
+                "identifiers": {"telegram": "vasya", "email": None, "city": "", "twitter": "@v"},
+            }],
+        })
+        identifiers = result.people[0].identifiers
+        assert identifiers.root == {"telegram": "vasya"}
+        assert identifiers.get("telegram") == "vasya"
+        assert identifiers.get("email") is None
+
+    def test_identifiers_default_to_empty(self):
+        result = ExtractionResult.model_validate({"people": [{"temp_id": "p1", "name": "Вася"}]})
+        assert result.people[0].identifiers.root == {}
+
+    def test_unknown_edge_types_fall_back_to_knows(self, caplog):
+        with caplog.at_level("WARNING", logger="app.agents.schemas"):
+            result = ExtractionResult.model_validate({
+                "people": [],
+                "assertions": [],
+                "edges": [
+                    {"source": "p1", "target": "p2", "type": "worked_with"},
+                    {"source": "p1", "target": "p3", "type": "married_to", "context": "wedding"},
+                ],
+            })
+        assert [(e.target, e.type, e.context) for e in result.edges] == [
+            ("p2", "worked_with", None),
+            ("p3", "knows", "wedding"),
+        ]
+        assert "'married_to'" in caplog.text
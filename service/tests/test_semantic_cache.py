@@ -0,0 +1,55 @@
+"""
+Tests for the semantic result cache.
+"""
+
+from app.services import semantic_cache
+from app.services.semantic_cache import SemanticCache
+
+
+class TestSemanticCache:
+    """SemanticCache lookups."""
+
+    def test_near_duplicate_hits(self):
+        cache = SemanticCache(threshold=0.97)
+        cache.put("u1", [1.0, 0.0, 0.0], "rows")
+        assert cache.get("u1", [0.99, 0.05, 0.0]) == "rows"
+
+    def test_dissimilar_misses(self):
+        cache = SemanticCache(threshold=0.97)
+        cache.put("u1", [1.0, 0.0, 0.0], "rows")
+        assert cache.get("u1", [0.0, 1.0, 0.0]) is None
+
+    def test_scopes_are_isolated(self):
+        cache = SemanticCache()
+        cache.put("u1", [1.0, 0.0], "rows")
+        assert cache.get("u2", [1.0, 0.0]) is None
+
+    def test_best_match_wins(self):
+        cache = SemanticCache(threshold=0.9)
+        cache.put("u1", [1.0, 0.1], "close")
+        cache.put("u1", [1.0, 0.0], "exact")
+        assert cache.get("u1", [1.0, 0.0]) == "exact"
+
+    def test_expired_entries_dropped(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(semantic_cache.time, "monotonic", lambda: now[0])
+        cache = SemanticCache(ttl=10)
+        cache.put("u1", [1.0, 0.0], "rows")
+        now[0] += 11
+        assert cache.get("u1", [1.0, 0.0]) is None
+
+    def test_scope_count_bounded(self):
+        cache = SemanticCache(max_scopes=2)
+        for scope in ("a", "b", "c"):
+            cache.put(scope, [1.0], scope)
+        assert cache.get("a", [1.0]) is None
+        assert cache.get("c", [1.0]) == "c"
+
+    def test_invalidate_clears_only_that_scope(self):
+        cache = SemanticCache()
+        cache.put("u1", [1.0, 0.0], "rows")
+        cache.put("u2", [1.0, 0.0], "other")
+        cache.invalidate("u1")
+        cache.invalidate("missing")
+        assert cache.get("u1", [1.0, 0.0]) is None
+        assert cache.get("u2", [1.0, 0.0]) == "other"
@@ -0,0 +1,34 @@
+-- Migration: Aggregate company name variants in SQL
+-- Created: 2026-10-17
+--
+-- Problem: explore_company_names pulled up to 500 raw assertion rows (plus
+-- every person_id of the owner for filtering) and grouped them in Python.
+-- Payload grew with the number of matching rows, and the 500-row cap
+-- silently undercounted popular companies.
+--
+-- Solution: GROUP BY in Postgres. Returns one row per company variant with
+-- the number of distinct people.
+
+CREATE OR REPLACE FUNCTION company_counts(
+    pattern TEXT,
+    p_owner_id UUID DEFAULT NULL  -- NULL = all users (shared database mode)
+)
+RETURNS TABLE (
+    company TEXT,
+    people_count BIGINT
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT
+        a.object_value AS company,
+        count(DISTINCT a.subject_person_id) AS people_count
+    FROM assertion a
+    JOIN person p ON p.person_id = a.subject_person_id
+    WHERE a.predicate IN ('works_at', 'met_on')
+      AND a.object_value ILIKE pattern
+      AND p.status = 'active'
+      AND (p_owner_id IS NULL OR p.owner_id = p_owner_id)
+    GROUP BY a.object_value;
+$$;
+
+COMMENT ON FUNCTION company_counts IS 'Company name variants matching an ILIKE pattern with distinct people per variant';
@@ -0,0 +1,33 @@
+-- Migration: Trigram indexes for substring search on assertion values
+-- Created: 2026-10-17
+--
+-- Problem: Company/topic search issues ILIKE '%...%' against object_value
+-- (search_company_across_predicates, _tool_search_by_company_exact and
+-- _tool_count_people_by_filter in chat.py, and the company_counts RPC) and
+-- object_value_normalized (SQL tool examples). A leading
+-- wildcard cannot use a btree index, so every query is a sequential scan
+-- over assertion.
+--
+-- Solution: GIN indexes with gin_trgm_ops. pg_trgm serves LIKE and ILIKE
+-- directly (matching is case-insensitive at the trigram level), so no
+-- lower(object_value) functional index or query rewrite is needed.
+
+-- Set search_path to include extensions schema where pg_trgm lives
+SET search_path TO public, extensions;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Increase statement timeout for index creation
+SET statement_timeout = '5min';
+
+CREATE INDEX IF NOT EXISTS idx_assertion_object_value_trgm
+ON assertion
+USING gin (object_value gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_assertion_object_value_normalized_trgm
+ON assertion
+USING gin (object_value_normalized gin_trgm_ops)
+WHERE object_value_normalized IS NOT NULL;
+
+COMMENT ON INDEX idx_assertion_object_value_trgm IS 'Trigram index for ILIKE substring search on assertion values';
+COMMENT ON INDEX idx_assertion_object_value_normalized_trgm IS 'Trigram index for ILIKE search on normalized company names';
@@ -0,0 +1,39 @@
+-- Migration: Order and limit company_counts in SQL
+-- Created: 2026-10-17
+--
+-- explore_company_names only shows the top variants, but company_counts
+-- returned every group and Python sorted and sliced them. ORDER BY + LIMIT
+-- now happen in Postgres; total_variants (window count over all groups,
+-- evaluated before LIMIT) keeps the full distribution size available.
+
+-- Return type changes, so the old signature must be dropped first
+DROP FUNCTION IF EXISTS company_counts(TEXT, UUID);
+
+CREATE OR REPLACE FUNCTION company_counts(
+    pattern TEXT,
+    p_owner_id UUID DEFAULT NULL,  -- NULL = all users (shared database mode)
+    p_limit INT DEFAULT 30
+)
+RETURNS TABLE (
+    company TEXT,
+    people_count BIGINT,
+    total_variants BIGINT
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT
+        a.object_value AS company,
+        count(DISTINCT a.subject_person_id) AS people_count,
+        count(*) OVER () AS total_variants
+    FROM assertion a
+    JOIN person p ON p.person_id = a.subject_person_id
+    WHERE a.predicate IN ('works_at', 'met_on')
+      AND a.object_value ILIKE pattern
+      AND p.status = 'active'
+      AND (p_owner_id IS NULL OR p.owner_id = p_owner_id)
+    GROUP BY a.object_value
+    ORDER BY people_count DESC, company
+    LIMIT p_limit;
+$$;
+
+COMMENT ON FUNCTION company_counts IS 'Top company name variants matching an ILIKE pattern with distinct people per variant';
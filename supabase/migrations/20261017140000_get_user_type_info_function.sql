@@ -0,0 +1,85 @@
+-- Migration: Resolve user type and communities in one call
+-- Created: 2026-10-17
+--
+-- Problem: /auth/me built UserTypeInfo from up to 7 + N round trips
+-- (auth user lookup twice, atlantis_plus_member, community, person,
+-- owned communities, then one member count per owned community).
+-- Solution: one SQL function returning the whole payload as JSONB.
+
+SET search_path TO public, extensions;
+
+CREATE OR REPLACE FUNCTION get_user_type_info(
+    p_user_id UUID,
+    p_telegram_id BIGINT DEFAULT NULL  -- NULL = read from auth user metadata
+)
+RETURNS JSONB
+LANGUAGE sql STABLE SECURITY DEFINER
+SET search_path = public
+AS $$
+    WITH tg AS (
+        SELECT COALESCE(
+            p_telegram_id,
+            (SELECT (u.raw_user_meta_data->>'telegram_id')::BIGINT
+             FROM auth.users u
+             WHERE u.id = p_user_id)
+        ) AS telegram_id
+    ),
+    owned AS (
+        SELECT
+            c.*,
+            (SELECT count(*)
+             FROM person p
+             WHERE p.community_id = c.community_id
+               AND p.status = 'active') AS member_count
+        FROM community c
+        WHERE c.owner_id = p_user_id
+          AND c.is_active = true
+    ),
+    member AS (
+        SELECT c.community_id, c.name, p.person_id, p.created_at
+        FROM person p
+        JOIN community c ON c.community_id = p.community_id
+        WHERE p.telegram_id = (SELECT telegram_id FROM tg)
+          AND p.status = 'active'
+    )
+    SELECT jsonb_build_object(
+        'telegram_id', (SELECT telegram_id FROM tg),
+        -- Same priority as get_user_type_by_user_id()
+        'user_type', CASE
+            WHEN EXISTS (SELECT 1 FROM atlantis_plus_member m WHERE m.user_id = p_user_id)
+                THEN 'atlantis_plus'
+            WHEN EXISTS (SELECT 1 FROM owned) THEN 'community_admin'
+            WHEN EXISTS (SELECT 1 FROM member) THEN 'community_member'
+            ELSE 'new_user'
+        END,
+        'communities_owned', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object(
+                'community_id', o.community_id,
+                'name', o.name,
+                'description', o.description,
+                'invite_code', o.invite_code,
+                'telegram_channel_id', o.telegram_channel_id,
+                'is_active', o.is_active,
+                'created_at', o.created_at,
+                'updated_at', o.updated_at,
+                'member_count', o.member_count
+            ) ORDER BY o.created_at)
+            FROM owned o
+        ), '[]'::jsonb),
+        'communities_member', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object(
+                'community_id', m.community_id,
+                'name', m.name,
+                'person_id', m.person_id,
+                'created_at', m.created_at
+            ) ORDER BY m.created_at)
+            FROM member m
+        ), '[]'::jsonb)
+    );
+$$;
+
+-- Reads auth.users and other users' communities: server-side only
+REVOKE EXECUTE ON FUNCTION get_user_type_info(UUID, BIGINT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION get_user_type_info(UUID, BIGINT) TO service_role;
+
+COMMENT ON FUNCTION get_user_type_info IS 'User type plus owned/member communities for /auth/me in a single round trip';
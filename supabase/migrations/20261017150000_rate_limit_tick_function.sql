@@ -0,0 +1,39 @@
+-- Migration: Read question rate limit and reset the daily counter in one call
+-- Created: 2026-10-17
+--
+-- Problem: get_pending_question (chat tool) selected the whole
+-- question_rate_limit row, then sent a separate UPDATE when the daily
+-- counter had to be reset.
+-- Solution: one function that resets a stale counter and returns only the
+-- fields the rate-limit check reads.
+
+SET search_path TO public, extensions;
+
+CREATE OR REPLACE FUNCTION rate_limit_tick(p_owner_id UUID)
+RETURNS TABLE (
+    paused_until TIMESTAMPTZ,
+    last_question_at TIMESTAMPTZ,
+    questions_shown_today INT
+)
+LANGUAGE sql VOLATILE
+AS $$
+    -- Both branches read the pre-statement snapshot, so a reset row comes
+    -- from RETURNING and an up-to-date row from the plain SELECT
+    WITH reset AS (
+        UPDATE question_rate_limit r
+        SET questions_shown_today = 0,
+            last_daily_reset = CURRENT_DATE,
+            updated_at = now()
+        WHERE r.owner_id = p_owner_id
+          AND r.last_daily_reset < CURRENT_DATE
+        RETURNING r.paused_until, r.last_question_at, r.questions_shown_today
+    )
+    SELECT * FROM reset
+    UNION ALL
+    SELECT r.paused_until, r.last_question_at, r.questions_shown_today
+    FROM question_rate_limit r
+    WHERE r.owner_id = p_owner_id
+      AND NOT EXISTS (SELECT 1 FROM reset);
+$$;
+
+COMMENT ON FUNCTION rate_limit_tick IS 'Question rate-limit state for a user, resetting the daily counter if a new day started';
@@ -0,0 +1,34 @@
+-- Migration: Aggregate person facts and profile completeness in SQL
+-- Created: 2026-10-17
+--
+-- Problem: get_person_details (chat tool) fetched every assertion row with
+-- its confidence, then built a predicate set in Python only to test three
+-- predicate groups for profile completeness.
+-- Solution: one function returning the formatted facts and the three
+-- flags. The predicate groups stay defined in the service and are passed in.
+
+SET search_path TO public, extensions;
+
+CREATE OR REPLACE FUNCTION person_details(
+    p_person_id UUID,
+    p_context_predicates TEXT[],
+    p_work_predicates TEXT[],
+    p_skill_predicates TEXT[]
+)
+RETURNS JSONB
+LANGUAGE sql STABLE
+AS $$
+    SELECT jsonb_build_object(
+        'facts', COALESCE(
+            jsonb_agg(format('- %s: %s', a.predicate, a.object_value) ORDER BY a.created_at),
+            '[]'::jsonb
+        ),
+        'has_context', COALESCE(bool_or(a.predicate = ANY (p_context_predicates)), false),
+        'has_work', COALESCE(bool_or(a.predicate = ANY (p_work_predicates)), false),
+        'has_skill', COALESCE(bool_or(a.predicate = ANY (p_skill_predicates)), false)
+    )
+    FROM assertion a
+    WHERE a.subject_person_id = p_person_id;
+$$;
+
+COMMENT ON FUNCTION person_details IS 'Formatted facts and profile-completeness flags for one person (get_person_details)';
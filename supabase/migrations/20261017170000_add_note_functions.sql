@@ -0,0 +1,61 @@
+-- Migration: Server-side find-or-create and note recording for chat notes
+-- Created: 2026-10-17
+--
+-- Problem: add_note_about_person (chat tool) made 3-4 round trips: person
+-- lookup by name, INSERT person when nothing matched, INSERT raw_evidence,
+-- then INSERT assertion with the returned evidence_id.
+-- Solution: find_or_create_person keeps the partial-name match semantics
+-- (several matches are returned for the caller to disambiguate) and only
+-- inserts when nothing matched; record_note writes evidence and assertion
+-- in one statement.
+--
+-- No ON CONFLICT upsert: display names are not unique per owner (duplicates
+-- are resolved by the dedup flow), and the lookup is a substring match.
+
+SET search_path TO public, extensions;
+
+CREATE OR REPLACE FUNCTION find_or_create_person(p_owner_id UUID, p_name TEXT)
+RETURNS TABLE (person_id UUID, display_name TEXT, created BOOLEAN)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT p.person_id, p.display_name, false
+    FROM person p
+    WHERE p.owner_id = p_owner_id
+      AND p.status = 'active'
+      AND p.display_name ILIKE '%' || p_name || '%';
+
+    IF NOT FOUND THEN
+        RETURN QUERY
+        INSERT INTO person (owner_id, display_name)
+        VALUES (p_owner_id, p_name)
+        RETURNING person.person_id, person.display_name, true;
+    END IF;
+END;
+$$;
+
+COMMENT ON FUNCTION find_or_create_person IS 'Active people whose name contains p_name, or a newly created person if none match';
+
+CREATE OR REPLACE FUNCTION record_note(
+    p_owner_id UUID,
+    p_person_id UUID,
+    p_person_name TEXT,
+    p_note TEXT,
+    p_embedding vector(1536)
+)
+RETURNS UUID
+LANGUAGE sql VOLATILE
+AS $$
+    WITH evidence AS (
+        INSERT INTO raw_evidence (owner_id, source_type, content, processed, processing_status)
+        VALUES (p_owner_id, 'chat_message', 'About ' || p_person_name || ': ' || p_note, true, 'done')
+        RETURNING evidence_id
+    )
+    INSERT INTO assertion (subject_person_id, predicate, object_value, evidence_id, embedding, confidence)
+    SELECT p_person_id, 'note', p_note, evidence.evidence_id, p_embedding, 0.9
+    FROM evidence
+    RETURNING assertion_id;
+$$;
+
+COMMENT ON FUNCTION record_note IS 'Insert a chat note as raw_evidence plus a note assertion in one call';
@@ -0,0 +1,123 @@
+-- Migration: Half-precision HNSW index for assertion embeddings
+-- Created: 2026-10-17
+--
+-- Problem: idx_assertion_embedding_hnsw stores full fp32 vectors (6 KB per
+-- assertion); index size drives memory use and distance cost of the search.
+-- Solution: index embedding::halfvec(1536) instead (pgvector >= 0.7) and
+-- order candidates by the same expression. The column stays vector(1536),
+-- so inserts are unchanged and the returned similarity is still computed
+-- at full precision; only candidate ordering uses fp16 distances.
+
+SET search_path TO public, extensions;
+
+SET statement_timeout = '5min';
+
+CREATE INDEX IF NOT EXISTS idx_assertion_embedding_halfvec_hnsw
+ON assertion
+USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops)
+WITH (m = 24, ef_construction = 128)
+WHERE embedding IS NOT NULL;
+
+COMMENT ON INDEX idx_assertion_embedding_halfvec_hnsw IS 'Half-precision HNSW index for semantic search on assertion embeddings';
+
+-- Community version (searches all users' data)
+CREATE OR REPLACE FUNCTION match_assertions_community(
+    query_embedding vector(1536),
+    match_threshold float,
+    match_count int
+)
+RETURNS TABLE (
+    assertion_id uuid,
+    subject_person_id uuid,
+    predicate text,
+    object_value text,
+    confidence float,
+    similarity float,
+    owner_id uuid
+)
+LANGUAGE sql STABLE
+AS $$
+    WITH candidates AS (
+        -- ORDER BY must match the index expression for HNSW to be used
+        SELECT
+            a.assertion_id,
+            a.subject_person_id,
+            a.predicate,
+            a.object_value,
+            a.confidence,
+            1 - (a.embedding <=> query_embedding) as sim
+        FROM assertion a
+        WHERE a.embedding IS NOT NULL
+        ORDER BY a.embedding::halfvec(1536) <=> query_embedding::halfvec(1536)
+        LIMIT match_count * 2  -- Get more candidates than needed
+    )
+    -- Then: join with person and filter by threshold
+    SELECT
+        c.assertion_id,
+        c.subject_person_id,
+        c.predicate,
+        c.object_value,
+        c.confidence,
+        c.sim as similarity,
+        p.owner_id
+    FROM candidates c
+    JOIN person p ON c.subject_person_id = p.person_id
+    WHERE p.status = 'active'
+      AND c.sim > match_threshold
+    ORDER BY c.sim DESC
+    LIMIT match_count;
+$$;
+
+-- Personal version (searches only user's data)
+CREATE OR REPLACE FUNCTION match_assertions(
+    query_embedding vector(1536),
+    match_threshold float,
+    match_count int,
+    p_owner_id uuid
+)
+RETURNS TABLE (
+    assertion_id uuid,
+    subject_person_id uuid,
+    predicate text,
+    object_value text,
+    confidence float,
+    similarity float
+)
+LANGUAGE sql STABLE
+AS $$
+    WITH candidates AS (
+        -- ORDER BY must match the index expression for HNSW to be used
+        SELECT
+            a.assertion_id,
+            a.subject_person_id,
+            a.predicate,
+            a.object_value,
+            a.confidence,
+            1 - (a.embedding <=> query_embedding) as sim
+        FROM assertion a
+        WHERE a.embedding IS NOT NULL
+        ORDER BY a.embedding::halfvec(1536) <=> query_embedding::halfvec(1536)
+        LIMIT match_count * 2
+    )
+    -- Then: join with person and filter by owner + threshold
+    SELECT
+        c.assertion_id,
+        c.subject_person_id,
+        c.predicate,
+        c.object_value,
+        c.confidence,
+        c.sim as similarity
+    FROM candidates c
+    JOIN person p ON c.subject_person_id = p.person_id
+    WHERE p.owner_id = p_owner_id
+      AND p.status = 'active'
+      AND c.sim > match_threshold
+    ORDER BY c.sim DESC
+    LIMIT match_count;
+$$;
+
+COMMENT ON FUNCTION match_assertions_community IS 'Semantic search across all users - halfvec HNSW candidates, fp32 similarity';
+COMMENT ON FUNCTION match_assertions IS 'Semantic search for single user - halfvec HNSW candidates, fp32 similarity';
+
+-- No remaining query orders by the fp32 expression
+DROP INDEX IF EXISTS idx_assertion_embedding_hnsw;
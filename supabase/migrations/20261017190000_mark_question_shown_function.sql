@@ -0,0 +1,35 @@
+-- Migration: Mark a proactive question shown and count it in one call
+-- Created: 2026-10-17
+--
+-- Problem: showing a question took three writes (proactive_question UPDATE,
+-- question_rate_limit upsert, then an UPDATE of questions_shown_today from a
+-- value read earlier). /questions/next additionally called a non-existent
+-- increment_questions_shown RPC.
+-- Solution: one function doing the UPDATE and an atomic counting upsert.
+
+SET search_path TO public, extensions;
+
+CREATE OR REPLACE FUNCTION mark_question_shown(p_owner_id UUID, p_question_id UUID)
+RETURNS void
+LANGUAGE sql VOLATILE
+AS $$
+    UPDATE proactive_question
+    SET status = 'shown',
+        shown_at = now()
+    WHERE question_id = p_question_id
+      AND owner_id = p_owner_id;
+
+    INSERT INTO question_rate_limit (owner_id, questions_shown_today, last_question_at, last_daily_reset)
+    VALUES (p_owner_id, 1, now(), CURRENT_DATE)
+    ON CONFLICT (owner_id) DO UPDATE SET
+        -- Counter restarts if the day rolled over since the last reset
+        questions_shown_today = CASE
+            WHEN question_rate_limit.last_daily_reset < CURRENT_DATE THEN 1
+            ELSE question_rate_limit.questions_shown_today + 1
+        END,
+        last_question_at = EXCLUDED.last_question_at,
+        last_daily_reset = EXCLUDED.last_daily_reset,
+        updated_at = now();
+$$;
+
+COMMENT ON FUNCTION mark_question_shown IS 'Set a proactive question to shown and increment the owner''s daily question count';
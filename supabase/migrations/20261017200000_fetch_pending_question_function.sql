@@ -0,0 +1,73 @@
+-- Migration: Rate-limit gating and pending question lookup in one call
+-- Created: 2026-10-17
+--
+-- Problem: get_pending_question (chat tool) made up to three sequential
+-- reads before it could show anything: rate_limit_tick, an optional person
+-- lookup by name, then the proactive_question query (repeated once after
+-- generating new questions).
+-- Solution: one function that applies the same gates (pause, daily cap,
+-- cooldown) and returns the top pending question with its person name.
+
+SET search_path TO public, extensions;
+
+CREATE OR REPLACE FUNCTION fetch_pending_question(
+    p_owner_id UUID,
+    p_max_per_day INT,
+    p_cooldown_hours INT,
+    p_person_name TEXT DEFAULT NULL  -- NULL = any person
+)
+RETURNS JSONB
+LANGUAGE plpgsql VOLATILE
+AS $$
+DECLARE
+    v_rate RECORD;
+    v_person_id UUID;
+    v_question JSONB;
+BEGIN
+    -- Resets a stale daily counter as a side effect
+    SELECT * INTO v_rate FROM rate_limit_tick(p_owner_id);
+
+    IF FOUND THEN
+        IF v_rate.paused_until IS NOT NULL AND now() < v_rate.paused_until THEN
+            RETURN jsonb_build_object('blocked', 'paused');
+        END IF;
+        IF v_rate.questions_shown_today >= p_max_per_day THEN
+            RETURN jsonb_build_object('blocked', 'daily_limit');
+        END IF;
+        IF v_rate.last_question_at IS NOT NULL
+           AND now() - v_rate.last_question_at < p_cooldown_hours * interval '1 hour' THEN
+            RETURN jsonb_build_object('blocked', 'cooldown');
+        END IF;
+    END IF;
+
+    -- Unknown name = no person filter (same as before)
+    IF p_person_name IS NOT NULL THEN
+        SELECT p.person_id INTO v_person_id
+        FROM person p
+        WHERE p.owner_id = p_owner_id
+          AND p.display_name ILIKE '%' || p_person_name || '%'
+        LIMIT 1;
+    END IF;
+
+    SELECT jsonb_build_object(
+        'question_id', q.question_id,
+        'person_id', q.person_id,
+        'question_type', q.question_type,
+        'question_text', q.question_text,
+        'question_text_ru', q.question_text_ru,
+        'person_name', p.display_name
+    ) INTO v_question
+    FROM proactive_question q
+    LEFT JOIN person p ON p.person_id = q.person_id
+    WHERE q.owner_id = p_owner_id
+      AND q.status = 'pending'
+      AND q.expires_at > now()
+      AND (v_person_id IS NULL OR q.person_id = v_person_id)
+    ORDER BY q.priority DESC
+    LIMIT 1;
+
+    RETURN jsonb_build_object('blocked', NULL, 'question', v_question);
+END;
+$$;
+
+COMMENT ON FUNCTION fetch_pending_question IS 'Question rate-limit gates plus the top pending proactive question (chat get_pending_question)';
@@ -0,0 +1,19 @@
+-- Migration: Insertion-order tie-breaker for chat messages
+-- Created: 2026-10-17
+--
+-- Problem: an assistant tool-call message and its tool results are now
+-- saved with one multi-row INSERT, so they share created_at (now() is fixed
+-- per transaction) and ORDER BY created_at alone no longer guarantees the
+-- tool_calls message precedes its tool responses.
+-- Solution: an identity column assigned in insert order; history is read
+-- ORDER BY created_at, message_seq.
+
+SET search_path TO public, extensions;
+
+ALTER TABLE chat_message
+    ADD COLUMN IF NOT EXISTS message_seq BIGINT GENERATED ALWAYS AS IDENTITY;
+
+DROP INDEX IF EXISTS idx_chat_message_session;
+CREATE INDEX IF NOT EXISTS idx_chat_message_session ON chat_message(session_id, created_at, message_seq);
+
+COMMENT ON COLUMN chat_message.message_seq IS 'Insertion order; breaks created_at ties between rows of one INSERT';
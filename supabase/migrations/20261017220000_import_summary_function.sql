@@ -0,0 +1,50 @@
+-- Migration: Aggregate import stats in the database
+-- Created: 2026-10-17
+--
+-- Problem: the get_import_stats chat tool fetched every active person row
+-- (import_source, import_batch_id) just to count them by source in Python,
+-- then made a second request for the import batches.
+-- Solution: one function returning the counts and the 5 most recent batches
+-- referenced by those people as JSONB. (Not named get_import_stats: that
+-- name is taken by the per-source TABLE function from the import_batch
+-- migration, and CREATE OR REPLACE cannot change its return type.)
+
+SET search_path TO public, extensions;
+
+CREATE OR REPLACE FUNCTION get_import_summary(
+    p_owner_id UUID,
+    p_import_source TEXT DEFAULT NULL  -- NULL = all sources
+)
+RETURNS JSONB
+LANGUAGE sql STABLE
+AS $$
+    WITH people AS (
+        SELECT COALESCE(p.import_source, 'manual') AS source, p.import_batch_id
+        FROM person p
+        WHERE p.owner_id = p_owner_id
+          AND p.status = 'active'
+          AND (p_import_source IS NULL OR p.import_source = p_import_source)
+    ),
+    by_source AS (
+        SELECT source, count(*) AS cnt
+        FROM people
+        GROUP BY source
+    ),
+    recent_batches AS (
+        SELECT b.batch_id, b.import_type, b.status, b.new_people, b.analytics, b.created_at
+        FROM import_batch b
+        WHERE b.batch_id IN (SELECT import_batch_id FROM people WHERE import_batch_id IS NOT NULL)
+        ORDER BY b.created_at DESC
+        LIMIT 5
+    )
+    SELECT jsonb_build_object(
+        'total_people', (SELECT count(*) FROM people),
+        'by_source', COALESCE((SELECT jsonb_object_agg(source, cnt) FROM by_source), '{}'::jsonb),
+        'recent_batches', COALESCE((
+            SELECT jsonb_agg(to_jsonb(rb) ORDER BY rb.created_at DESC)
+            FROM recent_batches rb
+        ), '[]'::jsonb)
+    );
+$$;
+
+COMMENT ON FUNCTION get_import_summary IS 'Active people per import source plus recent import batches (chat get_import_stats) in a single round trip';
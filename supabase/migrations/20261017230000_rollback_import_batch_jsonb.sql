@@ -0,0 +1,60 @@
+-- Migration: Roll back an import batch in one transactional call
+-- Created: 2026-10-17
+--
+-- Problem: the rollback_import chat tool made three separate requests
+-- (batch lookup, person soft delete, batch status update); a failure in
+-- between left people deleted under a batch still marked active.
+-- rollback_import_batch() already did the writes atomically but raised the
+-- same error for "not found" and "already rolled back" and did not return
+-- the import type, so nothing used it.
+-- Solution: return the outcome as JSONB, lock the batch row so concurrent
+-- rollbacks serialize, and stamp person.updated_at like the API did.
+
+SET search_path TO public, extensions;
+
+DROP FUNCTION IF EXISTS rollback_import_batch(UUID, UUID);
+
+CREATE OR REPLACE FUNCTION rollback_import_batch(p_batch_id UUID, p_owner_id UUID)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_batch RECORD;
+    v_count INTEGER;
+BEGIN
+    SELECT b.status, b.import_type INTO v_batch
+    FROM import_batch b
+    WHERE b.batch_id = p_batch_id
+      AND b.owner_id = p_owner_id
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('result', 'not_found');
+    END IF;
+    IF v_batch.status = 'rolled_back' THEN
+        RETURN jsonb_build_object('result', 'already_rolled_back', 'import_type', v_batch.import_type);
+    END IF;
+
+    -- Soft delete all people from this batch
+    UPDATE person
+    SET status = 'deleted',
+        updated_at = now()
+    WHERE import_batch_id = p_batch_id
+      AND status = 'active';
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+
+    UPDATE import_batch
+    SET status = 'rolled_back',
+        rolled_back_at = now()
+    WHERE batch_id = p_batch_id;
+
+    RETURN jsonb_build_object(
+        'result', 'rolled_back',
+        'import_type', v_batch.import_type,
+        'deleted_count', v_count
+    );
+END;
+$$;
+
+COMMENT ON FUNCTION rollback_import_batch IS 'Soft-delete the active people of an import batch and mark it rolled back (chat rollback_import), atomically';
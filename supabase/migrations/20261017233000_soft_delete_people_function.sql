@@ -0,0 +1,31 @@
+-- Migration: Soft-delete a list of people in one statement
+-- Created: 2026-10-17
+--
+-- Problem: delete_people (chat tool) with confirm=true first SELECTed the
+-- ids to check ownership, then sent the same id list again in an UPDATE,
+-- both as person_id=in.(...) URL filters.
+-- Solution: one UPDATE ... RETURNING that checks ownership and reports
+-- which people were deleted; ids travel in the RPC body.
+
+SET search_path TO public, extensions;
+
+CREATE OR REPLACE FUNCTION soft_delete_people(
+    p_owner_id UUID,
+    p_person_ids UUID[]
+)
+RETURNS TABLE (
+    person_id UUID,
+    display_name TEXT
+)
+LANGUAGE sql VOLATILE
+AS $$
+    UPDATE person p
+    SET status = 'deleted',
+        updated_at = now()
+    WHERE p.person_id = ANY(p_person_ids)
+      AND p.owner_id = p_owner_id
+      AND p.status = 'active'
+    RETURNING p.person_id, p.display_name;
+$$;
+
+COMMENT ON FUNCTION soft_delete_people IS 'Soft-delete the given active people of one owner, returning the ones deleted (chat delete_people)';
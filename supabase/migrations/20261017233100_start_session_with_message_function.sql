@@ -0,0 +1,32 @@
+-- Migration: Create a chat session together with its first message
+-- Created: 2026-10-17
+--
+-- Problem: the first turn of every conversation inserted chat_session,
+-- waited for the generated session_id, then inserted the user message in
+-- a second request.
+-- Solution: one function inserting both (data-modifying CTE) and
+-- returning the new session_id.
+
+SET search_path TO public, extensions;
+
+CREATE OR REPLACE FUNCTION start_session_with_message(
+    p_owner_id UUID,
+    p_title TEXT,
+    p_message TEXT
+)
+RETURNS UUID
+LANGUAGE sql VOLATILE
+AS $$
+    WITH s AS (
+        INSERT INTO chat_session (owner_id, title)
+        VALUES (p_owner_id, p_title)
+        RETURNING session_id
+    ),
+    m AS (
+        INSERT INTO chat_message (session_id, role, content)
+        SELECT session_id, 'user', p_message FROM s
+    )
+    SELECT session_id FROM s;
+$$;
+
+COMMENT ON FUNCTION start_session_with_message IS 'New chat session plus its first user message in a single round trip';
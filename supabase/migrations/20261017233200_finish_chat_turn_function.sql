@@ -0,0 +1,27 @@
+-- Migration: Save the final assistant message and touch the session together
+-- Created: 2026-10-17
+--
+-- Problem: ending a chat turn took two requests (chat_message insert, then
+-- chat_session.updated_at bump), and a turn that hit the tool-iteration
+-- limit saved neither.
+-- Solution: one function doing both in the same transaction; the API now
+-- calls it on every terminal path.
+
+SET search_path TO public, extensions;
+
+CREATE OR REPLACE FUNCTION finish_chat_turn(
+    p_session_id UUID,
+    p_content TEXT
+)
+RETURNS VOID
+LANGUAGE sql VOLATILE
+AS $$
+    INSERT INTO chat_message (session_id, role, content)
+    VALUES (p_session_id, 'assistant', p_content);
+
+    UPDATE chat_session
+    SET updated_at = now()
+    WHERE session_id = p_session_id;
+$$;
+
+COMMENT ON FUNCTION finish_chat_turn IS 'Final assistant message of a chat turn plus the session updated_at bump, atomically';